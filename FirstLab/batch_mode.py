@@ -0,0 +1,177 @@
+import contextlib, io, json, os, sys
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, TextIO
+from teller_machine import BankCard, Banknote, ITellerMachine, TellerMachine, BANK_CARD_FILE
+from teller_machine_exceptions import BatchCommandException, InvalidBanknoteValueException, NegativeMoneyAmountException, NotEnoughMoneyInStorageException, NotEnoughMoneyOnBalanceException
+
+BATCH_USAGE = """Commands, one per line, '#' starts a comment:
+    card [path]            insert the card from the JSON file, bank_card.json by default
+    pin <pin>              enter the PIN of the inserted card
+    balance                show the card balance
+    withdraw <amount>      withdraw cash
+    deposit <note> ...     deposit the banknotes, e.g. deposit 50 20 20
+    phone <number> <amount> pay for the phone
+    eject                  save the card to its file and withdraw it"""
+
+class BatchSession:
+    """Runs text commands against one long-lived teller machine and returns their results as JSON dictionaries.
+
+    Loaded cards are kept by file path, so a card is parsed once per session however many times it's inserted.
+    They're saved back on eject and when the session is closed."""
+    def __init__(self, teller_machine: ITellerMachine) -> None:
+        self.__teller_machine = teller_machine
+        self.__cards = {}
+        self.__card_path = None
+        self.__access_gained = False
+        self.__commands = {
+            "card": self.__insert_card,
+            "pin": self.__enter_pin,
+            "balance": self.__show_balance,
+            "withdraw": self.__withdraw_cash,
+            "deposit": self.__deposit_cash,
+            "phone": self.__pay_for_the_phone,
+            "eject": self.__eject_card,
+        }
+
+    def execute(self, line: str) -> dict:
+        """Runs one command line and returns {"command": ..., "ok": True, "result": ...} or {"command": ..., "ok": False, "error": ...}.
+        Returns None for blank lines and comments."""
+        words = line.split("#", 1)[0].split()
+        if not words:
+            return None
+
+        name, arguments = words[0].lower(), words[1:]
+        command = self.__commands.get(name)
+        try:
+            if command is None:
+                raise BatchCommandException("Unknown command '" + name + "'.")
+
+            result = command(arguments)
+        except (BatchCommandException, InvalidOperation, InvalidBanknoteValueException, NegativeMoneyAmountException,
+                NotEnoughMoneyInStorageException, NotEnoughMoneyOnBalanceException, OSError, ValueError) as error:
+            return {"command": name, "ok": False, "error": self.__format_error(error)}
+
+        return {"command": name, "ok": True, "result": result}
+
+    def close(self) -> None:
+        for path, card in self.__cards.items():
+            self.__save_card(path, card)
+        self.__cards.clear()
+        self.__card_path = None
+
+    def __insert_card(self, arguments: list[str]):
+        path = arguments[0] if arguments else os.path.join(os.path.dirname(__file__), BANK_CARD_FILE)
+        if path not in self.__cards:
+            with open(path) as file:
+                self.__cards[path] = json.load(file, object_hook=BankCard.from_json)
+
+        self.__card_path = path
+        self.__access_gained = False
+        return self.__cards[path].card_number
+
+    def __enter_pin(self, arguments: list[str]):
+        card = self.__get_inserted_card()
+        self.__access_gained = arguments == [card.password]
+        if not self.__access_gained:
+            raise BatchCommandException("Invalid password")
+
+    def __show_balance(self, arguments: list[str]):
+        return self.__teller_machine.get_card_balance(self.__get_opened_card()).__str__()
+
+    def __withdraw_cash(self, arguments: list[str]):
+        amount = self.__parse_amount(arguments, 1)
+        card = self.__get_opened_card()
+        if amount == 0:
+            return []
+
+        # Teller machine reports failed withdrawals by printing them and returning nothing.
+        with contextlib.redirect_stdout(io.StringIO()) as messages:
+            banknotes = self.__teller_machine.withdraw_cash(amount, card)
+        if banknotes is None:
+            raise BatchCommandException(messages.getvalue().strip())
+
+        return [banknote.__str__() for banknote in banknotes]
+
+    def __deposit_cash(self, arguments: list[str]):
+        if not arguments:
+            raise BatchCommandException("Specify the banknotes to deposit.")
+
+        banknotes = [Banknote(Decimal(value)) for value in arguments]
+        return self.__teller_machine.deposit_cash(banknotes, self.__get_opened_card()).__str__()
+
+    def __pay_for_the_phone(self, arguments: list[str]):
+        amount = self.__parse_amount(arguments, 2)
+        card = self.__get_opened_card()
+        if self.__teller_machine.get_card_balance(card) < amount:
+            raise BatchCommandException("You haven't got enough money.")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.__teller_machine.pay_for_the_phone(arguments[0], amount, card)
+        return self.__teller_machine.get_card_balance(card).__str__()
+
+    def __eject_card(self, arguments: list[str]):
+        self.__get_inserted_card()
+        self.__save_card(self.__card_path, self.__cards.pop(self.__card_path))
+        self.__card_path = None
+        self.__access_gained = False
+
+    def __get_inserted_card(self) -> BankCard:
+        if self.__card_path is None:
+            raise BatchCommandException("ATM has no card inserted.")
+
+        return self.__cards[self.__card_path]
+
+    def __get_opened_card(self) -> BankCard:
+        card = self.__get_inserted_card()
+        if not self.__access_gained:
+            raise BatchCommandException("Enter the PIN first.")
+
+        return card
+
+    def __parse_amount(self, arguments: list[str], arguments_count: int) -> Decimal:
+        if len(arguments) != arguments_count:
+            raise BatchCommandException("Expected " + arguments_count.__str__() + " arguments.")
+
+        amount = Decimal(arguments[-1])
+        if amount < 0:
+            raise BatchCommandException("Invalid amount passed. Please, enter a positive value.")
+
+        return amount
+
+    def __save_card(self, path: str, card: BankCard) -> None:
+        with open(path, "w") as file:
+            json.dump(card.to_json(), file, indent=4)
+
+    def __format_error(self, error: Exception) -> str:
+        if isinstance(error, InvalidOperation):
+            return "Invalid number passed."
+        if isinstance(error, OSError):
+            return error.strerror.__str__() + ": " + error.filename.__str__()
+
+        return " ".join(argument.__str__() for argument in error.args) or type(error).__name__
+
+def run_batch(lines: Iterable[str], output: TextIO, teller_machine: ITellerMachine = None) -> int:
+    """Runs the commands and writes one JSON line per command to the output. Returns the number of failed commands."""
+    session = BatchSession(teller_machine or TellerMachine())
+    failed = 0
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            result = session.execute(line)
+            if result is None:
+                continue
+
+            failed += not result["ok"]
+            output.write(json.dumps(dict(line=line_number, **result)) + "\n")
+    finally:
+        session.close()
+        output.flush()
+
+    return failed
+
+def run_batch_file(path: str) -> int:
+    """Runs commands from the file or from the standard input, if the path is '-'."""
+    if path == "-":
+        return run_batch(sys.stdin, sys.stdout)
+
+    with open(path) as file:
+        return run_batch(file, sys.stdout)
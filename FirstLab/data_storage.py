@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
 from typing import TypeVar, Generic
 from json import JSONEncoder
+import copy
 import json
+import os
+import threading
 
 T = TypeVar('T')
 
@@ -45,4 +48,61 @@ class InMemoryStorage(IStorage[T]):
         self.__data = data
         
     def load(self) -> T:
-        return self.__data
\ No newline at end of file
+        return self.__data
+
+class CachingStorage(IStorage[T]):
+    """Decorates file based storage, so the loaded data is kept in memory until the file is changed.
+
+    Saves are passed through to the decorated storage. The file is checked by its modification time, size and inode
+    on every load, so changes made by other processes are noticed. Copies of the cached data are returned,
+    so callers are free to change them in place."""
+    def __init__(self, storage: IStorage[T], path: str) -> None:
+        self.__storage = storage
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__data = None
+        self.__file_signature = None
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def save(self, data: T) -> None:
+        with self.__lock:
+            self.__file_signature = None
+            self.__storage.save(data)
+            self.__data = copy.copy(data)
+            self.__file_signature = self.__get_file_signature()
+
+    def load(self) -> T:
+        with self.__lock:
+            file_signature = self.__get_file_signature()
+            if file_signature is not None and file_signature == self.__file_signature:
+                self.__hits += 1
+                return copy.copy(self.__data)
+
+            self.__misses += 1
+            data = self.__storage.load()
+            self.__data = copy.copy(data)
+            self.__file_signature = file_signature
+            return data
+
+    def invalidate(self) -> None:
+        """Drops the cached data, so the next load reads the file."""
+        with self.__lock:
+            self.__data = None
+            self.__file_signature = None
+
+    def __get_file_signature(self):
+        try:
+            stat = os.stat(self.__path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
@@ -1,5 +1,6 @@
 import os, sys, getopt, json
 from teller_machine import BankCard, ITellerMachineUI, TellerMachine, TellerMachineUI
+from batch_mode import BATCH_USAGE, run_batch_file
 BANK_CARD_FILE = "bank_card.json"
 
 argumentList = sys.argv[1:]
@@ -26,7 +27,19 @@ def work_with_card(user_interface: ITellerMachineUI, card: BankCard) -> None:
 
     user_interface.withdraw_card()
 
+def print_usage() -> None:
+    print("Usage: main.py -p <pin> [-b] [-w <amount>] [-d] [-m <phone>]")
+    print("       main.py --batch [commands file, standard input by default]\n")
+    print(BATCH_USAGE)
+
 if __name__ == "__main__":
+    if argumentList and argumentList[0] in ("-h", "--help"):
+        print_usage()
+        sys.exit()
+    if argumentList and argumentList[0] == "--batch":
+        # Batch mode runs all the commands in this process and exits with the number of failed ones.
+        sys.exit(min(run_batch_file(argumentList[1] if len(argumentList) > 1 else "-"), 255))
+
     file_path = os.path.join(os.path.dirname(__file__), BANK_CARD_FILE)
     with open(file_path) as file:
         card = json.load(file, object_hook=BankCard.from_json)
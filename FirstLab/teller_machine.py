@@ -1,9 +1,11 @@
 import os, json
 from abc import ABC, abstractmethod
+from collections import Counter
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 from teller_machine_exceptions import InvalidBanknoteValueException, InvalidCardNumberException, InvalidCvcException, InvalidPasswordException, NegativeMoneyAmountException, NotEnoughMoneyInStorageException, NotEnoughMoneyOnBalanceException
-from data_storage import IStorage, JsonFileStorage
+from data_storage import IStorage, JsonFileStorage, CachingStorage
+from change_making import IChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
 BANK_CARD_FILE = "bank_card.json"
 
 class Banknote:
@@ -69,8 +71,9 @@ class JsonFileBanknoteStorage(IStorage[list[Banknote]]):
 
 class BanknoteStorage(IBanknoteStorage):
     """Implements methods for operationing with banknotes storage."""
-    def __init__(self, storage: IStorage[list[Banknote]]) -> None:
+    def __init__(self, storage: IStorage[list[Banknote]], change_making_strategy: IChangeMakingStrategy = None) -> None:
         self.__storage = storage
+        self.__change_making_strategy = change_making_strategy or DynamicProgrammingChangeMakingStrategy()
         
     def get_cash_available(self) -> Decimal:
         """Calculates the sum of all banknotes values in storage."""
@@ -87,7 +90,7 @@ class BanknoteStorage(IBanknoteStorage):
         """Withdraws banknotes from storage with an amount equal specified or the closest available to it, if storage doesn't have small enough values."""
         AmountValidator.validate_amount(amount)
         if amount == 0:
-            return list[Banknote]
+            return []
         cash_available = self.get_cash_available()
         if cash_available < amount:
             raise NotEnoughMoneyInStorageException("There is not enough money in storage to withdraw", amount)
@@ -99,16 +102,20 @@ class BanknoteStorage(IBanknoteStorage):
         return banknotes_withdrawed
 
     def __make_change_algorithm(self, banknotes_available: list[Banknote], amount: Decimal) -> list[Banknote]:
-        sorted_Banknotes = sorted(banknotes_available, reverse=True)
-        banknotes_withdrawed = []
-        current_amount = Decimal()
-        while current_amount != amount and len(sorted_Banknotes) > 0:
-            current_banknote = sorted_Banknotes.pop(0)
-            if current_amount + current_banknote.value <= amount:
-                current_amount += current_banknote.value
-                banknotes_withdrawed.append(current_banknote)
-                banknotes_available.remove(current_banknote)
+        counts = Counter(banknote.value for banknote in banknotes_available)
+        banknotes_to_withdraw = self.__change_making_strategy.make_change(counts, amount)
 
+        banknotes_withdrawed = []
+        banknotes_left = []
+        for banknote in banknotes_available:
+            if banknotes_to_withdraw.get(banknote.value, 0) > 0:
+                banknotes_to_withdraw[banknote.value] -= 1
+                banknotes_withdrawed.append(banknote)
+            else:
+                banknotes_left.append(banknote)
+
+        banknotes_available[:] = banknotes_left
+        banknotes_withdrawed.sort(reverse=True)
         return banknotes_withdrawed
 
     def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
@@ -286,10 +293,11 @@ class ITellerMachine(ABC):
 
 class TellerMachine(ITellerMachine):
     """Implements methods for operationing with teller machine."""
-    def __init__(self) -> None:
-        json_file_storage = JsonFileStorage[list[Banknote]]("atm_data.json")
-        banknote_file_storage = JsonFileBanknoteStorage(json_file_storage)
-        self.__storage = BanknoteStorage(banknote_file_storage)
+    def __init__(self, storage: IBanknoteStorage = None) -> None:
+        if storage is None:
+            json_file_storage = JsonFileStorage[list[Banknote]]("atm_data.json")
+            storage = BanknoteStorage(CachingStorage(JsonFileBanknoteStorage(json_file_storage), "atm_data.json"))
+        self.__storage = storage
 
     def get_card_balance(self, card: BankCard) -> Decimal:
         return card.card_account.view_balance()
@@ -303,6 +311,10 @@ class TellerMachine(ITellerMachine):
                 print("You haven't got enough money to withdraw.")
                 return
             banknotes = self.__storage.withdraw_banknotes(amount)
+            if self.__calculate_cash_amount(banknotes) != amount:
+                # Storage gives the closest amount below, if it can't make the exact one, so the banknotes are put back.
+                self.__storage.deposit_banknotes(banknotes)
+                raise NotEnoughMoneyInStorageException("Storage can't dispense exactly", amount)
             card.card_account.withdraw_cash(amount)
             return banknotes
         except NotEnoughMoneyInStorageException:
@@ -24,4 +24,8 @@ class InvalidCvcException(Exception):
 
 # Exception raised when trying to pass invalid password
 class InvalidPasswordException(Exception):
+    pass
+
+# Exception raised when batch command can't be run
+class BatchCommandException(Exception):
     pass
\ No newline at end of file
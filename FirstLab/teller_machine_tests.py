@@ -1,9 +1,15 @@
 from datetime import datetime
 from decimal import Decimal
+import io
+import json
+import os
+import tempfile
 import unittest
-from teller_machine import BankCard, Banknote, BanknoteStorage, CardAccount
+from teller_machine import BankCard, Banknote, BanknoteStorage, CardAccount, TellerMachine
+from batch_mode import BatchSession, run_batch
 from teller_machine_exceptions import InvalidBanknoteValueException, InvalidCardNumberException, InvalidCvcException, InvalidPasswordException, NegativeMoneyAmountException, NotEnoughMoneyInStorageException, NotEnoughMoneyOnBalanceException
 from data_storage import InMemoryStorage
+from change_making import GreedyChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
 
 class TellerMachineTests(unittest.TestCase):
     def test_banknote_negative_value_set_raises_an_exception(self):
@@ -46,7 +52,7 @@ class TellerMachineTests(unittest.TestCase):
         
     def test_banknotestorage_withdraw_banknotes_amount_equals_zero_returns_empty_list(self):
         # Arrange
-        expected = list[Banknote]
+        expected = []
         in_memory_storage = InMemoryStorage(expected)
         storage = BanknoteStorage(in_memory_storage)
 
@@ -164,6 +170,69 @@ class TellerMachineTests(unittest.TestCase):
         # Assert
         self.assertEqual(amount_Expected * 2, storage.get_cash_available())
 
+    def test_banknotestorage_withdraw_banknotes_greedy_choice_fails_returns_exact_combination(self):
+        # Arrange
+        banknotes = [Banknote(50), Banknote(20), Banknote(20), Banknote(20)]
+        in_memory_storage = InMemoryStorage(banknotes)
+        storage = BanknoteStorage(in_memory_storage)
+        expected = [Banknote(20), Banknote(20), Banknote(20)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual(Decimal(50), storage.get_cash_available())
+
+    def test_banknotestorage_withdraw_banknotes_greedy_strategy_returns_closest(self):
+        # Arrange
+        banknotes = [Banknote(50), Banknote(20), Banknote(20), Banknote(20)]
+        in_memory_storage = InMemoryStorage(banknotes)
+        storage = BanknoteStorage(in_memory_storage, GreedyChangeMakingStrategy())
+        expected = [Banknote(50)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual(expected, actual)
+
+    def test_tellermachine_withdraw_cash_amount_which_cant_be_dispensed_exactly_changes_nothing(self):
+        # Arrange
+        account = CardAccount()
+        account.deposit_cash(Decimal(100))
+        card = BankCard("1".zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, account)
+        in_memory_storage = InMemoryStorage([Banknote(50)])
+
+        # Act
+        actual = TellerMachine(BanknoteStorage(in_memory_storage)).withdraw_cash(Decimal(30), card)
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertEqual(Decimal(100), account.view_balance())
+        self.assertEqual([Banknote(50)], in_memory_storage.load())
+
+    def test_dynamicprogrammingchangemakingstrategy_make_change_finds_exact_combination_if_exists(self):
+        # Arrange
+        strategy = DynamicProgrammingChangeMakingStrategy()
+        counts = {Decimal(1): 2, Decimal(5): 1, Decimal(20): 3, Decimal(50): 2}
+        reachable_amounts = set()
+        for ones in range(3):
+            for fives in range(2):
+                for twenties in range(4):
+                    for fifties in range(3):
+                        reachable_amounts.add(ones + 5 * fives + 20 * twenties + 50 * fifties)
+
+        for amount in range(0, 180):
+            # Act
+            change = strategy.make_change(counts, Decimal(amount))
+
+            # Assert
+            expected = max(reachable for reachable in reachable_amounts if reachable <= amount)
+            self.assertEqual(expected, sum(denomination * count for denomination, count in change.items()))
+            for denomination, count in change.items():
+                self.assertLessEqual(count, counts[denomination])
+
     def test_bankcard_card_number_length_does_not_equal_sixteen_raise_an_exception(self):
         self.assertRaises(InvalidCardNumberException, BankCard, "1111", datetime(2000, 12, 12), "Test User", "1" * 3, "1" * 4, CardAccount())
         
@@ -215,5 +284,56 @@ class TellerMachineTests(unittest.TestCase):
         # Assert
         self.assertEqual(expected, actual)
 
+class BatchModeTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.card_path = os.path.join(self.directory.name, "bank_card.json")
+        account = CardAccount()
+        account.deposit_cash(Decimal(100))
+        with open(self.card_path, "w") as file:
+            json.dump(BankCard("1111222233334444", datetime(2030, 1, 1), "Test User", "111", "1111", account).to_json(), file)
+        self.teller_machine = TellerMachine(BanknoteStorage(InMemoryStorage([Banknote(50), Banknote(20), Banknote(20), Banknote(10)])))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_batch_writes_json_line_per_command_and_saves_card(self):
+        # Arrange
+        commands = ["# session", "card " + self.card_path, "pin 1111", "withdraw 70", "", "deposit 50 5", "phone +375291234567 15", "balance", "eject"]
+        output = io.StringIO()
+
+        # Act
+        failed = run_batch(commands, output, self.teller_machine)
+
+        # Assert
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(0, failed)
+        self.assertEqual([2, 3, 4, 6, 7, 8, 9], [result["line"] for result in results])
+        self.assertEqual(["50", "20"], results[2]["result"])
+        self.assertEqual("55", results[3]["result"])
+        self.assertEqual("70", results[5]["result"])
+        with open(self.card_path) as file:
+            self.assertEqual("70", json.load(file)["balance"])
+
+    def test_batchsession_execute_returns_errors_instead_of_raising(self):
+        # Arrange
+        session = BatchSession(self.teller_machine)
+
+        # Act
+        no_card_result = session.execute("balance")
+        session.execute("card " + self.card_path)
+        wrong_pin_result = session.execute("pin 0000")
+        session.execute("pin 1111")
+        too_large_result = session.execute("withdraw 1000")
+        invalid_amount_result = session.execute("withdraw ten")
+        unknown_result = session.execute("transfer 10")
+
+        # Assert
+        for result in (no_card_result, wrong_pin_result, too_large_result, invalid_amount_result, unknown_result):
+            self.assertFalse(result["ok"])
+        self.assertEqual("ATM has no card inserted.", no_card_result["error"])
+        self.assertEqual("You haven't got enough money to withdraw.", too_large_result["error"])
+        self.assertEqual("100", session.execute("balance")["result"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
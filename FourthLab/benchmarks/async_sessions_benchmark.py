@@ -0,0 +1,136 @@
+"""Compares session concurrency of TellerMachine and AsyncTellerMachine embedded in one event loop.
+
+Run from the FourthLab folder: python -m benchmarks.async_sessions_benchmark"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from src.async_teller_machine import AsyncTellerMachine
+from src.persistence.async_banknote_storage import AsyncBanknoteStorage
+from src.persistence.async_data_storage import ThreadedAsyncStorage
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import BanknoteStorage, JsonFileBanknoteStorage
+from src.persistence.card_account import CardAccount
+from src.persistence.cassette import Cassette
+from src.persistence.data_storage import IStorage, JsonFileStorage
+from src.teller_machine import TellerMachine
+
+class SlowDiskStorage(IStorage):
+    """Decorates storage with a blocking delay on every save and load to emulate a slow disk."""
+    def __init__(self, storage: IStorage, latency: float) -> None:
+        self.__storage = storage
+        self.__latency = latency
+
+    def save(self, data) -> None:
+        time.sleep(self.__latency)
+        self.__storage.save(data)
+
+    def load(self):
+        time.sleep(self.__latency)
+        return self.__storage.load()
+
+class SessionsStatistics:
+    """Counts sessions whose operations are in progress at the same time."""
+    def __init__(self) -> None:
+        self.in_progress = 0
+        self.peak_in_progress = 0
+        self.completed = 0
+        self.max_loop_lag = 0.0
+
+    def start_operation(self) -> None:
+        self.in_progress += 1
+        self.peak_in_progress = max(self.peak_in_progress, self.in_progress)
+
+    def finish_operation(self) -> None:
+        self.in_progress -= 1
+
+def create_card() -> BankCard:
+    account = CardAccount()
+    account.deposit_cash(Decimal(10 ** 6))
+    return BankCard("1111222233334444", datetime(2030, 1, 1).date(), "Benchmark Client", "111", "1111", account)
+
+def create_file_storages(directory: str, machines: int, latency: float) -> list[IStorage]:
+    storages = []
+    for machine in range(machines):
+        path = os.path.join(directory, "atm_data_" + machine.__str__() + ".json")
+        JsonFileStorage(path).save(Cassette({5: 100, 10: 100, 20: 100, 50: 100}).to_banknotes())
+        storages.append(SlowDiskStorage(JsonFileBanknoteStorage(JsonFileStorage(path)), latency))
+
+    return storages
+
+async def measure_loop_lag(statistics: SessionsStatistics, stop: asyncio.Event) -> None:
+    """Checks how late the event loop wakes up a task sleeping for one millisecond."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        statistics.max_loop_lag = max(statistics.max_loop_lag, time.perf_counter() - start - 0.001)
+
+async def run_sync_session(teller_machine: TellerMachine, operations: int, statistics: SessionsStatistics) -> None:
+    card = create_card()
+    for _ in range(operations):
+        statistics.start_operation()
+        teller_machine.deposit_cash([Banknote(10), Banknote(20)], card)
+        teller_machine.withdraw_cash(Decimal(30), card)
+        teller_machine.pay_for_the_phone("+375291234567", Decimal(1), card)
+        statistics.finish_operation()
+        await asyncio.sleep(0) # A session gives control back between operations, but storage I/O blocks the loop
+    statistics.completed += 1
+
+async def run_async_session(teller_machine: AsyncTellerMachine, operations: int, statistics: SessionsStatistics) -> None:
+    card = create_card()
+    for _ in range(operations):
+        statistics.start_operation()
+        await teller_machine.deposit_cash([Banknote(10), Banknote(20)], card)
+        await teller_machine.withdraw_cash(Decimal(30), card)
+        await teller_machine.pay_for_the_phone("+375291234567", Decimal(1), card)
+        statistics.finish_operation()
+    statistics.completed += 1
+
+async def run_sessions(mode: str, storages: list[IStorage], sessions: int, operations: int, workers: int) -> dict:
+    statistics = SessionsStatistics()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    if mode == "sync":
+        teller_machines = [TellerMachine(BanknoteStorage(storage)) for storage in storages]
+        session_coroutines = [run_sync_session(teller_machines[index % len(storages)], operations, statistics) for index in range(sessions)]
+    else:
+        teller_machines = [AsyncTellerMachine(AsyncBanknoteStorage(ThreadedAsyncStorage(storage, executor))) for storage in storages]
+        session_coroutines = [run_async_session(teller_machines[index % len(storages)], operations, statistics) for index in range(sessions)]
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(statistics, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*session_coroutines)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    executor.shutdown()
+
+    return {"benchmark": "teller_machine_sessions", "mode": mode, "machines": len(storages), "sessions": sessions,
+            "operations_per_session": operations * 3, "seconds": round(elapsed, 4),
+            "sessions_per_second": round(statistics.completed / elapsed, 2),
+            "peak_concurrent_sessions": statistics.peak_in_progress,
+            "max_event_loop_lag_ms": round(statistics.max_loop_lag * 1000, 2)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=2, help="Deposit, withdraw and phone payment rounds per session.")
+    parser.add_argument("--disk-latency", type=float, default=0.002, help="Emulated latency of every load and save in seconds.")
+    parser.add_argument("--workers", type=int, default=32, help="Threads for storage I/O of the asynchronous path.")
+    arguments = parser.parse_args()
+
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as directory:
+            storages = create_file_storages(directory, arguments.machines, arguments.disk_latency)
+            result = asyncio.run(run_sessions(mode, storages, arguments.sessions, arguments.operations, arguments.workers))
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
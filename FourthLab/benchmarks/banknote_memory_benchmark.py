@@ -0,0 +1,47 @@
+"""Measures memory and time of loading a large cassette through JsonFileBanknoteStorage.
+
+Run from the FourthLab folder: python -m benchmarks.banknote_memory_benchmark"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from src.persistence.banknote_storage import JsonFileBanknoteStorage
+from src.persistence.data_storage import JsonFileStorage
+
+DENOMINATIONS = ("5", "10", "20", "50", "100", "200")
+
+def measure_load(path: str) -> dict:
+    storage = JsonFileBanknoteStorage(JsonFileStorage(path))
+    gc.collect()
+    start = time.perf_counter()
+    banknotes = storage.load()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    banknotes = None
+    banknotes = storage.load()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"load_seconds": round(elapsed, 4), "retained_bytes": current, "peak_bytes": peak,
+            "retained_bytes_per_banknote": round(current / len(banknotes), 1)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--banknotes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    arguments = parser.parse_args()
+
+    randomizer = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "atm_data.json")
+        for banknotes_count in arguments.banknotes:
+            JsonFileStorage(path).save([randomizer.choice(DENOMINATIONS) for _ in range(banknotes_count)])
+            result = {"benchmark": "json_file_banknote_storage_load", "banknotes": banknotes_count}
+            result.update(measure_load(path))
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compares load and save latency of the JSON list, JSON counts and binary banknote file formats.
+
+Run from the FourthLab folder: python -m benchmarks.cassette_format_benchmark"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.cassette_generators import generate_even_cassette
+from src.persistence.banknote_storage import JsonFileBanknoteStorage
+from src.persistence.binary_cassette_storage import BinaryCassetteStorage
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import JsonFileCassetteStorage
+from src.persistence.data_storage import JsonFileStorage
+
+def create_formats(directory: str) -> dict:
+    """Returns storages and the data they save by the format name."""
+    list_path = os.path.join(directory, "atm_data_list.json")
+    counts_path = os.path.join(directory, "atm_data_counts.json")
+    binary_path = os.path.join(directory, "atm_data.bin")
+    return {
+        "json_list": (JsonFileBanknoteStorage(JsonFileStorage(list_path)), list_path, Cassette.to_banknotes),
+        "json_counts": (JsonFileCassetteStorage(JsonFileStorage(counts_path)), counts_path, lambda cassette: cassette),
+        "binary": (BinaryCassetteStorage(binary_path, atomic=False), binary_path, lambda cassette: cassette),
+    }
+
+def measure(function, repeat: int) -> float:
+    """Returns the best time of several runs in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--banknotes", type=int, nargs="+", default=[10 ** exponent for exponent in range(3, 8)])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-list-banknotes", type=int, default=10 ** 6,
+                        help="The JSON list format needs gigabytes of memory for larger cassettes, so it's skipped above this count.")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for banknotes_count in arguments.banknotes:
+            cassette = generate_even_cassette(banknotes_count)
+            for format_name, (storage, path, convert) in create_formats(directory).items():
+                if format_name == "json_list" and banknotes_count > arguments.max_list_banknotes:
+                    continue
+
+                data = convert(cassette)
+                save_seconds = measure(lambda: storage.save(data), arguments.repeat)
+                load_seconds = measure(storage.load, arguments.repeat)
+                print(json.dumps({"benchmark": "cassette_format", "format": format_name, "banknotes": banknotes_count,
+                                  "file_bytes": os.path.getsize(path), "save_seconds": round(save_seconds, 6),
+                                  "load_seconds": round(load_seconds, 6)}))
+                data = None
+
+if __name__ == "__main__":
+    main()
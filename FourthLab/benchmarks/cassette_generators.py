@@ -0,0 +1,38 @@
+"""Generates synthetic cassettes and bank cards for the benchmarks."""
+import random
+from datetime import datetime
+from decimal import Decimal
+from src.persistence.banknote import Banknote
+from src.persistence.cassette import Cassette
+
+DENOMINATIONS = (5, 10, 20, 50, 100, 200)
+
+def generate_even_cassette(banknotes_count: int, denominations: tuple = DENOMINATIONS) -> Cassette:
+    """Splits the banknotes evenly between denominations, the remainder goes to the smallest one."""
+    counts = {denomination: banknotes_count // len(denominations) for denomination in denominations}
+    counts[denominations[0]] += banknotes_count % len(denominations)
+    return Cassette(counts)
+
+def generate_random_cassette(banknotes_count: int, seed: int = 0, denominations: tuple = DENOMINATIONS) -> Cassette:
+    """Draws every banknote denomination at random, so counts differ like in a cassette after a day of deposits."""
+    randomizer = random.Random(seed)
+    cassette = Cassette()
+    for denomination in randomizer.choices(denominations, k=banknotes_count):
+        cassette.add(denomination)
+
+    return cassette
+
+def generate_banknotes(banknotes_count: int, seed: int = 0, denominations: tuple = DENOMINATIONS) -> list[Banknote]:
+    randomizer = random.Random(seed)
+    return [Banknote(denomination) for denomination in randomizer.choices(denominations, k=banknotes_count)]
+
+def generate_card_json(index: int, balance: Decimal = Decimal(1000)) -> dict:
+    """Returns the card in the bank_card.json format."""
+    return {
+        "card_number": (index % 10 ** 16).__str__().zfill(16),
+        "expiration_date": datetime(2030, 1 + index % 12, 1).strftime('%d-%m-%Y'),
+        "username": "Client " + index.__str__(),
+        "cvc": (index % 1000).__str__().zfill(3),
+        "password": (index % 10000).__str__().zfill(4),
+        "balance": balance.__str__(),
+    }
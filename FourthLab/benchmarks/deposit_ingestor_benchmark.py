@@ -0,0 +1,67 @@
+"""Measures a bulk deposit from a counting machine through the teller machine and through DepositIngestor.
+
+The teller machine path parses every value into a banknote, deposits the list and sums it again. The ingestor
+counts the values per denomination and deposits the counts once.
+
+Run from the FourthLab folder: python -m benchmarks.deposit_ingestor_benchmark"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.cassette_generators import DENOMINATIONS
+from src.deposit_ingestor import DepositIngestor
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.card_account import CardAccount
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import CassetteBanknoteStorage
+from src.persistence.data_storage import InMemoryStorage
+from src.teller_machine import TellerMachine
+
+VALUES_PER_LINE = 100
+
+def measure(run, repeat: int) -> float:
+    """Returns the median time of the runs in seconds. Every run gets a new card and an empty storage."""
+    times = []
+    for _ in range(repeat):
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette()))
+        card = BankCard("1".zfill(16), datetime(2030, 1, 1).date(), "Benchmark Client", "111", "1111", CardAccount())
+        start = time.perf_counter()
+        run(storage, card)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banknotes", type=int, nargs="+", default=[10 ** 3, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    ingestor = DepositIngestor(DENOMINATIONS)
+    randomizer = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "deposit.txt")
+        for banknotes_count in arguments.banknotes:
+            values = [denomination.__str__() for denomination in randomizer.choices(DENOMINATIONS, k=banknotes_count)]
+            string = " ".join(values)
+            with open(path, 'w') as file:
+                for start in range(0, banknotes_count, VALUES_PER_LINE):
+                    file.write(" ".join(values[start:start + VALUES_PER_LINE]) + "\n")
+
+            cases = {
+                "teller_machine_str_to_banknotes": lambda storage, card: TellerMachine(storage).deposit_cash(Banknote.str_to_banknotes(string), card),
+                "ingestor_values": lambda storage, card: ingestor.deposit_values(values, storage, card),
+                "ingestor_file": lambda storage, card: ingestor.deposit_file(path, storage, card),
+            }
+            for operation, run in cases.items():
+                seconds = measure(run, arguments.repeat)
+                print(json.dumps({"benchmark": "bulk_deposit", "operation": operation, "banknotes": banknotes_count,
+                                  "median_seconds": round(seconds, 5)}))
+
+if __name__ == "__main__":
+    main()
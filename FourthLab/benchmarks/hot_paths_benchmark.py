@@ -0,0 +1,147 @@
+"""Measures storage and dispensing hot paths across cassette sizes and storage backends.
+
+Every case prints one JSON line, so results of two runs can be saved and compared:
+    python -m benchmarks.hot_paths_benchmark --output before.jsonl
+    python -m benchmarks.hot_paths_benchmark --output after.jsonl --compare before.jsonl
+
+Run from the FourthLab folder."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from benchmarks.cassette_generators import generate_random_cassette, generate_banknotes, generate_card_json
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote_storage import BanknoteStorage, JsonFileBanknoteStorage
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import CassetteBanknoteStorage, JsonFileCassetteStorage
+from src.persistence.data_storage import InMemoryStorage, JsonFileStorage
+
+MEMORY_BACKEND = "memory"
+JSON_BACKEND = "json"
+BACKENDS = (MEMORY_BACKEND, JSON_BACKEND)
+
+BANKNOTE_LIST_STORAGE = "banknote_list"
+CASSETTE_STORAGE = "cassette"
+BANKNOTE_STORAGES = (BANKNOTE_LIST_STORAGE, CASSETTE_STORAGE)
+
+WITHDRAW_AMOUNT = Decimal(385)
+DEPOSIT_BANKNOTES_COUNT = 10
+CARDS_COUNT = 1000
+
+def measure(run, setup=None, repeat: int = 5) -> list[float]:
+    """Returns times of the runs in seconds. Setup result is passed to the run and isn't measured."""
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+def create_banknote_storage(storage_type: str, backend: str, cassette: Cassette, path: str):
+    if storage_type == BANKNOTE_LIST_STORAGE:
+        if backend == MEMORY_BACKEND:
+            return BanknoteStorage(InMemoryStorage(cassette.to_banknotes()))
+        JsonFileStorage(path).save(cassette.to_banknotes())
+        return BanknoteStorage(JsonFileBanknoteStorage(JsonFileStorage(path)))
+
+    if backend == MEMORY_BACKEND:
+        return CassetteBanknoteStorage(InMemoryStorage(cassette.copy()))
+    JsonFileStorage(path).save(cassette.to_json())
+    return CassetteBanknoteStorage(JsonFileCassetteStorage(JsonFileStorage(path)))
+
+def run_banknote_storage_cases(cassette: Cassette, path: str, repeat: int):
+    deposit = generate_banknotes(DEPOSIT_BANKNOTES_COUNT, seed=1)
+    for storage_type in BANKNOTE_STORAGES:
+        for backend in BACKENDS:
+            setup = lambda: create_banknote_storage(storage_type, backend, cassette, path)
+            cases = {
+                "get_cash_available": lambda storage: storage.get_cash_available(),
+                "withdraw_banknotes": lambda storage: storage.withdraw_banknotes(WITHDRAW_AMOUNT),
+                "deposit_banknotes": lambda storage: storage.deposit_banknotes(deposit),
+            }
+            for operation, run in cases.items():
+                yield {"operation": operation, "storage": storage_type, "backend": backend}, measure(run, setup, repeat)
+
+def run_json_file_storage_cases(cassette: Cassette, path: str, repeat: int):
+    storage = JsonFileStorage(path)
+    for data_format, data in (("banknote_list", [banknote.value.__str__() for banknote in cassette.to_banknotes()]), ("counts", cassette.to_json())):
+        yield {"operation": "json_file_storage_save", "format": data_format}, measure(lambda _: storage.save(data), repeat=repeat)
+        yield {"operation": "json_file_storage_load", "format": data_format}, measure(lambda _: storage.load(), repeat=repeat)
+
+def run_bank_card_cases(repeat: int):
+    cards = [generate_card_json(index) for index in range(CARDS_COUNT)]
+    def load_cards(_) -> None:
+        for card in cards:
+            BankCard.from_json(card)
+
+    yield {"operation": "bank_card_from_json", "cards": CARDS_COUNT}, measure(load_cards, repeat=repeat)
+
+def summarize(case: dict, banknotes_count: int, times: list[float]) -> dict:
+    result = {"benchmark": "hot_paths"}
+    result.update(case)
+    if banknotes_count is not None:
+        result["banknotes"] = banknotes_count
+    result.update({"runs": len(times), "min_seconds": round(min(times), 7),
+                   "median_seconds": round(statistics.median(times), 7), "mean_seconds": round(statistics.fmean(times), 7)})
+    return result
+
+def get_case_key(result: dict) -> tuple:
+    return tuple(sorted((key, value) for key, value in result.items() if not key.endswith("_seconds") and key not in ("runs", "python")))
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Prints the median time ratio of every case to the same case of the baseline run."""
+    with open(baseline_path) as file:
+        baseline = {get_case_key(result): result for result in map(json.loads, file) if result.get("benchmark") == "hot_paths"}
+
+    for result in results:
+        baseline_result = baseline.get(get_case_key(result))
+        if baseline_result is None or baseline_result["median_seconds"] == 0:
+            continue
+
+        comparison = {key: value for key, value in result.items() if not key.endswith("_seconds") and key != "runs"}
+        comparison.update({"benchmark": "hot_paths_comparison", "baseline_median_seconds": baseline_result["median_seconds"],
+                           "median_seconds": result["median_seconds"],
+                           "speedup": round(baseline_result["median_seconds"] / max(result["median_seconds"], 1e-9), 3)})
+        print(json.dumps(comparison))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banknotes", type=int, nargs="+", default=[10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Path of the JSON lines file to write the results to as well.")
+    parser.add_argument("--compare", help="Path of the results of a previous run to compare with.")
+    arguments = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "atm_data.json")
+        for banknotes_count in arguments.banknotes:
+            cassette = generate_random_cassette(banknotes_count, arguments.seed)
+            for case, times in run_banknote_storage_cases(cassette, path, arguments.repeat):
+                results.append(summarize(case, banknotes_count, times))
+                print(json.dumps(results[-1]))
+            for case, times in run_json_file_storage_cases(cassette, path, arguments.repeat):
+                results.append(summarize(case, banknotes_count, times))
+                print(json.dumps(results[-1]))
+
+        for case, times in run_bank_card_cases(arguments.repeat):
+            results.append(summarize(case, None, times))
+            print(json.dumps(results[-1]))
+
+    for result in results:
+        result["python"] = platform.python_version()
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            file.writelines(json.dumps(result) + "\n" for result in results)
+    if arguments.compare is not None:
+        compare(results, arguments.compare)
+
+if __name__ == "__main__":
+    main()
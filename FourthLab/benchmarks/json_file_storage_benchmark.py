@@ -0,0 +1,62 @@
+"""Compares transactions per second of in-place, atomic and group commit JsonFileStorage saves.
+
+Run from the FourthLab folder: python -m benchmarks.json_file_storage_benchmark"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from src.persistence.cassette import Cassette
+from src.persistence.data_storage import IStorage, JsonFileStorage, GroupCommitJsonFileStorage
+
+def run_transactions(storage: IStorage, data, threads_count: int, transactions_per_thread: int) -> float:
+    """Saves data from several threads at once and returns the elapsed time in seconds."""
+    def work() -> None:
+        for _ in range(transactions_per_thread):
+            storage.save(data)
+
+    threads = [threading.Thread(target=work) for _ in range(threads_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if isinstance(storage, GroupCommitJsonFileStorage):
+        storage.flush()
+
+    return time.perf_counter() - start
+
+def create_storages(path: str, commit_window: float) -> dict:
+    return {
+        "in_place": lambda: JsonFileStorage(path),
+        "atomic": lambda: JsonFileStorage(path, atomic=True),
+        "group_commit": lambda: GroupCommitJsonFileStorage(JsonFileStorage(path, atomic=True), commit_window),
+        "group_commit_no_wait": lambda: GroupCommitJsonFileStorage(JsonFileStorage(path, atomic=True), commit_window, wait_for_durability=False),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--transactions", type=int, default=200, help="Transactions per thread.")
+    parser.add_argument("--commit-window", type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    data = Cassette({5: 10000, 10: 10000, 20: 10000, 50: 5000, 100: 5000}).to_json()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "atm_data.json")
+        for threads_count in arguments.threads:
+            for mode, create_storage in create_storages(path, arguments.commit_window).items():
+                storage = create_storage()
+                elapsed = run_transactions(storage, data, threads_count, arguments.transactions)
+                transactions = threads_count * arguments.transactions
+                result = {"benchmark": "json_file_storage_save", "mode": mode, "threads": threads_count,
+                          "transactions": transactions, "seconds": round(elapsed, 6),
+                          "transactions_per_second": round(transactions / elapsed, 1)}
+                if isinstance(storage, GroupCommitJsonFileStorage):
+                    result["durable_writes"] = storage.commits_count
+                    storage.close()
+                print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measures throughput of the JSON-RPC server with many concurrent client sessions on one event loop.
+
+The server and the clients share one process and one core. Every client inserts its own card, enters the PIN
+and sends rounds of pipelined deposit, withdraw, phone payment and balance requests.
+
+Run from the FourthLab folder: python -m benchmarks.json_rpc_server_benchmark"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from src.async_teller_machine import AsyncTellerMachine
+from src.persistence.async_banknote_storage import AsyncBanknoteStorage
+from src.persistence.async_data_storage import AsyncInMemoryStorage
+from src.persistence.bank_card import BankCard
+from src.persistence.card_account import CardAccount
+from src.persistence.card_repository import IndexedCardRepository
+from src.persistence.cassette import Cassette
+from src.server.json_rpc_server import TellerMachineServer
+
+# Unix socket connects fail instead of waiting when the accept queue is full, so clients connect in bursts.
+CONNECT_BURST = 512
+
+ROUND = (("deposit", {"banknotes": ["10", "20"]}), ("withdraw", {"amount": "30"}),
+         ("pay_phone", {"phone_number": "+375291234567", "amount": "1"}), ("get_balance", {}))
+
+def create_card_number(client: int) -> str:
+    return client.__str__().zfill(16)
+
+def fill_repository(repository: IndexedCardRepository, clients: int) -> None:
+    for client in range(clients):
+        account = CardAccount()
+        account.deposit_cash(Decimal(10 ** 6))
+        repository.add(BankCard(create_card_number(client), datetime(2030, 1, 1).date(), "Benchmark Client", "111", "1111", account))
+
+def encode_request(request_id: int, method: str, params) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).encode() + b"\n"
+
+async def run_client(path: str, client: int, rounds: int, pipeline: bool, latencies: list[float], connecting: asyncio.Semaphore) -> int:
+    """Runs one session and returns the number of error responses."""
+    async with connecting:
+        reader, writer = await asyncio.open_unix_connection(path)
+    requests = [("insert_card", [create_card_number(client)]), ("enter_pin", ["1111"])] + list(ROUND) * rounds
+    errors = 0
+    if pipeline:
+        start = time.perf_counter()
+        writer.write(b"".join(encode_request(request_id, method, params) for request_id, (method, params) in enumerate(requests)))
+        for _ in requests:
+            errors += "error" in json.loads(await reader.readline())
+        latencies.append((time.perf_counter() - start) / len(requests))
+    else:
+        for request_id, (method, params) in enumerate(requests):
+            start = time.perf_counter()
+            writer.write(encode_request(request_id, method, params))
+            errors += "error" in json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+async def run_benchmark(clients: int, rounds: int, pipeline: bool, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        repository = IndexedCardRepository(os.path.join(directory, "cards"))
+        fill_repository(repository, clients)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        teller_machine = AsyncTellerMachine(AsyncBanknoteStorage(AsyncInMemoryStorage(Cassette({10: 100, 20: 100}).to_banknotes())))
+        server = TellerMachineServer(teller_machine, repository, executor=executor, max_connections=clients)
+        path = os.path.join(directory, "atm.sock")
+        await server.start_unix(path)
+
+        latencies = []
+        connecting = asyncio.Semaphore(CONNECT_BURST)
+        start = time.perf_counter()
+        errors = await asyncio.gather(*(run_client(path, client, rounds, pipeline, latencies, connecting) for client in range(clients)))
+        elapsed = time.perf_counter() - start
+
+        while server.connections:
+            await asyncio.sleep(0.01)
+        await server.close()
+        executor.shutdown()
+        repository.close()
+
+    latencies.sort()
+    return {"benchmark": "json_rpc_server", "clients": clients, "pipeline": pipeline, "requests": server.requests,
+            "errors": sum(errors), "seconds": round(elapsed, 4), "requests_per_second": round(server.requests / elapsed, 1),
+            # Pipelined sessions send all requests at once, so their latency is the session time per request.
+            "p50_request_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "p99_request_ms": round(latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000, 3)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=5, help="Deposit, withdraw, phone payment and balance rounds per session.")
+    parser.add_argument("--workers", type=int, default=4, help="Threads for card repository I/O.")
+    arguments = parser.parse_args()
+
+    for clients in arguments.clients:
+        for pipeline in (False, True):
+            print(json.dumps(asyncio.run(run_benchmark(clients, arguments.rounds, pipeline, arguments.workers))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measures money arithmetic on the hot paths: summing banknotes, dispensing and card balance changes.
+
+Only public methods are called, so the benchmark runs on any revision, and results before and after
+a change can be compared line by line.
+
+Run from the FourthLab folder: python -m benchmarks.money_benchmark"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from decimal import Decimal
+from benchmarks.cassette_generators import generate_banknotes
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote_storage import BanknoteStorage
+from src.persistence.card_account import CardAccount
+from src.persistence.data_storage import InMemoryStorage
+from src.teller_machine import TellerMachine
+
+WITHDRAW_AMOUNT = Decimal(385)
+ACCOUNT_OPERATIONS_COUNT = 10 ** 5
+
+def measure(run, setup, repeat: int) -> float:
+    """Returns the median time of the runs in seconds. Setup result is passed to the run and isn't measured."""
+    times = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+def create_card() -> BankCard:
+    return BankCard("1".zfill(16), datetime(2030, 1, 1).date(), "Benchmark Client", "111", "1111", CardAccount())
+
+def change_balance(account: CardAccount) -> None:
+    amount = Decimal("12.5")
+    for _ in range(ACCOUNT_OPERATIONS_COUNT):
+        account.deposit_cash(amount)
+        account.withdraw_cash(amount)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banknotes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    for banknotes_count in arguments.banknotes:
+        banknotes = generate_banknotes(banknotes_count)
+        cases = {
+            "teller_machine_deposit_cash": (lambda _: TellerMachine(BanknoteStorage(InMemoryStorage([]))),
+                                            lambda teller_machine: teller_machine.deposit_cash(banknotes, create_card())),
+            "get_cash_available": (lambda _: BanknoteStorage(InMemoryStorage(list(banknotes))),
+                                   lambda storage: storage.get_cash_available()),
+            "withdraw_banknotes": (lambda _: BanknoteStorage(InMemoryStorage(list(banknotes))),
+                                   lambda storage: storage.withdraw_banknotes(WITHDRAW_AMOUNT)),
+        }
+        for operation, (setup, run) in cases.items():
+            seconds = measure(run, lambda: setup(None), arguments.repeat)
+            print(json.dumps({"benchmark": "money", "operation": operation, "banknotes": banknotes_count, "median_seconds": round(seconds, 5)}))
+
+    seconds = measure(change_balance, CardAccount, arguments.repeat)
+    print(json.dumps({"benchmark": "money", "operation": "card_account_deposit_withdraw", "operations": 2 * ACCOUNT_OPERATIONS_COUNT,
+                      "median_seconds": round(seconds, 5)}))
+
+if __name__ == "__main__":
+    main()
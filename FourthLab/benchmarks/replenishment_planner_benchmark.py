@@ -0,0 +1,35 @@
+"""Measures planning time of the replenishment planner for fleets of different sizes.
+
+Run from the FourthLab folder: python -m benchmarks.replenishment_planner_benchmark"""
+import argparse
+import json
+import time
+import numpy as np
+from benchmarks.cassette_generators import DENOMINATIONS
+from src.planning.replenishment_planner import FleetState, WithdrawalHistory, ReplenishmentPlanner, ReplenishmentPolicy
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--machines", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--periods", type=int, default=28)
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    randomizer = np.random.default_rng(0)
+    planner = ReplenishmentPlanner(ReplenishmentPolicy(service_level=0.95, horizon_periods=7, capacity=2000, machine_capacity=8000, refill_unit=100))
+    for machines in arguments.machines:
+        state = FleetState(["atm-" + index.__str__() for index in range(machines)], list(DENOMINATIONS),
+                           randomizer.integers(0, 2000, (machines, len(DENOMINATIONS))))
+        history = WithdrawalHistory(randomizer.poisson(30, (machines, arguments.periods, len(DENOMINATIONS))))
+        times = []
+        for _ in range(arguments.repeat):
+            start = time.perf_counter()
+            plan = planner.plan(state, history)
+            times.append(time.perf_counter() - start)
+
+        print(json.dumps({"benchmark": "replenishment_planner", "machines": machines, "periods": arguments.periods,
+                          "denominations": len(DENOMINATIONS), "best_seconds": round(min(times), 6),
+                          "banknotes_to_load": int(plan.refill.sum())}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measures cold-start time of every front-end from a new interpreter up to the created controller.
+
+Every run starts a new process, so nothing is shared between runs except the operating system file cache.
+The eager mode imports both controllers the way main.py used to before choosing one.
+
+Run from the FourthLab folder: python -m benchmarks.startup_benchmark"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from src.controllers.controller_registry import CONTROLLERS
+
+FOURTH_LAB_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = ("from src.controllers.console_teller_machine_controller import ConsoleTellerMachineController\n"
+                 "from src.controllers.gui_teller_machine_controller import GUITellerMachineController\n")
+
+def create_programs() -> dict[str, str]:
+    """Returns the code to run by the mode name."""
+    programs = {"interpreter": "pass", "eager": EAGER_IMPORTS + "ConsoleTellerMachineController()"}
+    for name in CONTROLLERS.names:
+        programs[name] = "from src.controllers.controller_registry import CONTROLLERS\nCONTROLLERS.create(" + json.dumps(name) + ")"
+
+    return programs
+
+def measure_start(program: str) -> tuple[float, str]:
+    """Returns seconds the program took and the last line of its error output, if it failed."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", program], cwd=FOURTH_LAB_DIRECTORY, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    error = process.stderr.strip().splitlines()[-1] if process.returncode != 0 and process.stderr.strip() else None
+    return seconds, error
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=None, help="Modes to measure, all by default.")
+    arguments = parser.parse_args()
+
+    programs = create_programs()
+    for mode in arguments.modes or programs:
+        timings = []
+        error = None
+        for _ in range(arguments.repeat):
+            seconds, error = measure_start(programs[mode])
+            if error is not None:
+                break
+            timings.append(seconds)
+
+        result = {"benchmark": "startup", "mode": mode, "runs": len(timings)}
+        if timings:
+            result.update({"min_seconds": round(min(timings), 4), "median_seconds": round(statistics.median(timings), 4)})
+        if error is not None:
+            result["error"] = error
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,9 @@
 import sys
-from src.controllers.teller_machine_controller_interface import ITellerMachineController
-from src.controllers.console_teller_machine_controller import ConsoleTellerMachineController
-from src.controllers.gui_teller_machine_controller import GUITellerMachineController
+from src.controllers.controller_registry import CONTROLLERS
 
 if __name__ == "__main__":
-    controller: ITellerMachineController = None
-    if sys.argv[1] == "gui":
-            controller = GUITellerMachineController()
-    elif sys.argv[1] == "console":
-            controller = ConsoleTellerMachineController()
-    else:
-        print("Available options are: 'console' and 'gui'")
+    if len(sys.argv) < 2 or sys.argv[1] not in CONTROLLERS.names:
+        print("Available options are: " + ", ".join("'" + name + "'" for name in CONTROLLERS.names))
         sys.exit(2)
 
-    controller.start()
\ No newline at end of file
+    CONTROLLERS.create(sys.argv[1]).start()
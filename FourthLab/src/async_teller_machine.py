@@ -0,0 +1,69 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from decimal import Decimal
+from src.persistence.async_banknote_storage import IAsyncBanknoteStorage
+from src.persistence.banknote_storage import NotEnoughMoneyInStorageException
+from src.persistence.banknote import Banknote
+from src.persistence.money import Money
+from src.persistence.bank_card import BankCard
+
+class IAsyncTellerMachine(ABC):
+    """Contains asynchronous methods for teller machine."""
+    @abstractmethod
+    async def get_card_balance(self, card: BankCard) -> Money:
+        pass
+
+    @abstractmethod
+    async def withdraw_cash(self, amount: Decimal, card: BankCard) -> list[Banknote]:
+        pass
+
+    @abstractmethod
+    async def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Money:
+        pass
+
+    @abstractmethod
+    async def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
+        pass
+
+class AsyncTellerMachine(IAsyncTellerMachine):
+    """Implements methods for operationing with teller machine without blocking the event loop.
+
+    Card accounts may be backed by files, so their calls run in the executor, the default one of the loop,
+    if it isn't passed."""
+    def __init__(self, banknote_storage: IAsyncBanknoteStorage, executor: Executor = None) -> None:
+        self.__storage = banknote_storage
+        self.__executor = executor
+
+    async def get_card_balance(self, card: BankCard) -> Money:
+        return await self.__run(card.card_account.view_balance)
+
+    async def withdraw_cash(self, amount: Decimal, card: BankCard) -> list[Banknote]:
+        """Dispenses exactly the amount and charges it to the card. Banknotes are put back, if the amount
+        can't be dispensed exactly or the card can't be charged."""
+        banknotes = await self.__storage.withdraw_banknotes(amount)
+        try:
+            if self.__calculate_cash_amount(banknotes) != amount:
+                raise NotEnoughMoneyInStorageException("Storage can't dispense exactly", amount)
+            await self.__run(card.withdraw_cash, amount)
+        except Exception:
+            if banknotes:
+                await self.__storage.deposit_banknotes(banknotes)
+            raise
+
+        return banknotes
+
+    async def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Money:
+        await self.__storage.deposit_banknotes(cash)
+        amount = self.__calculate_cash_amount(cash)
+        await self.__run(card.deposit_cash, amount)
+        return amount
+
+    async def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
+        await self.__run(card.withdraw_cash, amount)
+
+    async def __run(self, function, *arguments):
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, function, *arguments)
+
+    def __calculate_cash_amount(self, banknotes: list[Banknote]) -> Money:
+        return Banknote.calculate_total(banknotes)
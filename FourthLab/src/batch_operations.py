@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from enum import Enum
+from src.persistence.banknote import Banknote
+from src.persistence.bank_card import BankCard
+from src.persistence.card_account import NotEnoughMoneyOnBalanceException
+
+class BatchMode(Enum):
+    ALL_OR_NOTHING = 1
+    BEST_EFFORT = 2
+
+class IBatchOperation(ABC):
+    """Contains methods for an operation processed by teller machine as a part of a batch."""
+    def __init__(self, card: BankCard) -> None:
+        self.__card = card
+
+    @property
+    def card(self) -> BankCard:
+        return self.__card
+
+    @abstractmethod
+    def apply(self, teller_machine):
+        """Applies operation to the teller machine and returns its result."""
+        pass
+
+    @abstractmethod
+    def revert(self, result) -> None:
+        """Reverts the card changes made by the applied operation."""
+        pass
+
+class WithdrawOperation(IBatchOperation):
+    def __init__(self, card: BankCard, amount: Decimal) -> None:
+        super().__init__(card)
+        self.__amount = amount
+
+    @property
+    def amount(self) -> Decimal:
+        return self.__amount
+
+    def apply(self, teller_machine) -> list[Banknote]:
+        # Card balance is checked first, so a failed withdrawal doesn't take banknotes from the storage
+        if self.card.get_card_balance() < self.__amount:
+            raise NotEnoughMoneyOnBalanceException("Card balance doesn't have", self.__amount, "money to withdraw.")
+
+        return teller_machine.withdraw_cash(self.__amount, self.card)
+
+    def revert(self, result) -> None:
+        self.card.deposit_cash(self.__amount)
+
+class DepositOperation(IBatchOperation):
+    def __init__(self, card: BankCard, banknotes: list[Banknote]) -> None:
+        super().__init__(card)
+        self.__banknotes = banknotes
+
+    @property
+    def banknotes(self) -> list[Banknote]:
+        return self.__banknotes
+
+    def apply(self, teller_machine) -> Decimal:
+        return teller_machine.deposit_cash(self.__banknotes, self.card)
+
+    def revert(self, result) -> None:
+        self.card.withdraw_cash(result)
+
+class PhonePaymentOperation(IBatchOperation):
+    def __init__(self, card: BankCard, phone_number: str, amount: Decimal) -> None:
+        super().__init__(card)
+        self.__phone_number = phone_number
+        self.__amount = amount
+
+    @property
+    def phone_number(self) -> str:
+        return self.__phone_number
+
+    @property
+    def amount(self) -> Decimal:
+        return self.__amount
+
+    def apply(self, teller_machine) -> None:
+        return teller_machine.pay_for_the_phone(self.__phone_number, self.__amount, self.card)
+
+    def revert(self, result) -> None:
+        self.card.deposit_cash(self.__amount)
+
+class OperationResult:
+    """Represents the result of one operation of the batch."""
+    def __init__(self, operation: IBatchOperation, result = None, error: Exception = None) -> None:
+        self.__operation = operation
+        self.__result = result
+        self.__error = error
+
+    @property
+    def operation(self) -> IBatchOperation:
+        return self.__operation
+
+    @property
+    def result(self):
+        return self.__result
+
+    @property
+    def error(self) -> Exception:
+        return self.__error
+
+    @property
+    def succeeded(self) -> bool:
+        return self.__error is None
+
+class BatchResult:
+    """Represents results of all operations of the batch."""
+    def __init__(self, results: list[OperationResult], committed: bool) -> None:
+        self.__results = results
+        self.__committed = committed
+
+    @property
+    def results(self) -> list[OperationResult]:
+        return self.__results
+
+    @property
+    def committed(self) -> bool:
+        """Whether changes of the batch are persisted. All-or-nothing batch isn't committed if any operation fails."""
+        return self.__committed
+
+    @property
+    def failures(self) -> list[OperationResult]:
+        return [result for result in self.__results if not result.succeeded]
+
+class BatchIsRolledBackException(Exception):
+    """Exception raised inside all-or-nothing batch to discard its changes."""
+    pass
+
+class AtomicBatchIsNotSupportedException(Exception):
+    """Exception raised when all-or-nothing batch is requested from a teller machine, whose storage can't discard changes."""
+    pass
@@ -1,46 +1,61 @@
 import os
 from decimal import Decimal, InvalidOperation
 from src.persistence.bank_card import CardState
-from src.persistence.banknote_storage import BanknoteStorage
 from src.persistence.banknote_storage import NotEnoughMoneyInStorageException
 from src.persistence.card_account import NotEnoughMoneyOnBalanceException
 from src.persistence.banknote import InvalidBanknoteValueException
 from src.persistence.banknote import Banknote
+from src.persistence.money import InvalidMoneyAmountException
 from src.persistence.bank_card import BankCard
 from src.teller_machine import TellerMachine
-from src.persistence.banknote_storage import JsonFileStorage, JsonFileBanknoteStorage
+from src.persistence.data_storage import JsonFileStorage, CachingStorage
+from src.persistence.cassette_storage import CassetteBanknoteStorage, JsonFileCassetteStorage
 from src.controllers.teller_machine_controller_interface import ITellerMachineController
+from src.instrumentation.instrumented import Instrumentation
+from src.recording.transaction_recorder import TransactionRecorder
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
 
 BANKNOTE_STORAGE_FILE = "atm_data.json"
 BANK_CARD_FILE = "bank_card.json"
+PIN_LOCKOUTS_FILE = "pin_lockouts.json"
 LEAVE_CHARACTER = "q"
 
 class ConsoleTellerMachineController(ITellerMachineController):
     __inserted_card: BankCard
 
     def __init__(self) -> None:
+        self.__instrumentation = Instrumentation.from_environment()
         file_path = os.path.join(os.path.dirname(__file__), BANKNOTE_STORAGE_FILE)
-        storage = BanknoteStorage(JsonFileBanknoteStorage(JsonFileStorage(file_path)))
-        self.__teller_machine = TellerMachine(storage)
+        file_storage = self.__instrumentation.instrument_storage(JsonFileStorage(file_path, atomic=True), "banknote_file")
+        cassette_storage = CachingStorage(JsonFileCassetteStorage(file_storage), file_path)
+        storage = CassetteBanknoteStorage(cassette_storage)
+        self.__recorder = TransactionRecorder.from_environment(cassette_storage)
+        teller_machine = TellerMachine(self.__instrumentation.instrument_banknote_storage(storage))
+        self.__teller_machine = self.__recorder.record_teller_machine(self.__instrumentation.instrument_teller_machine(teller_machine))
         self.__inserted_card = None
         self.__card_file_path = os.path.join(os.path.dirname(__file__), BANK_CARD_FILE)
+        self.__lockout_tracker = PinLockoutTracker(storage=JsonFileStorage(os.path.join(os.path.dirname(__file__), PIN_LOCKOUTS_FILE), atomic=True))
     
     def start(self) -> None:
-        print("\nHello! To start work, please, insert your card.")
-        user_choise = input("1) Insert card\n2) Leave\nInput: ")
-        
-        if user_choise == '1':
-            return self.__insert_card()
+        try:
+            print("\nHello! To start work, please, insert your card.")
+            user_choise = input("1) Insert card\n2) Leave\nInput: ")
+            
+            if user_choise == '1':
+                return self.__insert_card()
+        finally:
+            self.__recorder.close()
+            self.__instrumentation.close()
 
     def __insert_card(self) -> None:
-        self.__inserted_card = BankCard.load_from_file(self.__card_file_path)
+        self.__inserted_card = self.__recorder.insert_card(BankCard.load_from_file(self.__card_file_path))
         self.__access_card()
         self.__work_with_card()
 
     def __access_card(self) -> None:
         password = input("Enter the PIN: ")
         while not self.__inserted_card.is_access_gained():
-            card_state = self.__inserted_card.gain_access(password)
+            card_state = self.__recorder.gain_access(self.__inserted_card, password, self.__lockout_tracker)
             if card_state == CardState.BLOCKED:
                 print("Card is blocked.")
                 return self.__withdraw_card()
@@ -80,6 +95,9 @@ class ConsoleTellerMachineController(ITellerMachineController):
         except InvalidBanknoteValueException:
             print("Invalid banknote value passed. Please, specify only positive numeric values.")
             return self.__deposit_cash()
+        except InvalidMoneyAmountException:
+            print("Invalid banknote value passed. Please, specify values in whole cents.")
+            return self.__deposit_cash()
 
         deposited = self.__teller_machine.deposit_cash(banknotes, self.__inserted_card)
         print("Successfully deposited", deposited)
@@ -99,6 +117,8 @@ class ConsoleTellerMachineController(ITellerMachineController):
             return
         except InvalidOperation:
             print("Invalid amount passed. Please, specify numeric value.")
+        except InvalidMoneyAmountException:
+            print("Invalid amount passed. Please, specify amount in whole cents.")
         except NotEnoughMoneyOnBalanceException:
             print("You haven't got enough money to withdraw. Please, specify smaller amount.")
         except NotEnoughMoneyInStorageException:
@@ -122,6 +142,8 @@ class ConsoleTellerMachineController(ITellerMachineController):
             return
         except InvalidOperation:
             print("Invalid amount passed. Please, specify numeric value.")
+        except InvalidMoneyAmountException:
+            print("Invalid amount passed. Please, specify amount in whole cents.")
         except NotEnoughMoneyOnBalanceException:
             print("You haven't got enough money to withdraw. Please, specify smaller amount.")
             
@@ -129,6 +151,7 @@ class ConsoleTellerMachineController(ITellerMachineController):
 
     def __withdraw_card(self) -> None:
         data = self.__inserted_card.to_json()
-        self.__inserted_card.save_to_file(self.__card_file_path)
+        self.__recorder.withdraw_card(self.__inserted_card)
+        self.__instrumentation.record("bank_card", "save_to_file", self.__inserted_card.save_to_file, self.__card_file_path)
         self.__inserted_card = None
         return self.start()
\ No newline at end of file
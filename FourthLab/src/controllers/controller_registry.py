@@ -0,0 +1,50 @@
+import importlib
+from src.controllers.teller_machine_controller_interface import ITellerMachineController
+
+class ControllerRegistry:
+    """Resolves teller machine controllers by name.
+
+    Controllers are registered as "module:ClassName" paths and imported only when they're requested,
+    so choosing one front-end doesn't pay for importing the others and their libraries."""
+    def __init__(self, controllers: dict[str, str] = None) -> None:
+        self.__paths = dict(controllers or {})
+        self.__classes = {}
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.__paths)
+
+    def register(self, name: str, path: str) -> None:
+        if ":" not in path:
+            raise InvalidControllerPathException("Controller path", path, "must look like 'module:ClassName'.")
+
+        self.__paths[name] = path
+        self.__classes.pop(name, None)
+
+    def get_controller_class(self, name: str) -> type:
+        controller_class = self.__classes.get(name)
+        if controller_class is None:
+            path = self.__paths.get(name)
+            if path is None:
+                raise UnknownControllerException("Unknown controller", name)
+
+            module_name, class_name = path.split(":", 1)
+            controller_class = self.__classes[name] = getattr(importlib.import_module(module_name), class_name)
+
+        return controller_class
+
+    def create(self, name: str) -> ITellerMachineController:
+        return self.get_controller_class(name)()
+
+CONTROLLERS = ControllerRegistry({
+    "console": "src.controllers.console_teller_machine_controller:ConsoleTellerMachineController",
+    "gui": "src.controllers.gui_teller_machine_controller:GUITellerMachineController",
+})
+
+class UnknownControllerException(Exception):
+    """Exception raised when trying to get controller, which isn't registered."""
+    pass
+
+class InvalidControllerPathException(Exception):
+    """Exception raised when trying to register controller with invalid path."""
+    pass
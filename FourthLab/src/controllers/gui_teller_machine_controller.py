@@ -2,19 +2,28 @@ import os
 from decimal import Decimal
 from src.persistence.bank_card import CardState
 from src.controllers.teller_machine_controller_interface import ITellerMachineController
-from src.persistence.banknote_storage import BanknoteStorage, JsonFileBanknoteStorage
-from src.persistence.data_storage import JsonFileStorage
+from src.persistence.cassette_storage import CassetteBanknoteStorage, JsonFileCassetteStorage
+from src.persistence.data_storage import JsonFileStorage, CachingStorage
 from src.persistence.banknote import Banknote
 from src.persistence.bank_card import BankCard
 from src.teller_machine import TellerMachine
+from src.instrumentation.instrumented import Instrumentation
+from src.recording.transaction_recorder import TransactionRecorder
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
 from src.views.teller_machine_views import *
 from kivy.app import App
 from kivy.lang import Builder
 
 BANK_CARD_FILE = "bank_card.json"
+PIN_LOCKOUTS_FILE = "pin_lockouts.json"
 BANKNOTE_STORAGE_FILE = "atm_data.json"
+VIEWS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "views", "teller_machine_views.kv")
 
-Builder.load_file("src/views/teller_machine_views.kv")
+def load_views() -> None:
+    """Compiles the kv rules of the views once per process. It's deferred until the GUI controller is created,
+    so importing this module doesn't cost the compilation."""
+    if VIEWS_FILE not in Builder.files:
+        Builder.load_file(VIEWS_FILE)
 
 class GUITellerMachineController(App, ITellerMachineController):
     __inserted_card: BankCard
@@ -22,12 +31,19 @@ class GUITellerMachineController(App, ITellerMachineController):
     def __init__(self, **kwargs) -> None:
         super().__init__()
         self.__card_file_path = os.path.join(os.path.dirname(__file__), BANK_CARD_FILE)
+        self.__lockout_tracker = PinLockoutTracker(storage=JsonFileStorage(os.path.join(os.path.dirname(__file__), PIN_LOCKOUTS_FILE), atomic=True))
 
-        self.__inserted_card = BankCard.load_from_file(self.__card_file_path)
-            
+        self.__instrumentation = Instrumentation.from_environment()
         file_path = os.path.join(os.path.dirname(__file__), BANKNOTE_STORAGE_FILE)
-        storage = BanknoteStorage(JsonFileBanknoteStorage(JsonFileStorage(file_path)))
-        self.__teller_machine = TellerMachine(storage)
+        file_storage = self.__instrumentation.instrument_storage(JsonFileStorage(file_path, atomic=True), "banknote_file")
+        cassette_storage = CachingStorage(JsonFileCassetteStorage(file_storage), file_path)
+        self.__banknote_storage = CassetteBanknoteStorage(cassette_storage)
+        self.__recorder = TransactionRecorder.from_environment(cassette_storage)
+        teller_machine = TellerMachine(self.__instrumentation.instrument_banknote_storage(self.__banknote_storage))
+        self.__teller_machine = self.__recorder.record_teller_machine(self.__instrumentation.instrument_teller_machine(teller_machine))
+
+        load_views()
+        self.__inserted_card = self.__recorder.insert_card(BankCard.load_from_file(self.__card_file_path))
         self.__screen_manager = TellerMachineSceenManager()
 
     def build(self):
@@ -36,10 +52,14 @@ class GUITellerMachineController(App, ITellerMachineController):
     def start(self) -> None:
         self.run()
 
+    def on_stop(self) -> None:
+        self.__recorder.close()
+        self.__instrumentation.close()
+
     def enter_pin(self, pin: str) -> None:
         login_screen = self.__screen_manager.get_screen("login_screen")
 
-        if self.__inserted_card.gain_access(pin) == CardState.BLOCKED:
+        if self.__recorder.gain_access(self.__inserted_card, pin, self.__lockout_tracker) == CardState.BLOCKED:
             login_screen.show_error_message("Card has been blocked")
             return
 
@@ -53,7 +73,8 @@ class GUITellerMachineController(App, ITellerMachineController):
 
     def withdraw_card(self) -> None:
         data = self.__inserted_card.to_json()
-        self.__inserted_card.save_to_file(self.__card_file_path)
+        self.__recorder.withdraw_card(self.__inserted_card)
+        self.__instrumentation.record("bank_card", "save_to_file", self.__inserted_card.save_to_file, self.__card_file_path)
         self.__screen_manager.current = "login_screen"
 
     def show_show_balance_screen(self) -> None:
@@ -88,6 +109,8 @@ class GUITellerMachineController(App, ITellerMachineController):
             error_message = "Invalid amount passed. Please, specify positive numeric value."
         elif self.__inserted_card.get_card_balance() < amount:
             error_message = "You haven't got enough money to withdraw. Please, specify smaller amount."
+        elif not self.__banknote_storage.can_dispense(amount):
+            error_message = self.__get_nearest_dispensable_amounts_message(amount)
             
         if error_message != "":
             withdraw_screen.update_status_label(error_message)
@@ -100,6 +123,14 @@ class GUITellerMachineController(App, ITellerMachineController):
 
         withdraw_screen.update_status_label(success_message)
         
+    def __get_nearest_dispensable_amounts_message(self, amount: Decimal) -> str:
+        nearest_amounts = [nearest_amount.__str__() for nearest_amount in self.__banknote_storage.get_nearest_dispensable_amounts(amount)
+                           if nearest_amount is not None and nearest_amount > 0]
+        if not nearest_amounts:
+            return "This ATM is out of banknotes. Sorry for the inconvenience."
+
+        return "This ATM can't dispense " + amount.__str__() + ". Nearest available amounts: " + ", ".join(nearest_amounts)
+
     def show_pay_for_the_phone_screen(self) -> None:
         self.__screen_manager.current = "phone_screen"
 
@@ -121,6 +152,6 @@ class GUITellerMachineController(App, ITellerMachineController):
             phone_screen.show_error_message(error_message)
             return
         
-        self.__inserted_card.card_account.withdraw_cash(amount)
+        self.__teller_machine.pay_for_the_phone(phone_number, amount, self.__inserted_card)
         phone_screen.show_error_message("Successfully paid " + amount.__str__() + " for the " + phone_number)
         self.__screen_manager.current = "phone_screen"
\ No newline at end of file
@@ -0,0 +1,101 @@
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Iterable
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import IBanknoteStorage
+from src.persistence.cassette import Cassette
+from src.persistence.money import Money
+
+# Number of values counted at once, so a long stream is validated as it goes and never kept whole in memory.
+CHUNK_SIZE = 4096
+
+class DepositIngestor:
+    """Counts banknotes of a bulk deposit, e.g. from a counting machine, straight into counts per denomination.
+
+    Values are read from any iterable, a file of whitespace separated values or lines of them, and only the distinct
+    values of every chunk are parsed and checked against the allowed denominations, so thousands of notes cost a count
+    each. The deposit is applied after the whole stream is counted: one credit of the card and one update of the storage,
+    and a value, which isn't an allowed denomination, rejects the deposit before anything is changed."""
+    def __init__(self, allowed_denominations: Iterable[Decimal]) -> None:
+        # Dictionary keys compare by value, so a parsed 10, Decimal("10.0") or Money(10) all find the denomination 10.
+        self.__denominations = {Banknote(denomination).value: Banknote(denomination).value for denomination in allowed_denominations}
+        if not self.__denominations:
+            raise DenominationIsNotAllowedException("At least one denomination must be allowed.")
+
+        self.__denominations_by_token = {denomination.__str__(): denomination for denomination in self.__denominations}
+
+    @property
+    def allowed_denominations(self) -> list[Decimal]:
+        return sorted(self.__denominations)
+
+    def count(self, values: Iterable) -> Cassette:
+        """Counts the values, which are strings or numbers, into a cassette."""
+        cassette = Cassette()
+        values = iter(values)
+        while True:
+            chunk = Counter(islice(values, CHUNK_SIZE))
+            if not chunk:
+                return cassette
+
+            self.__add_chunk(cassette, chunk)
+
+    def count_lines(self, lines: Iterable[str]) -> Cassette:
+        """Counts the whitespace separated values of every line, e.g. of an open file, into a cassette."""
+        cassette = Cassette()
+        for line_number, line in enumerate(lines, 1):
+            try:
+                self.__add_chunk(cassette, Counter(line.split()))
+            except DenominationIsNotAllowedException as error:
+                raise DenominationIsNotAllowedException(*error.args, "Line", line_number)
+
+        return cassette
+
+    def count_file(self, path: str) -> Cassette:
+        with open(path, 'r') as file:
+            return self.count_lines(file)
+
+    def deposit(self, cassette: Cassette, banknote_storage: IBanknoteStorage, card: BankCard) -> Money:
+        """Credits total of the counted banknotes to the card and puts them to the storage. The card is credited first,
+        as its change can be undone exactly, so the credit is taken back, if the storage rejects the banknotes."""
+        amount = cassette.total
+        card.deposit_cash(amount)
+        try:
+            banknote_storage.deposit_cassette(cassette)
+        except Exception:
+            card.withdraw_cash(amount)
+            raise
+
+        return amount
+
+    def deposit_values(self, values: Iterable, banknote_storage: IBanknoteStorage, card: BankCard) -> Money:
+        return self.deposit(self.count(values), banknote_storage, card)
+
+    def deposit_file(self, path: str, banknote_storage: IBanknoteStorage, card: BankCard) -> Money:
+        return self.deposit(self.count_file(path), banknote_storage, card)
+
+    def __add_chunk(self, cassette: Cassette, chunk: Counter) -> None:
+        for value, count in chunk.items():
+            cassette.add(self.__get_denomination(value), count)
+
+    def __get_denomination(self, value) -> Decimal:
+        denomination = self.__denominations_by_token.get(value) if isinstance(value, str) else self.__denominations.get(value)
+        if denomination is not None:
+            return denomination
+
+        if isinstance(value, str):
+            try:
+                denomination = self.__denominations.get(Decimal(value.strip()))
+            except (InvalidOperation, TypeError):
+                # Signaling NaN is parsed, but can't be hashed.
+                denomination = None
+        if denomination is None:
+            raise DenominationIsNotAllowedException("Banknote", value, "isn't accepted. Allowed denominations are",
+                                                    ", ".join(denomination.__str__() for denomination in self.allowed_denominations))
+
+        return denomination
+
+class DenominationIsNotAllowedException(Exception):
+    """Exception raised when deposited value isn't one of the allowed denominations."""
+    pass
@@ -0,0 +1,170 @@
+import os
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from src.batch_operations import IBatchOperation, BatchMode, BatchResult
+from src.instrumentation.metrics import MetricsRegistry, PrometheusFileExporter
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import IBanknoteStorage
+from src.persistence.cassette import Cassette
+from src.persistence.data_storage import IStorage
+from src.teller_machine import ITellerMachine
+
+DURATION_METRIC = "atm_operation_duration_seconds"
+CALLS_METRIC = "atm_operation_calls_total"
+ERRORS_METRIC = "atm_operation_errors_total"
+BYTES_READ_METRIC = "atm_storage_bytes_read_total"
+BYTES_WRITTEN_METRIC = "atm_storage_bytes_written_total"
+
+METRICS_FILE_ENVIRONMENT_VARIABLE = "ATM_METRICS_FILE"
+METRICS_INTERVAL_ENVIRONMENT_VARIABLE = "ATM_METRICS_INTERVAL"
+
+class OperationRecorder:
+    """Records latency, calls and errors of the component operations into the registry."""
+    def __init__(self, registry: MetricsRegistry, component: str) -> None:
+        self.__registry = registry
+        self.__component = component
+        self.__labels = {}
+
+    def record(self, operation: str, function, *arguments):
+        labels = self.__labels.get(operation)
+        if labels is None:
+            labels = self.__labels[operation] = (("component", self.__component), ("operation", operation))
+
+        start = time.perf_counter()
+        try:
+            return function(*arguments)
+        except Exception as error:
+            self.__registry.increment(ERRORS_METRIC, labels + (("error", type(error).__name__),))
+            raise
+        finally:
+            self.__registry.observe(DURATION_METRIC, labels, time.perf_counter() - start)
+            self.__registry.increment(CALLS_METRIC, labels)
+
+class InstrumentedTellerMachine(ITellerMachine):
+    """Decorates teller machine with recording of its operations."""
+    def __init__(self, teller_machine: ITellerMachine, registry: MetricsRegistry) -> None:
+        self.__teller_machine = teller_machine
+        self.__recorder = OperationRecorder(registry, "teller_machine")
+
+    def get_card_balance(self, card: BankCard) -> Decimal:
+        return self.__recorder.record("get_card_balance", self.__teller_machine.get_card_balance, card)
+
+    def withdraw_cash(self, amount: Decimal, card: BankCard) -> list[Banknote]:
+        return self.__recorder.record("withdraw_cash", self.__teller_machine.withdraw_cash, amount, card)
+
+    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Decimal:
+        return self.__recorder.record("deposit_cash", self.__teller_machine.deposit_cash, cash, card)
+
+    def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
+        return self.__recorder.record("pay_for_the_phone", self.__teller_machine.pay_for_the_phone, phone_number, amount, card)
+
+    def process_batch(self, operations: list[IBatchOperation], mode: BatchMode = BatchMode.BEST_EFFORT) -> BatchResult:
+        return self.__recorder.record("process_batch", self.__teller_machine.process_batch, operations, mode)
+
+class InstrumentedBanknoteStorage(IBanknoteStorage):
+    """Decorates banknote storage with recording of its operations."""
+    def __init__(self, storage: IBanknoteStorage, registry: MetricsRegistry) -> None:
+        self.__storage = storage
+        self.__recorder = OperationRecorder(registry, "banknote_storage")
+
+    def get_cash_available(self) -> Decimal:
+        return self.__recorder.record("get_cash_available", self.__storage.get_cash_available)
+
+    def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        return self.__recorder.record("withdraw_banknotes", self.__storage.withdraw_banknotes, amount)
+
+    def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        return self.__recorder.record("deposit_banknotes", self.__storage.deposit_banknotes, banknotes)
+
+    def deposit_cassette(self, cassette: Cassette) -> None:
+        return self.__recorder.record("deposit_cassette", self.__storage.deposit_cassette, cassette)
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.__storage.supports_batch
+
+    @contextmanager
+    def batch(self):
+        with self.__storage.batch():
+            yield self
+
+class InstrumentedStorage(IStorage):
+    """Decorates storage with recording of saves and loads. If the storage is based on a file,
+    its size is counted as read on load and as written on save."""
+    def __init__(self, storage: IStorage, registry: MetricsRegistry, component: str = "storage") -> None:
+        self.__storage = storage
+        self.__registry = registry
+        self.__recorder = OperationRecorder(registry, component)
+        self.__labels = (("component", component),)
+        self.__path = getattr(storage, "path", None)
+
+    def save(self, data) -> None:
+        self.__recorder.record("save", self.__storage.save, data)
+        if self.__path is not None:
+            self.__registry.increment(BYTES_WRITTEN_METRIC, self.__labels, os.path.getsize(self.__path))
+
+    def load(self):
+        data = self.__recorder.record("load", self.__storage.load)
+        if self.__path is not None:
+            self.__registry.increment(BYTES_READ_METRIC, self.__labels, os.path.getsize(self.__path))
+
+        return data
+
+class Instrumentation:
+    """Wraps components into the instrumented decorators, if it's enabled. Disabled instrumentation returns
+    the components as they are, so they run without any overhead."""
+    def __init__(self, registry: MetricsRegistry = None, exporter: PrometheusFileExporter = None) -> None:
+        self.__registry = registry
+        self.__exporter = exporter
+        self.__recorders = {}
+
+    @property
+    def registry(self) -> MetricsRegistry:
+        return self.__registry
+
+    @property
+    def enabled(self) -> bool:
+        return self.__registry is not None
+
+    @staticmethod
+    def from_environment():
+        """Enables instrumentation, if ATM_METRICS_FILE is set, and starts dumping metrics to that file
+        every ATM_METRICS_INTERVAL seconds, 15 by default."""
+        path = os.environ.get(METRICS_FILE_ENVIRONMENT_VARIABLE)
+        if not path:
+            return Instrumentation()
+
+        registry = MetricsRegistry()
+        exporter = PrometheusFileExporter(registry, path, float(os.environ.get(METRICS_INTERVAL_ENVIRONMENT_VARIABLE, 15)))
+        exporter.start()
+        return Instrumentation(registry, exporter)
+
+    def instrument_teller_machine(self, teller_machine: ITellerMachine) -> ITellerMachine:
+        return InstrumentedTellerMachine(teller_machine, self.__registry) if self.enabled else teller_machine
+
+    def instrument_banknote_storage(self, storage: IBanknoteStorage) -> IBanknoteStorage:
+        return InstrumentedBanknoteStorage(storage, self.__registry) if self.enabled else storage
+
+    def instrument_storage(self, storage: IStorage, component: str = "storage") -> IStorage:
+        return InstrumentedStorage(storage, self.__registry, component) if self.enabled else storage
+
+    def record(self, component: str, operation: str, function, *arguments):
+        """Calls the function and records it as the component operation."""
+        if not self.enabled:
+            return function(*arguments)
+
+        recorder = self.__recorders.get(component)
+        if recorder is None:
+            recorder = self.__recorders[component] = OperationRecorder(self.__registry, component)
+
+        return recorder.record(operation, function, *arguments)
+
+    def snapshot(self) -> dict:
+        return self.__registry.snapshot() if self.enabled else {}
+
+    def close(self) -> None:
+        """Stops periodic dumps and writes the final values."""
+        if self.__exporter is not None:
+            self.__exporter.stop()
@@ -0,0 +1,134 @@
+import threading
+from bisect import bisect_left
+from src.persistence.data_storage import replace_file_atomically
+
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Counts observed values in buckets with fixed upper bounds and keeps their count and sum."""
+    def __init__(self, buckets: tuple = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.__buckets = tuple(sorted(buckets))
+        # The last count is for values above the largest bound.
+        self.__counts = [0] * (len(self.__buckets) + 1)
+        self.__count = 0
+        self.__sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__count += 1
+        self.__sum += value
+
+    def snapshot(self) -> dict:
+        cumulative_counts = {}
+        cumulative_count = 0
+        for bound, count in zip(self.__buckets, self.__counts):
+            cumulative_count += count
+            cumulative_counts[bound] = cumulative_count
+
+        return {"count": self.__count, "sum": self.__sum, "buckets": cumulative_counts}
+
+class MetricsRegistry:
+    """Keeps counters and histograms by metric name and labels.
+
+    Labels are passed as a tuple of (name, value) pairs, so updating a metric costs one dictionary lookup under a lock."""
+    def __init__(self, latency_buckets: tuple = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.__latency_buckets = latency_buckets
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__histograms = {}
+
+    def increment(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        key = (name, labels)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        key = (name, labels)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = Histogram(self.__latency_buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        """Returns current values as {metric name: [{"labels": {...}, "value": ...}]} for counters
+        and {metric name: [{"labels": {...}, "count": ..., "sum": ..., "buckets": {bound: count}}]} for histograms."""
+        with self.__lock:
+            snapshot = {}
+            for (name, labels), value in sorted(self.__counters.items()):
+                snapshot.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), histogram in sorted(self.__histograms.items(), key=lambda item: item[0]):
+                metric = {"labels": dict(labels)}
+                metric.update(histogram.snapshot())
+                snapshot.setdefault(name, []).append(metric)
+
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Formats current values in the Prometheus text exposition format."""
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            histograms = [(key, histogram.snapshot()) for key, histogram in sorted(self.__histograms.items(), key=lambda item: item[0])]
+
+        lines = []
+        written_types = set()
+        for (name, labels), value in counters:
+            self.__write_type(lines, written_types, name, "counter")
+            lines.append(name + self.__format_labels(labels) + " " + self.__format_value(value))
+        for (name, labels), histogram in histograms:
+            self.__write_type(lines, written_types, name, "histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(name + "_bucket" + self.__format_labels(labels + (("le", self.__format_value(bound)),)) + " " + count.__str__())
+            lines.append(name + "_bucket" + self.__format_labels(labels + (("le", "+Inf"),)) + " " + histogram["count"].__str__())
+            lines.append(name + "_sum" + self.__format_labels(labels) + " " + self.__format_value(histogram["sum"]))
+            lines.append(name + "_count" + self.__format_labels(labels) + " " + histogram["count"].__str__())
+
+        return "\n".join(lines) + "\n"
+
+    def __write_type(self, lines: list[str], written_types: set, name: str, metric_type: str) -> None:
+        if name not in written_types:
+            written_types.add(name)
+            lines.append("# TYPE " + name + " " + metric_type)
+
+    def __format_labels(self, labels: tuple) -> str:
+        if not labels:
+            return ""
+
+        escaped_labels = []
+        for name, value in labels:
+            escaped_value = value.__str__().replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+            escaped_labels.append(name + "=\"" + escaped_value + "\"")
+
+        return "{" + ",".join(escaped_labels) + "}"
+
+    def __format_value(self, value: float) -> str:
+        return repr(float(value)) if isinstance(value, float) else value.__str__()
+
+class PrometheusFileExporter:
+    """Periodically writes the registry to a local file in the Prometheus text format, e.g. for the node exporter textfile collector."""
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0) -> None:
+        self.__registry = registry
+        self.__path = path
+        self.__interval = interval
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def start(self) -> None:
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def dump(self) -> None:
+        replace_file_atomically(self.__path, self.__registry.to_prometheus().encode())
+
+    def stop(self) -> None:
+        """Stops the periodic dumps and writes the final values."""
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__thread.join()
+            self.__thread = None
+        self.dump()
+
+    def __run(self) -> None:
+        while not self.__stopped.wait(self.__interval):
+            self.dump()
@@ -0,0 +1,81 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from decimal import Decimal
+from src.persistence.async_data_storage import AsyncStorage
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import IBanknoteStorage, BanknoteStorage
+from src.persistence.change_making import IChangeMakingStrategy
+from src.persistence.data_storage import InMemoryStorage
+
+class IAsyncBanknoteStorage(ABC):
+    """Contains asynchronous methods for banknote storage."""
+    @abstractmethod
+    async def get_cash_available(self) -> Decimal:
+        """Calculates the sum of all banknotes values in storage."""
+        pass
+
+    @abstractmethod
+    async def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        """Withdraws banknotes from storage with an amount equal specified or the closest available to it, if storage doesn't have small enough values."""
+        pass
+
+    @abstractmethod
+    async def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        """Deposits banknotes to storage."""
+        pass
+
+class AsyncBanknoteStorage(IAsyncBanknoteStorage):
+    """Implements asynchronous banknotes storage with the same semantics as BanknoteStorage.
+
+    Banknotes are loaded and saved without blocking the event loop, while the operation itself is applied
+    by BanknoteStorage to the loaded banknotes. Changes of one storage are serialized, so concurrent
+    sessions don't dispense the same banknotes."""
+    def __init__(self, storage: AsyncStorage[list[Banknote]], change_making_strategy: IChangeMakingStrategy = None) -> None:
+        self.__storage = storage
+        self.__change_making_strategy = change_making_strategy
+        self.__lock = asyncio.Lock()
+
+    async def get_cash_available(self) -> Decimal:
+        banknotes = await self.__storage.load()
+        return self.__create_banknote_storage(banknotes).get_cash_available()
+
+    async def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        async with self.__lock:
+            banknotes = await self.__storage.load()
+            banknotes_withdrawed = self.__create_banknote_storage(banknotes).withdraw_banknotes(amount)
+            await self.__storage.save(banknotes)
+
+        return banknotes_withdrawed
+
+    async def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        async with self.__lock:
+            banknotes_available = await self.__storage.load()
+            self.__create_banknote_storage(banknotes_available).deposit_banknotes(banknotes)
+            await self.__storage.save(banknotes_available)
+
+    def __create_banknote_storage(self, banknotes: list[Banknote]) -> BanknoteStorage:
+        """Creates BanknoteStorage, which changes the loaded banknotes list in place."""
+        return BanknoteStorage(InMemoryStorage(banknotes), self.__change_making_strategy)
+
+class ThreadedAsyncBanknoteStorage(IAsyncBanknoteStorage):
+    """Decorates blocking banknote storage, e.g. the cassette one over a file, so its operations run in the executor
+    and don't block the event loop. Changes are serialized, so concurrent sessions don't dispense the same banknotes."""
+    def __init__(self, storage: IBanknoteStorage, executor: Executor = None) -> None:
+        self.__storage = storage
+        self.__executor = executor
+        self.__lock = asyncio.Lock()
+
+    async def get_cash_available(self) -> Decimal:
+        return await self.__run(self.__storage.get_cash_available)
+
+    async def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        async with self.__lock:
+            return await self.__run(self.__storage.withdraw_banknotes, amount)
+
+    async def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        async with self.__lock:
+            await self.__run(self.__storage.deposit_banknotes, banknotes)
+
+    async def __run(self, function, *arguments):
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, function, *arguments)
@@ -0,0 +1,41 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import TypeVar, Generic
+from src.persistence.data_storage import IStorage
+
+T = TypeVar('T')
+
+class AsyncStorage(ABC, Generic[T]):
+    """Contains asynchronous methods for storing and loading data of any type."""
+    @abstractmethod
+    async def save(self, data: T) -> None:
+        """Saves data to storage."""
+        pass
+
+    @abstractmethod
+    async def load(self) -> T:
+        """Loads data from storage."""
+        pass
+
+class ThreadedAsyncStorage(AsyncStorage[T]):
+    """Decorates blocking storage, so its file I/O runs in the executor and doesn't block the event loop."""
+    def __init__(self, storage: IStorage[T], executor: Executor = None) -> None:
+        self.__storage = storage
+        self.__executor = executor
+
+    async def save(self, data: T) -> None:
+        await asyncio.get_running_loop().run_in_executor(self.__executor, self.__storage.save, data)
+
+    async def load(self) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self.__storage.load)
+
+class AsyncInMemoryStorage(AsyncStorage[T]):
+    def __init__(self, data: T) -> None:
+        self.__data = data
+
+    async def save(self, data: T) -> None:
+        self.__data = data
+
+    async def load(self) -> T:
+        return self.__data
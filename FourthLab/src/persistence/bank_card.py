@@ -3,6 +3,9 @@ from enum import Enum
 from datetime import datetime
 from decimal import Decimal
 from src.persistence.card_account import ICardAccount, CardAccount
+from src.persistence.data_storage import JsonFileStorage
+from src.persistence.money import Money
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
 
 class BankCardValidator:
     """Contains validation methods for BankCard."""
@@ -64,17 +67,18 @@ class BankCard:
         self.__card_account = card_account
         self.__attemps_count = 0 
         self.__state = CardState.CLOSED
+        self.__lockout_tracker = None
 
     @staticmethod
-    def load_from_file(card_file_path: str):
+    def load_from_file(card_file_path: str, card_account: ICardAccount = None):
+        """Reads the card. Passed account, e.g. a ledger-backed one, is used instead of the balance from the file."""
         with open(card_file_path) as file:
-            return json.load(file, object_hook=BankCard.from_json)
+            return json.load(file, object_hook=lambda json_dct: BankCard.from_json(json_dct, card_account))
 
     def save_to_file(self, card_file_path: str) -> None:
-        with open(card_file_path, "w") as file:
-            json.dump(self.to_json(), file, indent=4)
+        JsonFileStorage(card_file_path, atomic=True).save(self.to_json())
 
-    def get_card_balance(self) -> Decimal:
+    def get_card_balance(self) -> Money:
         return self.card_account.balance
 
     @property
@@ -103,6 +107,8 @@ class BankCard:
         
     @property
     def attempts_left(self) -> str:
+        if self.__lockout_tracker is not None:
+            return self.__lockout_tracker.attempts_left(self.card_number).__str__()
         return (self.NUMBER_OF_ATTEMPS - self.__attemps_count).__str__()
         
     @property
@@ -112,7 +118,12 @@ class BankCard:
     def is_access_gained(self) -> bool:
         return self.state == CardState.OPENED
 
-    def gain_access(self, password: str) -> CardState:
+    def gain_access(self, password: str, lockout_tracker: PinLockoutTracker = None) -> CardState:
+        """Checks the PIN. If the lockout tracker is passed, failed attempts are counted by it, so they're shared
+        by all objects of the card, and the card is unblocked once its lockout expires."""
+        if lockout_tracker is not None:
+            return self.__gain_access_with_tracker(password, lockout_tracker)
+
         if self.__state == CardState.BLOCKED:
             return self.__state
 
@@ -126,6 +137,20 @@ class BankCard:
                 self.__state = CardState.CLOSED
 
         return self.__state
+
+    def __gain_access_with_tracker(self, password: str, lockout_tracker: PinLockoutTracker) -> CardState:
+        self.__lockout_tracker = lockout_tracker
+        if lockout_tracker.is_locked(self.card_number):
+            self.__state = CardState.BLOCKED
+        elif password == self.password:
+            lockout_tracker.record_success(self.card_number)
+            self.__state = CardState.OPENED
+        elif lockout_tracker.record_failure(self.card_number):
+            self.__state = CardState.BLOCKED
+        else:
+            self.__state = CardState.CLOSED
+
+        return self.__state
             
     def withdraw_cash(self, amount: Decimal) -> None:
         self.card_account.withdraw_cash(amount)
@@ -134,9 +159,11 @@ class BankCard:
         self.card_account.deposit_cash(amount)
 
     @staticmethod
-    def from_json(json_dct):
-        account = CardAccount()
-        account.deposit_cash(Decimal(json_dct['balance']))
+    def from_json(json_dct, card_account: ICardAccount = None):
+        account = card_account
+        if account is None:
+            account = CardAccount()
+            account.deposit_cash(Money(json_dct['balance']))
         return BankCard(json_dct['card_number'],
                         datetime.strptime(json_dct['expiration_date'], '%d-%m-%Y').date(),
                         json_dct['username'],
@@ -1,26 +1,62 @@
 from decimal import Decimal
+from src.persistence.money import Money, to_minor_units
 
 class Banknote:
-    """Represents the banknote model."""
-    def __init__(self, value: Decimal) -> None:
-        self.__value = BanknoteValidator.validate_value(value)
+    """Represents the banknote model.
+
+    Banknotes are immutable and interned per value, so a cassette of any size holds one object per denomination
+    and a list of banknotes costs a reference per banknote. Comparisons use an integer key for integral values.
+    The value in minor units is kept as well, so sums of banknotes are sums of integers."""
+    __slots__ = ("__value", "__key", "__minor_units")
+    __instances = {}
+
+    def __new__(cls, value: Decimal):
+        banknote = cls.__instances.get(value)
+        if banknote is None:
+            BanknoteValidator.validate_value(value)
+            banknote = super().__new__(cls)
+            banknote.__value = value
+            banknote.__key = int(value) if value == int(value) else value
+            banknote.__minor_units = to_minor_units(value)
+            banknote = cls.__instances.setdefault(value, banknote)
+
+        return banknote
 
     @property
     def value(self) -> Decimal:
         return self.__value
 
+    @property
+    def minor_units(self) -> int:
+        return self.__minor_units
+
     def __str__(self) -> str:
-        return self.value.__str__()
+        return self.__value.__str__()
 
     def __lt__(self, other) -> bool:
-        return self.value < other.value
+        return self.__key < other.__key
         
     def __gt__(self, other) -> bool:
-        return self.value > other.value
+        return self.__key > other.__key
         
     def __eq__(self, other) -> bool:
-        return self.value == other.value
+        if self is other:
+            return True
+        if not isinstance(other, Banknote):
+            return NotImplemented
+
+        return self.__key == other.__key
+
+    def __hash__(self) -> int:
+        return hash(self.__key)
+
+    def __reduce__(self):
+        return Banknote, (self.__value,)
     
+    @staticmethod
+    def calculate_total(banknotes) -> Money:
+        return Money.from_minor_units(sum(banknote.__minor_units for banknote in banknotes))
+
     @staticmethod
     def str_to_banknotes(string: str):
         string_values = string.split()
@@ -1,12 +1,18 @@
 from abc import ABC, abstractmethod
-from src.persistence.data_storage import IStorage, JsonFileStorage
+from collections import Counter
+from contextlib import contextmanager
+from src.persistence.data_storage import IStorage, JsonFileStorage, BufferedStorage
 from decimal import Decimal
-from src.persistence.banknote import Banknote 
+from src.persistence.banknote import Banknote
+from src.persistence.cassette import Cassette
+from src.persistence.money import Money
+from src.persistence.change_making import IChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
+from src.persistence.dispensable_amounts import DispensableAmountsTable
 
 class IBanknoteStorage(ABC):
     """Contains methods for banknote storage."""
     @abstractmethod
-    def get_cash_available(self) -> Decimal:
+    def get_cash_available(self) -> Money:
         """Calculates the sum of all banknotes values in storage."""
         pass
 
@@ -19,6 +25,22 @@ class IBanknoteStorage(ABC):
     def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
         """Deposits banknotes to storage."""
         pass
+
+    def deposit_cassette(self, cassette: Cassette) -> None:
+        """Deposits banknotes counted per denomination. Storages, which keep counts, add them without
+        creating separate banknotes."""
+        self.deposit_banknotes(cassette.to_banknotes())
+
+    @property
+    def supports_batch(self) -> bool:
+        """Whether batch() discards the changes made inside it, if an exception is raised."""
+        return False
+
+    @contextmanager
+    def batch(self):
+        """Groups operations made inside the context. Storages, which are able to, load the banknotes once
+        and save them once on successful exit, discarding all changes if an exception is raised."""
+        yield self
     
 class JsonFileBanknoteStorage(IStorage[list[Banknote]]):
     """Decorates JsonFileStorage so it's able to convert string to banknotes."""
@@ -34,29 +56,32 @@ class JsonFileBanknoteStorage(IStorage[list[Banknote]]):
         
     def __convert_dict_to_banknotes(self, dict) -> list[Banknote]:
         banknotes = []
-        for data in dict:
-            banknotes.append(Banknote(int(data)))
+        for data, count in Counter(dict).items():
+            banknotes.extend([Banknote(int(data))] * count)
 
         return banknotes
 
 class BanknoteStorage(IBanknoteStorage):
     """Implements methods for operationing with banknotes storage."""
-    def __init__(self, storage: IStorage[list[Banknote]]) -> None:
+    def __init__(self, storage: IStorage[list[Banknote]], change_making_strategy: IChangeMakingStrategy = None) -> None:
         self.__storage = storage
+        self.__change_making_strategy = change_making_strategy or DynamicProgrammingChangeMakingStrategy()
+        self.__dispensable_amounts = None
         
-    def get_cash_available(self) -> Decimal:        
-        banknotes = self.__storage.load()
+    def get_cash_available(self) -> Money:
+        return Banknote.calculate_total(self.__storage.load())
 
-        amount = Decimal()
-        for banknote in banknotes:
-            amount += banknote.value
+    def can_dispense(self, amount: Decimal) -> bool:
+        """Checks whether the amount can be withdrawn exactly, using the table kept up to date by withdrawals and deposits."""
+        return self.__get_dispensable_amounts().can_dispense(amount)
 
-        return amount
+    def get_nearest_dispensable_amounts(self, amount: Decimal) -> tuple[Decimal, Decimal]:
+        return self.__get_dispensable_amounts().get_nearest_dispensable_amounts(amount)
 
     def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
         AmountValidator.validate_amount(amount)
         if amount == 0:
-            return list[Banknote]
+            return []
 
         cash_available = self.get_cash_available()
         if cash_available < amount:
@@ -66,25 +91,60 @@ class BanknoteStorage(IBanknoteStorage):
 
         banknotes_withdrawed = self.__make_change_algorithm(banknotes_available, amount)
         self.__storage.save(banknotes_available)
+        self.__update_dispensable_amounts(banknotes_available)
         return banknotes_withdrawed
 
     def __make_change_algorithm(self, banknotes_available: list[Banknote], amount: Decimal) -> list[Banknote]:
-        sorted_Banknotes = sorted(banknotes_available, reverse=True)
-        banknotes_withdrawed = []
-        current_amount = Decimal()
-        while current_amount != amount and len(sorted_Banknotes) > 0:
-            current_banknote = sorted_Banknotes.pop(0)
-            if current_amount + current_banknote.value <= amount:
-                current_amount += current_banknote.value
-                banknotes_withdrawed.append(current_banknote)
-                banknotes_available.remove(current_banknote)
+        counts = Counter(banknote.value for banknote in banknotes_available)
+        banknotes_to_withdraw = self.__change_making_strategy.make_change(counts, amount)
 
+        banknotes_withdrawed = []
+        banknotes_left = []
+        for banknote in banknotes_available:
+            if banknotes_to_withdraw.get(banknote.value, 0) > 0:
+                banknotes_to_withdraw[banknote.value] -= 1
+                banknotes_withdrawed.append(banknote)
+            else:
+                banknotes_left.append(banknote)
+
+        banknotes_available[:] = banknotes_left
+        banknotes_withdrawed.sort(reverse=True)
         return banknotes_withdrawed
 
     def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
         banknotes_available = self.__storage.load()
         banknotes_available.extend(banknotes)
         self.__storage.save(banknotes_available)
+        self.__update_dispensable_amounts(banknotes_available)
+
+    @property
+    def supports_batch(self) -> bool:
+        return True
+
+    @contextmanager
+    def batch(self):
+        storage = self.__storage
+        buffered_storage = BufferedStorage(storage)
+        self.__storage = buffered_storage
+        try:
+            yield self
+        except BaseException:
+            # Changes of the batch are discarded, so the table built from them is dropped as well.
+            self.__dispensable_amounts = None
+            raise
+        finally:
+            self.__storage = storage
+        buffered_storage.commit()
+
+    def __get_dispensable_amounts(self) -> DispensableAmountsTable:
+        if self.__dispensable_amounts is None:
+            self.__dispensable_amounts = DispensableAmountsTable(Counter(banknote.value for banknote in self.__storage.load()))
+
+        return self.__dispensable_amounts
+
+    def __update_dispensable_amounts(self, banknotes: list[Banknote]) -> None:
+        if self.__dispensable_amounts is not None:
+            self.__dispensable_amounts.update(Counter(banknote.value for banknote in banknotes))
         
 class AmountValidator:
     @staticmethod
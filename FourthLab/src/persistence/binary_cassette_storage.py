@@ -0,0 +1,84 @@
+import mmap
+import os
+import struct
+from src.persistence.data_storage import IStorage, JsonFileStorage, replace_file_atomically
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import JsonFileCassetteStorage
+
+MAGIC = b"ATMC"
+VERSION = 1
+# magic, version, reserved, entries count
+HEADER = struct.Struct("<4sHHI")
+# denomination, banknotes count
+ENTRY = struct.Struct("<IQ")
+
+class BinaryCassetteStorage(IStorage[Cassette]):
+    """Represents cassette storage based on a binary file of a fixed header and packed counts per denomination.
+
+    The file size depends only on the number of denominations, so loading ten million banknotes reads the same
+    few dozen bytes as loading ten of them. The entries are unpacked straight from the memory mapped file."""
+    def __init__(self, path: str, atomic: bool = True) -> None:
+        self.__path = path
+        self.__atomic = atomic
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def save(self, data: Cassette) -> None:
+        counts = data.counts
+        buffer = bytearray(HEADER.size + ENTRY.size * len(counts))
+        HEADER.pack_into(buffer, 0, MAGIC, VERSION, 0, len(counts))
+        for index, denomination in enumerate(sorted(counts)):
+            ENTRY.pack_into(buffer, HEADER.size + ENTRY.size * index, self.__convert_denomination(denomination), counts[denomination])
+
+        if self.__atomic:
+            replace_file_atomically(self.__path, buffer)
+        else:
+            with open(self.__path, 'wb') as file:
+                file.write(buffer)
+
+    def load(self) -> Cassette:
+        with open(self.__path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise InvalidCassetteFileException("Cassette file", self.__path, "is too short.")
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                with memoryview(mapped_file) as view:
+                    return self.__read_cassette(view)
+
+    def __read_cassette(self, view: memoryview) -> Cassette:
+        magic, version, _, entries_count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise InvalidCassetteFileException("Cassette file", self.__path, "has unknown format.")
+        if version != VERSION:
+            raise InvalidCassetteFileException("Cassette file version", version, "isn't supported.")
+
+        end = HEADER.size + ENTRY.size * entries_count
+        if len(view) < end:
+            raise InvalidCassetteFileException("Cassette file", self.__path, "is truncated.")
+
+        cassette = Cassette()
+        with view[HEADER.size:end] as entries:
+            for denomination, count in ENTRY.iter_unpack(entries):
+                cassette.add(denomination, count)
+
+        return cassette
+
+    def __convert_denomination(self, denomination) -> int:
+        if denomination != int(denomination) or not 0 < denomination < 2 ** 32:
+            raise InvalidCassetteFileException("Denomination", denomination, "can't be stored in the binary cassette file.")
+
+        return int(denomination)
+
+def convert_json_to_binary(json_path: str, binary_path: str) -> None:
+    """Converts the JSON banknotes file of either the list or the counts format to the binary one."""
+    BinaryCassetteStorage(binary_path).save(JsonFileCassetteStorage(JsonFileStorage(json_path)).load())
+
+def convert_binary_to_json(binary_path: str, json_path: str) -> None:
+    """Converts the binary banknotes file to the JSON counts format."""
+    JsonFileCassetteStorage(JsonFileStorage(json_path, atomic=True)).save(BinaryCassetteStorage(binary_path).load())
+
+class InvalidCassetteFileException(Exception):
+    """Exception raised when binary cassette file can't be read or written."""
+    pass
@@ -1,6 +1,7 @@
 from abc import abstractmethod
 from decimal import Decimal
 from src.persistence.banknote_storage import AmountValidator, NegativeMoneyAmountException
+from src.persistence.money import Money, to_minor_units
 
 class ICardAccount:
     """Contains methods for the card account."""
@@ -13,31 +14,33 @@ class ICardAccount:
         pass
 
     @abstractmethod
-    def view_balance(self) -> Decimal:
+    def view_balance(self) -> Money:
         pass
 
 class CardAccount(ICardAccount):
-    """Represents the card account."""
+    """Represents the card account. The balance is kept in minor units, and amounts are converted to them at the entry."""
     def __init__(self) -> None:
-        self.__balance = Decimal()
+        self.__balance_minor_units = 0
 
     @property
-    def balance(self) -> Decimal:
-        return self.__balance
+    def balance(self) -> Money:
+        return Money.from_minor_units(self.__balance_minor_units)
     
     def withdraw_cash(self, amount: Decimal) -> None:
-        AmountValidator.validate_amount(amount)
-        if self.balance - amount < 0:
+        minor_units = to_minor_units(amount)
+        AmountValidator.validate_amount(minor_units)
+        if self.__balance_minor_units < minor_units:
             raise NotEnoughMoneyOnBalanceException("Card balance doesn't have", amount, "money to withdraw.")
-        self.__balance -= amount
+        self.__balance_minor_units -= minor_units
 
     def deposit_cash(self, amount: Decimal) -> None:
-        if amount < 0:
+        minor_units = to_minor_units(amount)
+        if minor_units < 0:
             raise NegativeMoneyAmountException("Unable to deposit negative amount of cash.")
-        self.__balance += amount
+        self.__balance_minor_units += minor_units
 
-    def view_balance(self) -> Decimal:
-        return self.__balance
+    def view_balance(self) -> Money:
+        return self.balance
 
 class NotEnoughMoneyOnBalanceException(Exception):
     """Exception raised when storage doesn't have enough money to withdraw."""
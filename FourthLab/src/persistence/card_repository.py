@@ -0,0 +1,335 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote_storage import AmountValidator, NegativeMoneyAmountException
+from src.persistence.card_account import ICardAccount, NotEnoughMoneyOnBalanceException
+from src.persistence.data_storage import JsonFileStorage
+from src.persistence.money import Money
+
+RECORDS_FILE = "cards.dat"
+INDEX_FILE = "cards.idx"
+DATE_FORMAT = '%d-%m-%Y'
+
+# card number, expiration date, username, cvc, password, balance
+RECORD = struct.Struct("<16s10s64s3s4s24s")
+BALANCE_OFFSET = RECORD.size - 24
+BALANCE_LENGTH = 24
+
+INDEX_MAGIC = b"CIDX"
+INDEX_HEADER = struct.Struct("<4sQQ")
+# card number, record number
+INDEX_SLOT = struct.Struct("<16sQ")
+EMPTY_SLOT = bytes(16)
+INITIAL_INDEX_CAPACITY = 1024
+MAX_LOAD_FACTOR = 0.5
+
+class ICardRepository(ABC):
+    """Contains methods for storing bank cards by card number."""
+    @abstractmethod
+    def contains(self, card_number: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get(self, card_number: str) -> BankCard:
+        pass
+
+    @abstractmethod
+    def add(self, card: BankCard) -> None:
+        pass
+
+    @abstractmethod
+    def get_balance(self, card_number: str) -> Money:
+        pass
+
+    @abstractmethod
+    def update_balance(self, card_number: str, balance: Decimal) -> None:
+        pass
+
+class IndexedCardRepository(ICardRepository):
+    """Represents card repository based on a file of fixed-size records and an on-disk hash index.
+
+    The index is an open addressing hash table of card numbers and record numbers, so a card is found
+    with O(1) reads regardless of the cards count. Balance is stored in a fixed-width field and updated in place.
+    Cards are materialized only when requested, and their accounts write balance changes straight to the record."""
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.__lock = threading.RLock()
+        self.__records = self.__open(os.path.join(directory, RECORDS_FILE))
+        self.__index_path = os.path.join(directory, INDEX_FILE)
+        self.__index = self.__open(self.__index_path)
+        self.__records_count = os.path.getsize(os.path.join(directory, RECORDS_FILE)) // RECORD.size
+        if os.path.getsize(self.__index_path) == 0:
+            self.__write_empty_index(self.__index, INITIAL_INDEX_CAPACITY)
+        self.__capacity, self.__size = self.__read_index_header()
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def contains(self, card_number: str) -> bool:
+        with self.__lock:
+            return self.__find_record_number(card_number) is not None
+
+    def get(self, card_number: str) -> BankCard:
+        with self.__lock:
+            record_number = self.__get_record_number(card_number)
+            fields = RECORD.unpack(self.__read_record(record_number))
+
+        return self.__convert_fields_to_card(fields, record_number)
+
+    def add(self, card: BankCard) -> None:
+        with self.__lock:
+            if self.__find_record_number(card.card_number) is not None:
+                raise CardIsAlreadyInRepositoryException("Card is already in repository", card.card_number)
+            if self.__size + 1 > self.__capacity * MAX_LOAD_FACTOR:
+                self.__rebuild_index(self.__capacity * 2)
+
+            record_number = self.__records_count
+            self.__records.seek(record_number * RECORD.size)
+            self.__records.write(self.__convert_card_to_record(card))
+            self.__records_count += 1
+            self.__insert_into_index(card.card_number, record_number)
+
+    def save(self, card: BankCard) -> None:
+        """Adds the card or overwrites the stored one."""
+        with self.__lock:
+            record_number = self.__find_record_number(card.card_number)
+            if record_number is None:
+                return self.add(card)
+
+            self.__records.seek(record_number * RECORD.size)
+            self.__records.write(self.__convert_card_to_record(card))
+
+    def get_balance(self, card_number: str) -> Money:
+        with self.__lock:
+            return self.__read_balance(self.__get_record_number(card_number))
+
+    def update_balance(self, card_number: str, balance: Decimal) -> None:
+        with self.__lock:
+            self.write_balance(self.__get_record_number(card_number), balance)
+
+    def read_balance(self, record_number: int) -> Money:
+        with self.__lock:
+            return self.__read_balance(record_number)
+
+    def write_balance(self, record_number: int, balance: Decimal) -> None:
+        with self.__lock:
+            self.__records.seek(record_number * RECORD.size + BALANCE_OFFSET)
+            # The field is padded, so a shorter balance doesn't leave digits of the previous one.
+            self.__records.write(self.__encode(Money(balance).__str__(), BALANCE_LENGTH, "balance").ljust(BALANCE_LENGTH, b"\0"))
+
+    def withdraw_balance(self, record_number: int, amount: Decimal) -> Money:
+        """Checks the stored balance and takes the amount from it under the lock, so concurrent changes aren't lost.
+        Returns the new balance."""
+        amount = Money(amount)
+        AmountValidator.validate_amount(amount)
+        with self.__lock:
+            balance = self.__read_balance(record_number)
+            if balance < amount:
+                raise NotEnoughMoneyOnBalanceException("Card balance doesn't have", amount, "money to withdraw.")
+
+            self.write_balance(record_number, balance - amount)
+            return balance - amount
+
+    def deposit_balance(self, record_number: int, amount: Decimal) -> Money:
+        """Adds the amount to the stored balance under the lock and returns the new balance."""
+        amount = Money(amount)
+        if amount < 0:
+            raise NegativeMoneyAmountException("Unable to deposit negative amount of cash.")
+
+        with self.__lock:
+            balance = self.__read_balance(record_number) + amount
+            self.write_balance(record_number, balance)
+            return balance
+
+    def flush(self) -> None:
+        with self.__lock:
+            self.__records.flush()
+            self.__index.flush()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__records.close()
+            self.__index.close()
+
+    def import_json(self, path: str) -> int:
+        """Imports cards from JSON file with one card in the bank_card.json format or a list of them. Returns imported cards count."""
+        with open(path) as file:
+            deserialized_data = json.load(file)
+        if isinstance(deserialized_data, dict):
+            deserialized_data = [deserialized_data]
+
+        for card_dictionary in deserialized_data:
+            self.save(BankCard.from_json(card_dictionary))
+
+        return len(deserialized_data)
+
+    def export_json(self, path: str, card_numbers: list[str] = None) -> None:
+        """Exports specified cards or all of them as a list in the bank_card.json format."""
+        if card_numbers is None:
+            cards = [card.to_json() for card in self]
+        else:
+            cards = [self.get(card_number).to_json() for card_number in card_numbers]
+
+        JsonFileStorage(path, atomic=True).save(cards)
+
+    def __iter__(self):
+        for record_number in range(self.__records_count):
+            with self.__lock:
+                fields = RECORD.unpack(self.__read_record(record_number))
+            yield self.__convert_fields_to_card(fields, record_number)
+
+    def __open(self, path: str):
+        return open(path, 'r+b' if os.path.exists(path) else 'w+b')
+
+    def __read_record(self, record_number: int) -> bytes:
+        self.__records.seek(record_number * RECORD.size)
+        return self.__records.read(RECORD.size)
+
+    def __read_balance(self, record_number: int) -> Money:
+        self.__records.seek(record_number * RECORD.size + BALANCE_OFFSET)
+        return Money(self.__decode(self.__records.read(BALANCE_LENGTH)))
+
+    def __get_record_number(self, card_number: str) -> int:
+        record_number = self.__find_record_number(card_number)
+        if record_number is None:
+            raise CardIsNotInRepositoryException("There is no card with number", card_number)
+
+        return record_number
+
+    def __find_record_number(self, card_number: str):
+        key = card_number.encode()
+        slot = self.__get_initial_slot(key, self.__capacity)
+        while True:
+            stored_key, record_number = self.__read_slot(self.__index, slot)
+            if stored_key == EMPTY_SLOT:
+                return None
+            if stored_key == key:
+                return record_number
+            slot = (slot + 1) % self.__capacity
+
+    def __insert_into_index(self, card_number: str, record_number: int) -> None:
+        key = card_number.encode()
+        slot = self.__get_initial_slot(key, self.__capacity)
+        while self.__read_slot(self.__index, slot)[0] != EMPTY_SLOT:
+            slot = (slot + 1) % self.__capacity
+
+        self.__write_slot(self.__index, slot, key, record_number)
+        self.__size += 1
+        self.__write_index_header(self.__index, self.__capacity, self.__size)
+
+    def __rebuild_index(self, capacity: int) -> None:
+        """Moves all cards to the index of bigger capacity. It happens rarely, so adding a card is O(1) amortized."""
+        temporary_path = self.__index_path + ".tmp"
+        with open(temporary_path, 'w+b') as index:
+            self.__write_empty_index(index, capacity)
+            for record_number in range(self.__records_count):
+                self.__records.seek(record_number * RECORD.size)
+                key = self.__records.read(16)
+                slot = self.__get_initial_slot(key, capacity)
+                while self.__read_slot(index, slot)[0] != EMPTY_SLOT:
+                    slot = (slot + 1) % capacity
+                self.__write_slot(index, slot, key, record_number)
+            self.__write_index_header(index, capacity, self.__records_count)
+
+        self.__index.close()
+        os.replace(temporary_path, self.__index_path)
+        self.__index = self.__open(self.__index_path)
+        self.__capacity, self.__size = capacity, self.__records_count
+
+    def __get_initial_slot(self, key: bytes, capacity: int) -> int:
+        return zlib.crc32(key) % capacity
+
+    def __read_index_header(self) -> tuple[int, int]:
+        self.__index.seek(0)
+        magic, capacity, size = INDEX_HEADER.unpack(self.__index.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC:
+            raise InvalidCardIndexException("Card index file has unknown format.")
+
+        return capacity, size
+
+    def __write_empty_index(self, index, capacity: int) -> None:
+        self.__write_index_header(index, capacity, 0)
+        index.truncate(INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+
+    def __write_index_header(self, index, capacity: int, size: int) -> None:
+        index.seek(0)
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, capacity, size))
+
+    def __read_slot(self, index, slot: int) -> tuple[bytes, int]:
+        index.seek(INDEX_HEADER.size + slot * INDEX_SLOT.size)
+        return INDEX_SLOT.unpack(index.read(INDEX_SLOT.size))
+
+    def __write_slot(self, index, slot: int, key: bytes, record_number: int) -> None:
+        index.seek(INDEX_HEADER.size + slot * INDEX_SLOT.size)
+        index.write(INDEX_SLOT.pack(key, record_number))
+
+    def __convert_card_to_record(self, card: BankCard) -> bytes:
+        return RECORD.pack(card.card_number.encode(),
+                           card.expiration_date.strftime(DATE_FORMAT).encode(),
+                           self.__encode(card.username, 64, "username"),
+                           card.cvc.encode(),
+                           card.password.encode(),
+                           self.__encode(card.card_account.balance.__str__(), BALANCE_LENGTH, "balance"))
+
+    def __convert_fields_to_card(self, fields: tuple, record_number: int) -> BankCard:
+        card_number, expiration_date, username, cvc, password, _ = fields
+        return BankCard(card_number.decode(),
+                        datetime.strptime(expiration_date.decode(), DATE_FORMAT).date(),
+                        self.__decode(username),
+                        cvc.decode(),
+                        password.decode(),
+                        RepositoryCardAccount(self, record_number))
+
+    def __encode(self, value: str, length: int, field_name: str) -> bytes:
+        encoded_value = value.encode()
+        if len(encoded_value) > length:
+            raise CardRecordFieldTooLongException("Card", field_name, "must not be longer than", length, "bytes.")
+
+        return encoded_value
+
+    def __decode(self, value: bytes) -> str:
+        return value.rstrip(b"\0").decode()
+
+class RepositoryCardAccount(ICardAccount):
+    """Represents the card account, which reads balance from the repository record on every access.
+
+    Balance changes are checked and written by the repository under its lock, so several cards of the same number,
+    e.g. in parallel sessions, don't overwrite each other's changes."""
+    def __init__(self, repository: IndexedCardRepository, record_number: int) -> None:
+        self.__repository = repository
+        self.__record_number = record_number
+
+    @property
+    def balance(self) -> Money:
+        return self.__repository.read_balance(self.__record_number)
+
+    def withdraw_cash(self, amount: Decimal) -> None:
+        self.__repository.withdraw_balance(self.__record_number, amount)
+
+    def deposit_cash(self, amount: Decimal) -> None:
+        self.__repository.deposit_balance(self.__record_number, amount)
+
+    def view_balance(self) -> Money:
+        return self.balance
+
+class CardIsAlreadyInRepositoryException(Exception):
+    """Exception raised when trying to add the card, which is already in repository."""
+    pass
+
+class CardIsNotInRepositoryException(Exception):
+    """Exception raised when trying to get the card, which isn't in repository."""
+    pass
+
+class CardRecordFieldTooLongException(Exception):
+    """Exception raised when card field doesn't fit into the fixed-size record."""
+    pass
+
+class InvalidCardIndexException(Exception):
+    """Exception raised when card index file has unknown format."""
+    pass
@@ -0,0 +1,124 @@
+from collections import Counter
+from decimal import Decimal
+from src.persistence.banknote import Banknote, BanknoteValidator
+from src.persistence.money import Money
+
+class Cassette:
+    """Represents the banknotes storage as a count of banknotes per denomination."""
+    def __init__(self, counts: dict[Decimal, int] = None) -> None:
+        self.__counts = {}
+        self.__total_minor_units = 0
+        if counts is not None:
+            for denomination, count in counts.items():
+                self.add(denomination, count)
+
+    @property
+    def counts(self) -> dict[Decimal, int]:
+        return dict(self.__counts)
+
+    @property
+    def total(self) -> Money:
+        """Sum of all banknotes values in the cassette, maintained on every change."""
+        return Money.from_minor_units(self.__total_minor_units)
+
+    @property
+    def banknotes_count(self) -> int:
+        return sum(self.__counts.values())
+
+    def denominations(self) -> list[Decimal]:
+        """Returns denominations present in the cassette from the largest to the smallest."""
+        return sorted(self.__counts, reverse=True)
+
+    def count_of(self, denomination: Decimal) -> int:
+        return self.__counts.get(denomination, 0)
+
+    def add(self, denomination: Decimal, count: int = 1) -> None:
+        BanknoteValidator.validate_value(denomination)
+        CassetteValidator.validate_count(count)
+        if count == 0:
+            return
+
+        self.__counts[denomination] = self.__counts.get(denomination, 0) + count
+        self.__total_minor_units += Banknote(denomination).minor_units * count
+
+    def remove(self, denomination: Decimal, count: int = 1) -> None:
+        CassetteValidator.validate_count(count)
+        available = self.__counts.get(denomination, 0)
+        if available < count:
+            raise NotEnoughBanknotesInCassetteException("Cassette has only", available, "banknotes of", denomination)
+        if count == 0:
+            return
+
+        if available == count:
+            del self.__counts[denomination]
+        else:
+            self.__counts[denomination] = available - count
+        self.__total_minor_units -= Banknote(denomination).minor_units * count
+
+    def add_banknotes(self, banknotes: list[Banknote]) -> None:
+        for value, count in Counter(banknote.value for banknote in banknotes).items():
+            self.add(value, count)
+
+    def to_banknotes(self) -> list[Banknote]:
+        banknotes = []
+        for denomination in self.denominations():
+            banknotes.extend([Banknote(denomination)] * self.__counts[denomination])
+
+        return banknotes
+
+    def copy(self):
+        return Cassette(self.__counts)
+
+    __copy__ = copy
+
+    @staticmethod
+    def from_banknotes(banknotes: list[Banknote]):
+        cassette = Cassette()
+        cassette.add_banknotes(banknotes)
+        return cassette
+
+    @staticmethod
+    def from_values(values: list):
+        """Creates cassette from the legacy format with one value per banknote."""
+        cassette = Cassette()
+        for value, count in Counter(values).items():
+            cassette.add(int(value), count)
+
+        return cassette
+
+    @staticmethod
+    def from_json(json_dct):
+        cassette = Cassette()
+        for denomination, count in json_dct.items():
+            cassette.add(int(denomination), int(count))
+
+        return cassette
+
+    def __iter__(self):
+        for denomination in self.denominations():
+            yield denomination.__str__(), self.__counts[denomination]
+
+    def to_json(self):
+        return dict(self)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Cassette) and self.__counts == other.counts
+
+    def __str__(self) -> str:
+        return ", ".join(denomination + " x " + count.__str__() for denomination, count in self)
+
+class CassetteValidator:
+    @staticmethod
+    def validate_count(count: int) -> int:
+        if count < 0:
+            raise InvalidBanknotesCountException("Unable to store negative count of banknotes.")
+
+        return count
+
+class InvalidBanknotesCountException(Exception):
+    """Exception raised when trying to pass negative count of banknotes."""
+    pass
+
+class NotEnoughBanknotesInCassetteException(Exception):
+    """Exception raised when cassette doesn't have enough banknotes of the denomination."""
+    pass
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from decimal import Decimal
+from src.persistence.data_storage import IStorage, JsonFileStorage, BufferedStorage
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import IBanknoteStorage, AmountValidator, NotEnoughMoneyInStorageException
+from src.persistence.cassette import Cassette
+from src.persistence.change_making import IChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
+from src.persistence.dispensable_amounts import DispensableAmountsTable
+from src.persistence.money import Money
+
+class JsonFileCassetteStorage(IStorage[Cassette]):
+    """Decorates JsonFileStorage so it's able to store cassette as a count of banknotes per denomination.
+
+    The legacy format with one string per banknote is still read, so the first save migrates the file."""
+    def __init__(self, storage: JsonFileStorage) -> None:
+        self.__storage = storage
+
+    def save(self, data: Cassette) -> None:
+        self.__storage.save(data.to_json())
+
+    def load(self) -> Cassette:
+        deserialized_data = self.__storage.load()
+        if isinstance(deserialized_data, list):
+            return Cassette.from_values(deserialized_data)
+
+        return Cassette.from_json(deserialized_data)
+
+class CassetteBanknotesListStorage(IStorage[list[Banknote]]):
+    """Decorates cassette storage so it's able to load and save list of banknotes for BanknoteStorage."""
+    def __init__(self, storage: IStorage[Cassette]) -> None:
+        self.__storage = storage
+
+    def save(self, data: list[Banknote]) -> None:
+        self.__storage.save(Cassette.from_banknotes(data))
+
+    def load(self) -> list[Banknote]:
+        return self.__storage.load().to_banknotes()
+
+class CassetteBanknoteStorage(IBanknoteStorage):
+    """Implements banknotes storage, which operates on counts of banknotes per denomination instead of separate banknotes."""
+    def __init__(self, storage: IStorage[Cassette], change_making_strategy: IChangeMakingStrategy = None) -> None:
+        self.__storage = storage
+        self.__change_making_strategy = change_making_strategy or DynamicProgrammingChangeMakingStrategy()
+        self.__dispensable_amounts = None
+
+    def get_cash_available(self) -> Money:
+        return self.__storage.load().total
+
+    def can_dispense(self, amount: Decimal) -> bool:
+        """Checks whether the amount can be withdrawn exactly, using the table kept up to date by withdrawals and deposits."""
+        return self.__get_dispensable_amounts().can_dispense(amount)
+
+    def get_nearest_dispensable_amounts(self, amount: Decimal) -> tuple[Decimal, Decimal]:
+        return self.__get_dispensable_amounts().get_nearest_dispensable_amounts(amount)
+
+    def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        AmountValidator.validate_amount(amount)
+        if amount == 0:
+            return []
+
+        cassette = self.__storage.load()
+        if cassette.total < amount:
+            raise NotEnoughMoneyInStorageException("There is not enough money in storage to withdraw", amount)
+
+        banknotes_withdrawed = self.__make_change_algorithm(cassette, amount)
+        self.__storage.save(cassette)
+        self.__update_dispensable_amounts(cassette)
+        return banknotes_withdrawed
+
+    def __make_change_algorithm(self, cassette: Cassette, amount: Decimal) -> list[Banknote]:
+        banknotes_to_withdraw = self.__change_making_strategy.make_change(cassette.counts, amount)
+
+        banknotes_withdrawed = []
+        for denomination in sorted(banknotes_to_withdraw, reverse=True):
+            count = banknotes_to_withdraw[denomination]
+            cassette.remove(denomination, count)
+            banknotes_withdrawed.extend([Banknote(denomination)] * count)
+
+        return banknotes_withdrawed
+
+    def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        self.deposit_cassette(Cassette.from_banknotes(banknotes))
+
+    def deposit_cassette(self, cassette: Cassette) -> None:
+        stored_cassette = self.__storage.load()
+        for denomination, count in cassette.counts.items():
+            stored_cassette.add(denomination, count)
+        self.__storage.save(stored_cassette)
+        self.__update_dispensable_amounts(stored_cassette)
+
+    @property
+    def supports_batch(self) -> bool:
+        return True
+
+    @contextmanager
+    def batch(self):
+        storage = self.__storage
+        buffered_storage = BufferedStorage(storage)
+        self.__storage = buffered_storage
+        try:
+            yield self
+        except BaseException:
+            # Changes of the batch are discarded, so the table built from them is dropped as well.
+            self.__dispensable_amounts = None
+            raise
+        finally:
+            self.__storage = storage
+        buffered_storage.commit()
+
+    def __get_dispensable_amounts(self) -> DispensableAmountsTable:
+        if self.__dispensable_amounts is None:
+            self.__dispensable_amounts = DispensableAmountsTable(self.__storage.load().counts)
+
+        return self.__dispensable_amounts
+
+    def __update_dispensable_amounts(self, cassette: Cassette) -> None:
+        if self.__dispensable_amounts is not None:
+            self.__dispensable_amounts.update(cassette.counts)
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from decimal import Decimal
+from math import gcd
+
+class IChangeMakingStrategy(ABC):
+    """Contains methods for choosing the banknotes to dispense."""
+    @abstractmethod
+    def make_change(self, counts: dict[Decimal, int], amount: Decimal) -> dict[Decimal, int]:
+        """Returns count of banknotes per denomination with sum equal to amount or the closest below it, if amount can't be made exactly.
+        The change isn't checked against the amount, so callers, which charge the amount, must compare its sum with it."""
+        pass
+
+class GreedyChangeMakingStrategy(IChangeMakingStrategy):
+    """Takes as many of the largest banknotes as possible. Fast, but may miss an exact combination, e.g. 60 from 50, 20, 20, 20."""
+    def make_change(self, counts: dict[Decimal, int], amount: Decimal) -> dict[Decimal, int]:
+        change = {}
+        current_amount = Decimal()
+        for denomination in sorted(counts, reverse=True):
+            count = min(counts[denomination], int((amount - current_amount) // denomination))
+            if count > 0:
+                change[denomination] = count
+                current_amount += denomination * count
+
+        return change
+
+class DynamicProgrammingChangeMakingStrategy(IChangeMakingStrategy):
+    """Solves bounded change-making with the fewest banknotes.
+
+    Amounts are measured in units of the denominations' greatest common divisor, and every denomination is
+    processed with a sliding window minimum over its residue classes, so it takes O(amount / gcd * denominations)
+    time. An exact combination is always found if one exists, otherwise the change of the largest reachable amount below
+    is returned, which callers tell apart by its sum."""
+    def make_change(self, counts: dict[Decimal, int], amount: Decimal) -> dict[Decimal, int]:
+        denominations = sorted(denomination for denomination, count in counts.items() if count > 0)
+        if not denominations or amount <= 0:
+            return {}
+
+        scale = 10 ** max(max(-Decimal(denomination).as_tuple().exponent, 0) for denomination in denominations)
+        scaled_values = [int(Decimal(denomination) * scale) for denomination in denominations]
+        unit = 0
+        for value in scaled_values:
+            unit = gcd(unit, value)
+
+        weights = [value // unit for value in scaled_values]
+        total_units = sum(weight * counts[denomination] for weight, denomination in zip(weights, denominations))
+        target = min(int(Decimal(amount) * scale // unit), total_units)
+
+        used_per_denomination = []
+        notes = [0] + [None] * target
+        for weight, denomination in zip(weights, denominations):
+            notes, used = self.__add_denomination(notes, weight, min(counts[denomination], target // weight), target)
+            used_per_denomination.append(used)
+
+        reachable = target
+        while notes[reachable] is None:
+            reachable -= 1
+
+        change = {}
+        for denomination, weight, used in reversed(list(zip(denominations, weights, used_per_denomination))):
+            if used[reachable] > 0:
+                change[denomination] = used[reachable]
+                reachable -= used[reachable] * weight
+
+        return change
+
+    def __add_denomination(self, notes: list, weight: int, count: int, target: int) -> tuple[list, list[int]]:
+        """Computes the fewest banknotes for every amount with up to count banknotes of the weight added."""
+        new_notes = [None] * (target + 1)
+        used = [0] * (target + 1)
+        for residue in range(min(weight, target + 1)):
+            window = deque()
+            for step, units in enumerate(range(residue, target + 1, weight)):
+                if notes[units] is not None:
+                    value = notes[units] - step
+                    while window and window[-1][1] > value:
+                        window.pop()
+                    window.append((step, value))
+
+                while window and window[0][0] < step - count:
+                    window.popleft()
+
+                if window:
+                    best_step, best_value = window[0]
+                    new_notes[units] = best_value + step
+                    used[units] = step - best_step
+
+        return new_notes, used
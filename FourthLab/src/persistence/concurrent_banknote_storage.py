@@ -0,0 +1,122 @@
+import threading
+from collections import Counter
+from decimal import Decimal
+from src.persistence.data_storage import IStorage
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import IBanknoteStorage, AmountValidator, NotEnoughMoneyInStorageException
+from src.persistence.cassette import Cassette
+from src.persistence.change_making import IChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
+from src.persistence.money import Money
+
+class ConcurrentCassetteBanknoteStorage(IBanknoteStorage):
+    """Implements banknotes storage, which can be shared by parallel sessions without a global lock.
+
+    Withdrawals are optimistic: the banknotes are chosen from a snapshot of the counts, then only the locks
+    of the chosen denominations are taken in a fixed order and the banknotes are reserved, if they're still
+    there. Otherwise the withdrawal is planned again from a fresh snapshot. Deposits lock only the denominations
+    they add. The state is saved after every change, and a save is skipped when no change happened since the last one."""
+    def __init__(self, storage: IStorage[Cassette], change_making_strategy: IChangeMakingStrategy = None) -> None:
+        self.__storage = storage
+        self.__change_making_strategy = change_making_strategy or DynamicProgrammingChangeMakingStrategy()
+        self.__counts = storage.load().counts
+        self.__denomination_locks = {denomination: threading.Lock() for denomination in self.__counts}
+        self.__locks_creation_lock = threading.Lock()
+        self.__save_lock = threading.Lock()
+        self.__has_unsaved_changes = False
+
+    def get_cash_available(self) -> Money:
+        return self.__calculate_total(self.__get_counts_snapshot())
+
+    def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        AmountValidator.validate_amount(amount)
+        if amount == 0:
+            return []
+
+        while True:
+            counts = self.__get_counts_snapshot()
+            if self.__calculate_total(counts) < amount:
+                raise NotEnoughMoneyInStorageException("There is not enough money in storage to withdraw", amount)
+
+            banknotes_to_withdraw = self.__change_making_strategy.make_change(counts, amount)
+            if self.__reserve(banknotes_to_withdraw):
+                break
+
+        try:
+            self.__save()
+        except BaseException:
+            self.__release(banknotes_to_withdraw)
+            raise
+
+        banknotes_withdrawed = []
+        for denomination in sorted(banknotes_to_withdraw, reverse=True):
+            banknotes_withdrawed.extend([Banknote(denomination)] * banknotes_to_withdraw[denomination])
+
+        return banknotes_withdrawed
+
+    def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        self.__release(Counter(banknote.value for banknote in banknotes))
+        self.__save()
+
+    def deposit_cassette(self, cassette: Cassette) -> None:
+        self.__release(cassette.counts)
+        self.__save()
+
+    def __calculate_total(self, counts: dict[Decimal, int]) -> Money:
+        return Money.from_minor_units(sum(Banknote(denomination).minor_units * banknotes_count for denomination, banknotes_count in counts.items()))
+
+    def __get_counts_snapshot(self) -> dict[Decimal, int]:
+        # Copying of a dictionary is atomic in CPython, and every count is changed only under its denomination lock.
+        return dict(self.__counts)
+
+    def __get_lock(self, denomination: Decimal) -> threading.Lock:
+        lock = self.__denomination_locks.get(denomination)
+        if lock is None:
+            with self.__locks_creation_lock:
+                lock = self.__denomination_locks.setdefault(denomination, threading.Lock())
+
+        return lock
+
+    def __reserve(self, banknotes_to_reserve: dict[Decimal, int]) -> bool:
+        """Takes the banknotes out of the counts, if all of them are still available."""
+        locks = [self.__get_lock(denomination) for denomination in sorted(banknotes_to_reserve)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            for denomination, banknotes_count in banknotes_to_reserve.items():
+                if self.__counts.get(denomination, 0) < banknotes_count:
+                    return False
+
+            for denomination, banknotes_count in banknotes_to_reserve.items():
+                self.__counts[denomination] -= banknotes_count
+            self.__has_unsaved_changes = True
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def __release(self, banknotes_to_release: dict[Decimal, int]) -> None:
+        """Puts the banknotes back to the counts."""
+        locks = [self.__get_lock(denomination) for denomination in sorted(banknotes_to_release)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            for denomination, banknotes_count in banknotes_to_release.items():
+                self.__counts[denomination] = self.__counts.get(denomination, 0) + banknotes_count
+            self.__has_unsaved_changes = True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def __save(self) -> None:
+        with self.__save_lock:
+            # The flag is set after the counts are changed, so every change made before it's cleared
+            # gets into the snapshot, and every change made after it will be saved by its own thread.
+            if not self.__has_unsaved_changes:
+                return
+
+            self.__has_unsaved_changes = False
+            try:
+                self.__storage.save(Cassette(self.__get_counts_snapshot()))
+            except BaseException:
+                self.__has_unsaved_changes = True
+                raise
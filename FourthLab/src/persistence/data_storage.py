@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
 from typing import TypeVar, Generic
 from json import JSONEncoder
+import copy
 import json
+import os
+import tempfile
+import threading
+import time
 
 T = TypeVar('T')
 
@@ -18,14 +23,32 @@ class IStorage(ABC, Generic[T]):
         pass
 
 class JsonFileStorage(IStorage[T]):
-    """Represents data storage based on JSON file."""
-    def __init__(self, path: str) -> None:
+    """Represents data storage based on JSON file.
+
+    In atomic mode data is written to a temporary file, flushed to disk and renamed over the target,
+    so a crash in the middle of the write leaves either the old or the new file, but never a truncated one."""
+    def __init__(self, path: str, atomic: bool = False) -> None:
         self.__path = path
+        self.__atomic = atomic
+
+    @property
+    def path(self) -> str:
+        return self.__path
 
     def save(self, data: T) -> None:
-        serialized_data = json.dumps(data, indent=4, cls=JsonEncoder)
-        with open(self.__path, 'w') as file:
-            file.write(serialized_data)
+        self.write(self.serialize(data))
+
+    def serialize(self, data: T) -> str:
+        return json.dumps(data, indent=4, cls=JsonEncoder)
+
+    def write(self, serialized_data: str) -> None:
+        """Writes already serialized data to the file."""
+        if not self.__atomic:
+            with open(self.__path, 'w') as file:
+                file.write(serialized_data)
+            return
+
+        replace_file_atomically(self.__path, serialized_data.encode())
 
     def load(self):
         with open(self.__path, 'r') as file:
@@ -33,6 +56,33 @@ class JsonFileStorage(IStorage[T]):
 
         return deserialized_data
 
+def replace_file_atomically(path: str, data: bytes) -> None:
+    """Writes data to a temporary file, flushes it to disk and renames it over the target file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+    # Makes the rename itself durable. Not every platform allows to open a directory, so it's best effort.
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
 class JsonEncoder(JSONEncoder):
     def default(self, o):
         return str(o)
@@ -45,4 +95,201 @@ class InMemoryStorage(IStorage[T]):
         self.__data = data
         
     def load(self) -> T:
-        return self.__data
\ No newline at end of file
+        return self.__data
+
+class BufferedStorage(IStorage[T]):
+    """Decorates storage, so data is loaded once and all saves are kept in memory until commit.
+
+    The loaded data is copied, so changes made in place don't reach the decorated storage before commit."""
+    __NOT_LOADED = object()
+
+    def __init__(self, storage: IStorage[T]) -> None:
+        self.__storage = storage
+        self.__data = self.__NOT_LOADED
+        self.__has_changes = False
+
+    def save(self, data: T) -> None:
+        self.__data = data
+        self.__has_changes = True
+
+    def load(self) -> T:
+        if self.__data is self.__NOT_LOADED:
+            self.__data = copy.copy(self.__storage.load())
+
+        return self.__data
+
+    @property
+    def has_changes(self) -> bool:
+        return self.__has_changes
+
+    def commit(self) -> None:
+        """Saves the last data to the decorated storage, if it was changed."""
+        if self.__has_changes:
+            self.__storage.save(self.__data)
+            self.__has_changes = False
+
+class CachingStorage(IStorage[T]):
+    """Decorates file based storage, so the loaded data is kept in memory until the file is changed.
+
+    Saves are passed through to the decorated storage. The file is checked by its modification time, size and inode
+    on every load, so changes made by other processes are noticed. Copies of the cached data are returned,
+    so callers are free to change them in place."""
+    def __init__(self, storage: IStorage[T], path: str) -> None:
+        self.__storage = storage
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__data = None
+        self.__file_signature = None
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def save(self, data: T) -> None:
+        with self.__lock:
+            self.__file_signature = None
+            self.__storage.save(data)
+            self.__data = copy.copy(data)
+            self.__file_signature = self.__get_file_signature()
+
+    def load(self) -> T:
+        with self.__lock:
+            file_signature = self.__get_file_signature()
+            if file_signature is not None and file_signature == self.__file_signature:
+                self.__hits += 1
+                return copy.copy(self.__data)
+
+            self.__misses += 1
+            data = self.__storage.load()
+            self.__data = copy.copy(data)
+            self.__file_signature = file_signature
+            return data
+
+    def invalidate(self) -> None:
+        """Drops the cached data, so the next load reads the file."""
+        with self.__lock:
+            self.__data = None
+            self.__file_signature = None
+
+    def __get_file_signature(self):
+        try:
+            stat = os.stat(self.__path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class GroupCommitJsonFileStorage(IStorage[T]):
+    """Decorates atomic JsonFileStorage, so saves arriving within the commit window are merged into one durable write.
+
+    Every save replaces the pending data, since it holds the whole state, and a single writer thread persists
+    the latest one. Saves arriving while a write is in progress are always merged into the next write, and
+    a non-zero commit window makes the writer wait a bit longer to gather more of them.
+    Callers either wait until their data is on disk or return right after the data is queued.
+    A failed write stops the writer, and every following save raises the error instead of queueing the data."""
+    def __init__(self, storage: JsonFileStorage, commit_window: float = 0.0, wait_for_durability: bool = True) -> None:
+        self.__storage = storage
+        self.__commit_window = commit_window
+        self.__wait_for_durability = wait_for_durability
+        self.__condition = threading.Condition()
+        self.__pending_data = None
+        self.__queued_generation = 0
+        self.__durable_generation = 0
+        self.__commits_count = 0
+        self.__error = None
+        self.__closed = False
+        self.__writer = threading.Thread(target=self.__write_pending, daemon=True)
+        self.__writer.start()
+
+    @property
+    def commits_count(self) -> int:
+        """Number of durable writes made, which is less than number of saves when they're grouped."""
+        return self.__commits_count
+
+    def save(self, data: T, wait_for_durability: bool = None) -> None:
+        serialized_data = self.__storage.serialize(data)
+        with self.__condition:
+            if self.__closed:
+                raise StorageIsClosedException("Unable to save data to the closed storage.")
+            if self.__error is not None:
+                # The writer has stopped on the error, so nothing queued from now on would reach the disk.
+                raise self.__error
+
+            self.__pending_data = serialized_data
+            self.__queued_generation += 1
+            generation = self.__queued_generation
+            self.__condition.notify_all()
+
+            if wait_for_durability is None:
+                wait_for_durability = self.__wait_for_durability
+            if wait_for_durability:
+                self.__wait_for_generation(generation)
+
+    def load(self) -> T:
+        with self.__condition:
+            if self.__pending_data is not None:
+                return json.loads(self.__pending_data)
+
+        return self.__storage.load()
+
+    def flush(self) -> None:
+        """Waits until all queued data is written to disk."""
+        with self.__condition:
+            self.__wait_for_generation(self.__queued_generation)
+
+    def close(self) -> None:
+        """Writes queued data and stops the writer thread."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+        self.__writer.join()
+        if self.__error is not None:
+            raise self.__error
+
+    def __wait_for_generation(self, generation: int) -> None:
+        while self.__durable_generation < generation and self.__error is None:
+            self.__condition.wait()
+
+        if self.__error is not None:
+            raise self.__error
+
+    def __write_pending(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__pending_data is None and not self.__closed:
+                    self.__condition.wait()
+                if self.__pending_data is None:
+                    return
+
+            if self.__commit_window > 0 and not self.__closed:
+                time.sleep(self.__commit_window)
+
+            with self.__condition:
+                serialized_data = self.__pending_data
+                generation = self.__queued_generation
+
+            try:
+                self.__storage.write(serialized_data)
+            except Exception as error:
+                with self.__condition:
+                    self.__error = error
+                    self.__condition.notify_all()
+                return
+
+            with self.__condition:
+                self.__durable_generation = generation
+                self.__commits_count += 1
+                if self.__queued_generation == generation:
+                    self.__pending_data = None
+                self.__condition.notify_all()
+
+class StorageIsClosedException(Exception):
+    """Exception raised when trying to save data to the closed storage."""
+    pass
\ No newline at end of file
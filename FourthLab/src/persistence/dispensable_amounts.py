@@ -0,0 +1,179 @@
+import re
+from decimal import Decimal, ROUND_CEILING
+from math import gcd
+
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+class DispensableAmountsTable:
+    """Represents the set of amounts, which can be made exactly from the banknotes counts.
+
+    Amounts are measured in units of the denominations' greatest common divisor and kept as bits of an integer,
+    one layer per denomination: a layer holds amounts reachable with its denomination and all the previous ones.
+    Banknotes of a denomination are added as shifts by 1, 2, 4, ... banknotes, so adding is exact and takes
+    O(log count) shifts. Removing banknotes recomputes only the layers starting from the changed denomination,
+    and the largest denominations, which are dispensed most often, are kept in the last layers.
+    The final layer is copied to bytes, so checking an amount doesn't depend on the table size,
+    and the nearest dispensable amounts are found by scanning the bytes around the amount."""
+    def __init__(self, counts: dict[Decimal, int] = None, limit: Decimal = None) -> None:
+        self.__limit = limit
+        self.__rebuild({denomination: count for denomination, count in (counts or {}).items() if count > 0})
+
+    @property
+    def counts(self) -> dict[Decimal, int]:
+        return {denomination: count for denomination, count in zip(self.__denominations, self.__counts) if count > 0}
+
+    @property
+    def limit(self) -> Decimal:
+        """The largest amount the table covers. None means the sum of all banknotes."""
+        return self.__limit
+
+    def add(self, denomination: Decimal, count: int = 1) -> None:
+        if count <= 0:
+            return
+        if denomination not in self.__denominations or not self.__is_multiple_of_unit(denomination):
+            counts = self.counts
+            counts[denomination] = counts.get(denomination, 0) + count
+            return self.__rebuild(counts)
+
+        index = self.__denominations.index(denomination)
+        self.__counts[index] += count
+        self.__resize()
+        for layer in range(index, len(self.__layers)):
+            self.__layers[layer] = self.__shift_banknotes(self.__layers[layer], self.__weights[index], count)
+        self.__update_final_layer()
+
+    def remove(self, denomination: Decimal, count: int = 1) -> None:
+        if count <= 0 or denomination not in self.__denominations:
+            return
+
+        index = self.__denominations.index(denomination)
+        self.__counts[index] = max(self.__counts[index] - count, 0)
+        self.__resize()
+        self.__recompute_layers(index)
+
+    def update(self, counts: dict[Decimal, int]) -> None:
+        """Applies the difference between the current and the new counts."""
+        old_counts = self.counts
+        for denomination in old_counts.keys() | counts.keys():
+            difference = counts.get(denomination, 0) - old_counts.get(denomination, 0)
+            if difference < 0:
+                self.remove(denomination, -difference)
+        for denomination in counts:
+            difference = counts[denomination] - old_counts.get(denomination, 0)
+            if difference > 0:
+                self.add(denomination, difference)
+
+    def can_dispense(self, amount: Decimal) -> bool:
+        units = self.__convert_to_units(amount)
+        if units is None or units >= self.__size:
+            return False
+
+        return self.__final_layer_bytes[units >> 3] >> (units & 7) & 1 == 1
+
+    def get_nearest_dispensable_amounts(self, amount: Decimal) -> tuple[Decimal, Decimal]:
+        """Returns the largest dispensable amount not above the amount and the smallest one not below it.
+        Either of them is None, if there's no such amount."""
+        if amount < 0:
+            return None, self.__convert_to_amount(0)
+
+        units_below = min(int(Decimal(amount) // self.__unit), self.__size - 1)
+        units_above = int((Decimal(amount) / self.__unit).to_integral_value(ROUND_CEILING))
+        return self.__convert_to_amount(self.__find_set_bit_below(units_below)), self.__convert_to_amount(self.__find_set_bit_above(units_above))
+
+    def __rebuild(self, counts: dict[Decimal, int]) -> None:
+        self.__denominations = sorted(counts)
+        self.__counts = [counts[denomination] for denomination in self.__denominations]
+        self.__unit = self.__calculate_unit(self.__denominations)
+        self.__weights = [int(denomination / self.__unit) for denomination in self.__denominations]
+        self.__layers = [0] * len(self.__denominations)
+        self.__resize()
+        self.__recompute_layers(0)
+
+    def __resize(self) -> None:
+        """Calculates the number of covered amounts, so the layers never keep amounts above the limit."""
+        total_units = sum(weight * count for weight, count in zip(self.__weights, self.__counts))
+        if self.__limit is not None:
+            total_units = min(total_units, max(int(Decimal(self.__limit) // self.__unit), 0))
+
+        self.__size = total_units + 1
+        self.__mask = (1 << self.__size) - 1
+
+    def __recompute_layers(self, start: int) -> None:
+        reachable = self.__layers[start - 1] if start > 0 else 1
+        for layer in range(start, len(self.__layers)):
+            reachable = self.__shift_banknotes(reachable, self.__weights[layer], self.__counts[layer])
+            self.__layers[layer] = reachable
+        self.__update_final_layer()
+
+    def __shift_banknotes(self, reachable: int, weight: int, count: int) -> int:
+        """Adds up to count banknotes of the weight to every reachable amount."""
+        reachable &= self.__mask
+        piece = 1
+        while count > 0 and reachable != self.__mask:
+            piece = min(piece, count)
+            reachable = (reachable | reachable << weight * piece) & self.__mask
+            count -= piece
+            piece *= 2
+
+        return reachable
+
+    def __update_final_layer(self) -> None:
+        final_layer = self.__layers[-1] & self.__mask if self.__layers else 1
+        self.__final_layer_bytes = final_layer.to_bytes((self.__size + 7) // 8, "little")
+        # Reversed copy lets the nearest amount below be found by a forward search as well.
+        self.__reversed_final_layer_bytes = self.__final_layer_bytes[::-1]
+
+    def __find_set_bit_below(self, units: int):
+        byte_index = units >> 3
+        byte = self.__final_layer_bytes[byte_index] & ((2 << (units & 7)) - 1)
+        if byte:
+            return byte_index * 8 + byte.bit_length() - 1
+
+        match = NONZERO_BYTE.search(self.__reversed_final_layer_bytes, len(self.__final_layer_bytes) - byte_index)
+        if match is None:
+            return None
+
+        byte_index = len(self.__final_layer_bytes) - 1 - match.start()
+        return byte_index * 8 + self.__final_layer_bytes[byte_index].bit_length() - 1
+
+    def __find_set_bit_above(self, units: int):
+        if units >= self.__size:
+            return None
+
+        byte_index = units >> 3
+        byte = self.__final_layer_bytes[byte_index] >> (units & 7)
+        if byte:
+            return units + (byte & -byte).bit_length() - 1
+
+        match = NONZERO_BYTE.search(self.__final_layer_bytes, byte_index + 1)
+        if match is None:
+            return None
+
+        byte = self.__final_layer_bytes[match.start()]
+        return match.start() * 8 + (byte & -byte).bit_length() - 1
+
+    def __calculate_unit(self, denominations: list[Decimal]) -> Decimal:
+        if not denominations:
+            return Decimal(1)
+
+        scale = 10 ** max(max(-Decimal(denomination).as_tuple().exponent, 0) for denomination in denominations)
+        unit = 0
+        for denomination in denominations:
+            unit = gcd(unit, int(Decimal(denomination) * scale))
+
+        return Decimal(unit) / scale
+
+    def __is_multiple_of_unit(self, denomination: Decimal) -> bool:
+        return Decimal(denomination) % self.__unit == 0
+
+    def __convert_to_units(self, amount: Decimal):
+        if amount < 0 or Decimal(amount) % self.__unit != 0:
+            return None
+
+        return int(Decimal(amount) / self.__unit)
+
+    def __convert_to_amount(self, units: int) -> Decimal:
+        if units is None or units < 0:
+            return None
+
+        return units * self.__unit
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+from src.persistence.data_storage import IStorage, JsonFileStorage
+from src.persistence.cassette import Cassette
+
+SNAPSHOT_SEQUENCE_KEY = "sequence"
+SNAPSHOT_CASSETTE_KEY = "cassette"
+RECORD_SEQUENCE_KEY = "s"
+RECORD_DELTA_KEY = "d"
+COMPACTING_JOURNAL_SUFFIX = ".compacting"
+
+class JournaledCassetteStorage(IStorage[Cassette]):
+    """Represents cassette storage based on a JSON snapshot and an append-only journal of changes.
+
+    Every save appends one compact record with per-denomination count deltas instead of rewriting the whole file.
+    The current state is rebuilt from the snapshot plus the journal on the first load. Once the journal grows past
+    the compaction threshold, it's folded into a new snapshot by a background thread."""
+    def __init__(self, snapshot_path: str, journal_path: str = None, compaction_threshold: int = 64 * 1024, fsync: bool = False) -> None:
+        self.__snapshot_path = snapshot_path
+        self.__journal_path = journal_path or snapshot_path + ".journal"
+        self.__compaction_threshold = compaction_threshold
+        self.__fsync = fsync
+        self.__lock = threading.Lock()
+        self.__compaction_lock = threading.Lock()
+        self.__cassette = None
+        self.__sequence = 0
+        self.__journal = None
+        self.__compaction_thread = None
+        self.__bytes_read = 0
+        self.__bytes_written = 0
+
+    @property
+    def bytes_read(self) -> int:
+        return self.__bytes_read
+
+    @property
+    def bytes_written(self) -> int:
+        """Number of bytes appended to the journal and written to snapshots."""
+        return self.__bytes_written
+
+    @property
+    def journal_size(self) -> int:
+        with self.__lock:
+            self.__ensure_loaded()
+            return self.__journal.tell()
+
+    def save(self, data: Cassette) -> None:
+        with self.__lock:
+            self.__ensure_loaded()
+            delta = self.__calculate_delta(self.__cassette, data)
+            if not delta:
+                return
+
+            self.__sequence += 1
+            record = json.dumps({RECORD_SEQUENCE_KEY: self.__sequence, RECORD_DELTA_KEY: delta}, separators=(',', ':'))
+            self.__journal.write(record + "\n")
+            self.__journal.flush()
+            self.__bytes_written += len(record) + 1
+            if self.__fsync:
+                os.fsync(self.__journal.fileno())
+
+            self.__cassette = data.copy()
+            if self.__journal.tell() >= self.__compaction_threshold and self.__compaction_thread is None:
+                self.__compaction_thread = threading.Thread(target=self.__compact_in_background, daemon=True)
+                self.__compaction_thread.start()
+
+    def load(self) -> Cassette:
+        with self.__lock:
+            self.__ensure_loaded()
+            return self.__cassette.copy()
+
+    def compact(self) -> None:
+        """Folds the journal into a new snapshot."""
+        with self.__compaction_lock:
+            self.__compact()
+
+    def __compact(self) -> None:
+        with self.__lock:
+            self.__ensure_loaded()
+            cassette = self.__cassette.copy()
+            sequence = self.__sequence
+            compacting_path = self.__journal_path + COMPACTING_JOURNAL_SUFFIX
+            self.__journal.close()
+            if os.path.exists(compacting_path):
+                self.__append_file(self.__journal_path, compacting_path)
+                os.remove(self.__journal_path)
+            else:
+                os.replace(self.__journal_path, compacting_path)
+            self.__journal = open(self.__journal_path, 'a')
+
+        self.__bytes_written += self.__write_snapshot(cassette, sequence)
+        os.remove(compacting_path)
+
+    def __compact_in_background(self) -> None:
+        try:
+            self.compact()
+        finally:
+            with self.__lock:
+                self.__compaction_thread = None
+
+    def close(self) -> None:
+        """Waits for the running compaction and closes the journal."""
+        compaction_thread = self.__compaction_thread
+        if compaction_thread is not None and compaction_thread is not threading.current_thread():
+            compaction_thread.join()
+
+        with self.__lock:
+            if self.__journal is not None:
+                self.__journal.close()
+                self.__journal = None
+                self.__cassette = None
+
+    def __ensure_loaded(self) -> None:
+        if self.__cassette is not None:
+            return
+
+        cassette, sequence = self.__read_snapshot()
+        for path in (self.__journal_path + COMPACTING_JOURNAL_SUFFIX, self.__journal_path):
+            sequence = self.__replay_journal(path, cassette, sequence)
+
+        self.__cassette = cassette
+        self.__sequence = sequence
+        self.__journal = open(self.__journal_path, 'a')
+
+    def __read_snapshot(self) -> tuple[Cassette, int]:
+        if not os.path.exists(self.__snapshot_path):
+            return Cassette(), 0
+
+        with open(self.__snapshot_path, 'r') as file:
+            deserialized_data = json.load(file)
+        self.__bytes_read += os.path.getsize(self.__snapshot_path)
+
+        if isinstance(deserialized_data, list):
+            return Cassette.from_values(deserialized_data), 0
+        if SNAPSHOT_SEQUENCE_KEY not in deserialized_data:
+            return Cassette.from_json(deserialized_data), 0
+
+        return Cassette.from_json(deserialized_data[SNAPSHOT_CASSETTE_KEY]), deserialized_data[SNAPSHOT_SEQUENCE_KEY]
+
+    def __replay_journal(self, path: str, cassette: Cassette, sequence: int) -> int:
+        if not os.path.exists(path):
+            return sequence
+
+        with open(path, 'rb+') as file:
+            valid_size = 0
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Journal record is not terminated.")
+                    record = json.loads(line)
+                    record_sequence, delta = record[RECORD_SEQUENCE_KEY], record[RECORD_DELTA_KEY]
+                except (ValueError, TypeError, KeyError):
+                    if file.read(1):
+                        raise CorruptedJournalException("Journal", path, "has an invalid record at byte", valid_size, "followed by other records.")
+
+                    # The last record is torn by a crash in the middle of the write, so it's cut off
+                    # to keep the following appends readable.
+                    file.truncate(valid_size)
+                    break
+
+                valid_size += len(line)
+                self.__bytes_read += len(line)
+                if record_sequence <= sequence:
+                    continue
+
+                for denomination, count in delta.items():
+                    if count > 0:
+                        cassette.add(int(denomination), count)
+                    else:
+                        cassette.remove(int(denomination), -count)
+                sequence = record_sequence
+
+        return sequence
+
+    def __write_snapshot(self, cassette: Cassette, sequence: int) -> int:
+        snapshot = json.dumps({SNAPSHOT_SEQUENCE_KEY: sequence, SNAPSHOT_CASSETTE_KEY: cassette.to_json()})
+        JsonFileStorage(self.__snapshot_path, atomic=True).write(snapshot)
+        return len(snapshot)
+
+    def __append_file(self, source_path: str, target_path: str) -> None:
+        with open(source_path, 'r') as source, open(target_path, 'a') as target:
+            target.write(source.read())
+
+    def __calculate_delta(self, old: Cassette, new: Cassette) -> dict[str, int]:
+        old_counts = old.counts
+        new_counts = new.counts
+        delta = {}
+        for denomination in old_counts.keys() | new_counts.keys():
+            difference = new_counts.get(denomination, 0) - old_counts.get(denomination, 0)
+            if difference != 0:
+                delta[denomination.__str__()] = difference
+
+        return delta
+
+class CorruptedJournalException(Exception):
+    """Exception raised when the journal has an invalid record, which isn't the torn last one."""
+    pass
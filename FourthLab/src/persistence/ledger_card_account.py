@@ -0,0 +1,173 @@
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from src.persistence.banknote_storage import AmountValidator, NegativeMoneyAmountException
+from src.persistence.card_account import ICardAccount, NotEnoughMoneyOnBalanceException
+from src.persistence.money import Money, InvalidMoneyAmountException
+
+LEDGER_TIME_KEY = "t"
+LEDGER_AMOUNT_KEY = "a"
+LEDGER_BALANCE_KEY = "b"
+
+class LedgerCardAccount(ICardAccount):
+    """Represents the card account as an append-only ledger of signed balance changes with their timestamps.
+
+    Every change appends one JSON line to the ledger file, and a balance snapshot line follows every snapshot interval
+    changes. The current balance is kept in memory. The balance at a past moment is the closest snapshot before it plus
+    at most snapshot interval changes, which are both found by binary search. Account without a path isn't persisted."""
+    def __init__(self, ledger_path: str = None, opening_balance: Decimal = Decimal(), snapshot_interval: int = 64,
+                 clock=time.time, fsync: bool = False) -> None:
+        if snapshot_interval <= 0:
+            raise InvalidSnapshotIntervalException("Snapshot interval must be positive.")
+
+        self.__ledger_path = ledger_path
+        self.__snapshot_interval = snapshot_interval
+        self.__clock = clock
+        self.__fsync = fsync
+        self.__timestamps = []
+        self.__amounts = []
+        # Snapshot is the balance after the number of changes at the same index.
+        self.__snapshot_positions = [0]
+        self.__snapshot_balances = [Money()]
+        self.__balance = Money()
+        self.__ledger = None
+        if ledger_path is not None:
+            self.__read_ledger()
+            self.__ledger = open(ledger_path, 'a')
+
+        if not self.__amounts and opening_balance:
+            self.deposit_cash(opening_balance)
+
+    @property
+    def balance(self) -> Money:
+        return self.__balance
+
+    @property
+    def ledger_path(self) -> str:
+        return self.__ledger_path
+
+    def withdraw_cash(self, amount: Decimal) -> None:
+        amount = Money(amount)
+        AmountValidator.validate_amount(amount)
+        if self.balance - amount < 0:
+            raise NotEnoughMoneyOnBalanceException("Card balance doesn't have", amount, "money to withdraw.")
+        self.__append(-amount)
+
+    def deposit_cash(self, amount: Decimal) -> None:
+        amount = Money(amount)
+        if amount < 0:
+            raise NegativeMoneyAmountException("Unable to deposit negative amount of cash.")
+        self.__append(amount)
+
+    def view_balance(self) -> Money:
+        return self.__balance
+
+    def balance_at(self, timestamp: float) -> Money:
+        """Returns the balance after all changes made at the timestamp or earlier."""
+        position = bisect_right(self.__timestamps, timestamp)
+        snapshot_index = bisect_right(self.__snapshot_positions, position) - 1
+        balance = self.__snapshot_balances[snapshot_index]
+        for amount in self.__amounts[self.__snapshot_positions[snapshot_index]:position]:
+            balance += amount
+
+        return balance
+
+    def history(self, start: float = None, end: float = None) -> list[tuple[float, Money]]:
+        """Returns (timestamp, signed amount) changes made from the start to the end inclusive."""
+        first = 0 if start is None else bisect_left(self.__timestamps, start)
+        last = len(self.__timestamps) if end is None else bisect_right(self.__timestamps, end)
+        return list(zip(self.__timestamps[first:last], self.__amounts[first:last]))
+
+    def close(self) -> None:
+        if self.__ledger is not None:
+            self.__ledger.close()
+            self.__ledger = None
+
+    def __append(self, amount: Money) -> None:
+        if amount == 0:
+            return
+
+        # Timestamps must not go down for the binary search, even if the system clock is moved back.
+        timestamp = self.__clock()
+        if self.__timestamps and timestamp < self.__timestamps[-1]:
+            timestamp = self.__timestamps[-1]
+
+        balance = self.__balance + amount
+        lines = [{LEDGER_TIME_KEY: timestamp, LEDGER_AMOUNT_KEY: amount.__str__()}]
+        is_snapshot = (len(self.__amounts) + 1) % self.__snapshot_interval == 0
+        if is_snapshot:
+            lines.append({LEDGER_TIME_KEY: timestamp, LEDGER_BALANCE_KEY: balance.__str__()})
+        self.__write(lines)
+
+        self.__timestamps.append(timestamp)
+        self.__amounts.append(amount)
+        self.__balance = balance
+        if is_snapshot:
+            self.__add_snapshot(balance)
+
+    def __add_snapshot(self, balance: Money) -> None:
+        self.__snapshot_positions.append(len(self.__amounts))
+        self.__snapshot_balances.append(balance)
+
+    def __write(self, lines: list[dict]) -> None:
+        if self.__ledger is None:
+            return
+
+        self.__ledger.write("".join(json.dumps(line, separators=(',', ':')) + "\n" for line in lines))
+        self.__ledger.flush()
+        if self.__fsync:
+            os.fsync(self.__ledger.fileno())
+
+    def __read_ledger(self) -> None:
+        if not os.path.exists(self.__ledger_path):
+            return
+
+        with open(self.__ledger_path, 'rb+') as file:
+            valid_size = 0
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Ledger record is not terminated.")
+                    record = json.loads(line)
+                except ValueError:
+                    if file.read(1):
+                        raise CorruptedLedgerException("Ledger", self.__ledger_path, "has an invalid record at byte", valid_size, "followed by other records.")
+
+                    # The last record is torn by a crash in the middle of the write, so it's cut off
+                    # to keep the following appends readable.
+                    file.truncate(valid_size)
+                    break
+
+                try:
+                    timestamp = record[LEDGER_TIME_KEY]
+                    amount = Money(record[LEDGER_AMOUNT_KEY]) if LEDGER_AMOUNT_KEY in record else None
+                    snapshot_balance = Money(record[LEDGER_BALANCE_KEY]) if amount is None else None
+                except (TypeError, KeyError, InvalidMoneyAmountException):
+                    raise CorruptedLedgerException("Ledger", self.__ledger_path, "has an invalid record at byte", valid_size, line)
+
+                valid_size += len(line)
+                if amount is not None:
+                    self.__timestamps.append(timestamp)
+                    self.__amounts.append(amount)
+                    self.__balance += amount
+                    continue
+
+                if snapshot_balance != self.__balance:
+                    raise CorruptedLedgerException("Ledger snapshot", snapshot_balance, "doesn't match the balance", self.__balance)
+                if self.__snapshot_positions[-1] != len(self.__amounts):
+                    self.__add_snapshot(self.__balance)
+
+        # Snapshots, which were lost with a torn record, are taken in memory again.
+        for position in range(self.__snapshot_positions[-1] + self.__snapshot_interval, len(self.__amounts) + 1, self.__snapshot_interval):
+            self.__snapshot_positions.append(position)
+            self.__snapshot_balances.append(self.__snapshot_balances[-1] + sum(self.__amounts[position - self.__snapshot_interval:position], Money()))
+
+class CorruptedLedgerException(Exception):
+    """Exception raised when ledger has an invalid record or a snapshot, which doesn't match the changes before it."""
+    pass
+
+class InvalidSnapshotIntervalException(Exception):
+    """Exception raised when trying to pass non-positive ledger snapshot interval."""
+    pass
@@ -0,0 +1,177 @@
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+MINOR_UNITS_PER_UNIT = 100
+
+class Money:
+    """Represents an amount of money as an integer number of minor units, e.g. cents.
+
+    Arithmetic is exact integer arithmetic, so sums of many amounts don't go through Decimal contexts.
+    Money is immutable, and it's equal to and hashes like int and Decimal of the same amount, so it can be
+    compared with them and replace them as a dictionary key. It's printed the way Decimal prints the amount
+    without trailing zeros, e.g. 25 or 69.5. Amounts are parsed from int, Decimal and str only, and an amount
+    with a fraction smaller than the minor unit is rejected instead of being rounded."""
+    __slots__ = ("__minor_units",)
+
+    def __init__(self, value=0) -> None:
+        self.__minor_units = to_minor_units(value)
+
+    @staticmethod
+    def from_minor_units(minor_units: int):
+        money = object.__new__(Money)
+        money.__minor_units = minor_units
+        return money
+
+    @property
+    def minor_units(self) -> int:
+        return self.__minor_units
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.__str__())
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money.from_minor_units(self.__minor_units + other.__minor_units)
+        if isinstance(other, (int, Decimal)):
+            return Money.from_minor_units(self.__minor_units + to_minor_units(other))
+
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money.from_minor_units(self.__minor_units - other.__minor_units)
+        if isinstance(other, (int, Decimal)):
+            return Money.from_minor_units(self.__minor_units - to_minor_units(other))
+
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, (int, Decimal)):
+            return Money.from_minor_units(to_minor_units(other) - self.__minor_units)
+
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            return Money.from_minor_units(self.__minor_units * other)
+
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money.from_minor_units(-self.__minor_units)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money.from_minor_units(abs(self.__minor_units))
+
+    def __eq__(self, other) -> bool:
+        other_minor_units = self.__convert_for_comparison(other)
+        if other_minor_units is NotImplemented:
+            return NotImplemented
+
+        return self.__minor_units == other_minor_units
+
+    def __lt__(self, other) -> bool:
+        other_minor_units = self.__convert_for_comparison(other)
+        if other_minor_units is NotImplemented:
+            return NotImplemented
+
+        return self.__minor_units < other_minor_units
+
+    def __le__(self, other) -> bool:
+        other_minor_units = self.__convert_for_comparison(other)
+        if other_minor_units is NotImplemented:
+            return NotImplemented
+
+        return self.__minor_units <= other_minor_units
+
+    def __gt__(self, other) -> bool:
+        other_minor_units = self.__convert_for_comparison(other)
+        if other_minor_units is NotImplemented:
+            return NotImplemented
+
+        return self.__minor_units > other_minor_units
+
+    def __ge__(self, other) -> bool:
+        other_minor_units = self.__convert_for_comparison(other)
+        if other_minor_units is NotImplemented:
+            return NotImplemented
+
+        return self.__minor_units >= other_minor_units
+
+    def __hash__(self) -> int:
+        # Equal int, Decimal and Fraction values share the hash, so the whole amounts hash like int.
+        units, remainder = divmod(self.__minor_units, MINOR_UNITS_PER_UNIT)
+        return hash(units) if remainder == 0 else hash(Fraction(self.__minor_units, MINOR_UNITS_PER_UNIT))
+
+    def __bool__(self) -> bool:
+        return self.__minor_units != 0
+
+    def __int__(self) -> int:
+        units = abs(self.__minor_units) // MINOR_UNITS_PER_UNIT
+        return -units if self.__minor_units < 0 else units
+
+    def __float__(self) -> float:
+        return self.__minor_units / MINOR_UNITS_PER_UNIT
+
+    def __str__(self) -> str:
+        units, remainder = divmod(abs(self.__minor_units), MINOR_UNITS_PER_UNIT)
+        sign = "-" if self.__minor_units < 0 else ""
+        if remainder == 0:
+            return sign + units.__str__()
+
+        return sign + units.__str__() + "." + remainder.__str__().zfill(len((MINOR_UNITS_PER_UNIT - 1).__str__())).rstrip("0")
+
+    def __repr__(self) -> str:
+        return "Money('" + self.__str__() + "')"
+
+    def __format__(self, format_spec: str) -> str:
+        return self.to_decimal().__format__(format_spec)
+
+    def __reduce__(self):
+        return Money.from_minor_units, (self.__minor_units,)
+
+    def __convert_for_comparison(self, other):
+        if isinstance(other, Money):
+            return other.__minor_units
+        if isinstance(other, int):
+            return other * MINOR_UNITS_PER_UNIT
+        if isinstance(other, Decimal):
+            # Decimal is compared exactly, so an amount with a smaller fraction is just not equal to any money.
+            return other * MINOR_UNITS_PER_UNIT
+
+        return NotImplemented
+
+def to_minor_units(value) -> int:
+    """Converts the amount to the number of minor units, raising an exception if it isn't a whole number of them."""
+    if isinstance(value, Money):
+        return value.minor_units
+    if isinstance(value, int):
+        return value * MINOR_UNITS_PER_UNIT
+    if isinstance(value, str):
+        try:
+            value = Decimal(value.strip())
+        except InvalidOperation:
+            raise InvalidMoneyAmountException("Amount", value, "isn't a number.")
+    if not isinstance(value, Decimal):
+        raise InvalidMoneyAmountException("Money can't be created from", type(value).__name__, "so pass int, Decimal or str.")
+
+    try:
+        numerator, denominator = value.as_integer_ratio()
+    except (ValueError, OverflowError):
+        raise InvalidMoneyAmountException("Amount", value, "isn't finite.")
+    # The ratio is reduced, so the amount is a whole number of minor units only if its denominator divides them.
+    if MINOR_UNITS_PER_UNIT % denominator != 0:
+        raise InvalidMoneyAmountException("Amount", value, "is more precise than the minor unit.")
+
+    return numerator * (MINOR_UNITS_PER_UNIT // denominator)
+
+class InvalidMoneyAmountException(Exception):
+    """Exception raised when trying to create money from a value, which isn't a whole number of minor units."""
+    pass
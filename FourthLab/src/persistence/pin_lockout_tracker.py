@@ -0,0 +1,161 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from src.persistence.data_storage import IStorage
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LOCKOUT_SECONDS = 15 * 60
+DEFAULT_CAPACITY = 1_000_000
+
+class PinLockoutTracker:
+    """Tracks failed PIN attempts by card number and locks cards out for a time after too many of them.
+
+    Recording and checking attempts are dictionary operations. Lockouts are kept in a heap ordered by their end,
+    so expired ones are dropped from its top without scanning all cards. Capacity bounds the number of cards with
+    failed attempts and lockouts together. Over it, failed attempts of the least recently used cards, which aren't
+    locked out, are evicted first, so failures on other cards don't lift lockouts. Only when every other card is
+    locked out, the lockout, which ends the soonest, is dropped, so the capacity must be well above the number of
+    cards, which can be locked out at once. If the storage is passed, lockouts are loaded from it and saved whenever
+    they change, while failed attempts, which haven't locked the card yet, are kept only in memory."""
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, lockout_seconds: float = DEFAULT_LOCKOUT_SECONDS,
+                 capacity: int = DEFAULT_CAPACITY, storage: IStorage = None, clock=time.time) -> None:
+        if max_attempts <= 0 or lockout_seconds <= 0 or capacity <= 0:
+            raise InvalidLockoutSettingsException("Attempts, lockout time and capacity must be positive.")
+
+        self.__max_attempts = max_attempts
+        self.__lockout_seconds = lockout_seconds
+        self.__capacity = capacity
+        self.__storage = storage
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        # Card number -> failed attempts of the cards, which aren't locked out, from the least recently used.
+        self.__failures = OrderedDict()
+        # Card number -> end of the lockout.
+        self.__locked_until = {}
+        self.__lockouts = []
+        if storage is not None:
+            self.__load()
+
+    @property
+    def max_attempts(self) -> int:
+        return self.__max_attempts
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__failures) + len(self.__locked_until)
+
+    def is_locked(self, card_number: str) -> bool:
+        with self.__lock:
+            self.__expire_lockouts()
+            return card_number in self.__locked_until
+
+    def attempts_left(self, card_number: str) -> int:
+        with self.__lock:
+            self.__expire_lockouts()
+            if card_number in self.__locked_until:
+                return 0
+
+            return self.__max_attempts - self.__failures.get(card_number, 0)
+
+    def locked_until(self, card_number: str) -> float:
+        """Returns the time the card is locked out until or None, if it isn't locked."""
+        with self.__lock:
+            self.__expire_lockouts()
+            return self.__locked_until.get(card_number)
+
+    def record_failure(self, card_number: str) -> bool:
+        """Counts a failed attempt and returns whether the card is locked out now."""
+        with self.__lock:
+            self.__expire_lockouts()
+            if card_number in self.__locked_until:
+                return True
+
+            attempts = self.__failures.pop(card_number, 0) + 1
+            if attempts < self.__max_attempts:
+                self.__failures[card_number] = attempts
+                if self.__evict(card_number):
+                    self.__save()
+                return False
+
+            locked_until = self.__clock() + self.__lockout_seconds
+            self.__locked_until[card_number] = locked_until
+            heapq.heappush(self.__lockouts, (locked_until, card_number))
+            self.__evict(card_number)
+            self.__compact_lockouts()
+            self.__save()
+            return True
+
+    def record_success(self, card_number: str) -> None:
+        """Forgets failed attempts of the card, if it isn't locked out."""
+        with self.__lock:
+            self.__failures.pop(card_number, None)
+
+    def unlock(self, card_number: str) -> None:
+        with self.__lock:
+            self.__failures.pop(card_number, None)
+            if self.__locked_until.pop(card_number, None) is not None:
+                self.__save()
+
+    def __expire_lockouts(self) -> None:
+        now = self.__clock()
+        expired = False
+        while self.__lockouts and self.__lockouts[0][0] <= now:
+            locked_until, card_number = heapq.heappop(self.__lockouts)
+            # Heap items of unlocked cards are skipped here instead of being searched for.
+            if self.__locked_until.get(card_number) == locked_until:
+                del self.__locked_until[card_number]
+                expired = True
+
+        if expired:
+            self.__save()
+
+    def __evict(self, card_number: str = None) -> bool:
+        """Keeps the cards within the capacity, never evicting the card, which is recorded now.
+        Returns whether a lockout was dropped."""
+        lockout_dropped = False
+        kept_lockouts = []
+        while len(self.__failures) + len(self.__locked_until) > self.__capacity:
+            least_recently_used = next(iter(self.__failures), None)
+            if least_recently_used is not None and least_recently_used != card_number:
+                del self.__failures[least_recently_used]
+                continue
+
+            locked_until, locked_card_number = heapq.heappop(self.__lockouts)
+            if locked_card_number == card_number:
+                kept_lockouts.append((locked_until, locked_card_number))
+            elif self.__locked_until.get(locked_card_number) == locked_until:
+                # Heap items of unlocked cards are skipped, as in the expiry.
+                del self.__locked_until[locked_card_number]
+                lockout_dropped = True
+
+        for lockout in kept_lockouts:
+            heapq.heappush(self.__lockouts, lockout)
+        return lockout_dropped
+
+    def __compact_lockouts(self) -> None:
+        if len(self.__lockouts) > 2 * len(self.__locked_until) + 64:
+            self.__lockouts = [(locked_until, card_number) for card_number, locked_until in self.__locked_until.items()]
+            heapq.heapify(self.__lockouts)
+
+    def __save(self) -> None:
+        if self.__storage is not None:
+            self.__storage.save({card_number: [self.__max_attempts, locked_until] for card_number, locked_until in self.__locked_until.items()})
+
+    def __load(self) -> None:
+        try:
+            data = self.__storage.load()
+        except FileNotFoundError:
+            return
+
+        now = self.__clock()
+        for card_number, (attempts, locked_until) in (data or {}).items():
+            if locked_until is not None and locked_until > now:
+                self.__locked_until[card_number] = locked_until
+                self.__lockouts.append((locked_until, card_number))
+        heapq.heapify(self.__lockouts)
+        self.__evict()
+
+class InvalidLockoutSettingsException(Exception):
+    """Exception raised when trying to pass non-positive lockout settings."""
+    pass
@@ -0,0 +1,271 @@
+import os
+from contextlib import contextmanager
+from decimal import Decimal
+from src.persistence.data_storage import IStorage, JsonFileStorage, BufferedStorage
+from src.persistence.banknote import Banknote, BanknoteValidator
+from src.persistence.banknote_storage import IBanknoteStorage, AmountValidator, NotEnoughMoneyInStorageException
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import JsonFileCassetteStorage
+from src.persistence.change_making import IChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
+from src.persistence.dispensable_amounts import DispensableAmountsTable
+from src.persistence.money import Money
+
+class BanknoteShard:
+    """Represents one physical cassette, which holds banknotes of a single denomination in its own storage."""
+    def __init__(self, denomination: Decimal, storage: IStorage[Cassette], capacity: int = None) -> None:
+        BanknoteValidator.validate_value(denomination)
+        if capacity is not None and capacity <= 0:
+            raise InvalidShardException("Capacity of the cassette must be positive.")
+
+        self.__denomination = denomination
+        self.__storage = storage
+        self.__capacity = capacity
+
+    @property
+    def denomination(self) -> Decimal:
+        return self.__denomination
+
+    @property
+    def capacity(self) -> int:
+        """The largest number of banknotes the cassette holds. None means it's unlimited."""
+        return self.__capacity
+
+    @property
+    def storage(self) -> IStorage[Cassette]:
+        return self.__storage
+
+    @storage.setter
+    def storage(self, storage: IStorage[Cassette]) -> None:
+        self.__storage = storage
+
+    def load_count(self) -> int:
+        cassette = self.__storage.load()
+        if any(denomination != self.__denomination for denomination in cassette.counts):
+            raise InvalidShardException("Cassette of", self.__denomination, "contains other banknotes:", cassette)
+
+        return cassette.count_of(self.__denomination)
+
+    def save_count(self, count: int) -> None:
+        self.__storage.save(Cassette({self.__denomination: count}))
+
+    def get_free_space(self, count: int) -> int:
+        return self.__capacity - count if self.__capacity is not None else None
+
+class ShardedBanknoteStorage(IBanknoteStorage):
+    """Implements banknotes storage over several cassettes, each of them saved separately.
+
+    Only the cassettes an operation needs are loaded: withdrawals are planned over the cassettes of denominations
+    not above the amount, and deposits load the cassettes of the deposited denominations. Only the changed ones
+    are saved. Banknotes of a denomination are taken from its fullest cassettes first. Deposits are routed
+    to the cassettes of their denominations, filling the emptiest ones first, and are rejected as a whole,
+    if a denomination has no cassette or its cassettes have no room left.
+
+    Cassettes are saved one at a time in order, so if a save fails, the cassettes saved before it are restored
+    and the exception is raised. A crash between the saves isn't covered, as the files aren't written atomically together."""
+    def __init__(self, shards: list[BanknoteShard], change_making_strategy: IChangeMakingStrategy = None) -> None:
+        if not shards:
+            raise InvalidShardException("Storage must have at least one cassette.")
+
+        self.__shards = list(shards)
+        self.__change_making_strategy = change_making_strategy or DynamicProgrammingChangeMakingStrategy()
+        self.__dispensable_amounts = None
+
+    @property
+    def shards(self) -> list[BanknoteShard]:
+        return list(self.__shards)
+
+    def get_cash_available(self) -> Money:
+        return Cassette(self.__sum_counts(self.__load_counts())).total
+
+    def get_cassette(self) -> Cassette:
+        """Returns banknotes of all cassettes together."""
+        return Cassette(self.__sum_counts(self.__load_counts()))
+
+    def can_dispense(self, amount: Decimal) -> bool:
+        """Checks whether the amount can be withdrawn exactly, using the table kept up to date by withdrawals and deposits."""
+        return self.__get_dispensable_amounts().can_dispense(amount)
+
+    def get_nearest_dispensable_amounts(self, amount: Decimal) -> tuple[Decimal, Decimal]:
+        return self.__get_dispensable_amounts().get_nearest_dispensable_amounts(amount)
+
+    def withdraw_banknotes(self, amount: Decimal) -> list[Banknote]:
+        AmountValidator.validate_amount(amount)
+        if amount == 0:
+            return []
+
+        # Banknotes above the amount can't be a part of the change, so their cassettes aren't loaded.
+        shard_counts = self.__load_counts(lambda denomination: denomination <= amount)
+        counts = self.__sum_counts(shard_counts)
+        if Cassette(counts).total < amount:
+            raise NotEnoughMoneyInStorageException("There is not enough money in storage to withdraw", amount)
+
+        banknotes_to_withdraw = self.__change_making_strategy.make_change(counts, amount)
+        previous_counts = dict(shard_counts)
+        changed_shards = set()
+        banknotes_withdrawed = []
+        for denomination in sorted(banknotes_to_withdraw, reverse=True):
+            count = banknotes_to_withdraw[denomination]
+            changed_shards.update(self.__take_from_shards(shard_counts, denomination, count))
+            banknotes_withdrawed.extend([Banknote(denomination)] * count)
+
+        self.__save_counts(previous_counts, shard_counts, changed_shards)
+        self.__update_dispensable_amounts(shard_counts)
+        return banknotes_withdrawed
+
+    def deposit_banknotes(self, banknotes: list[Banknote]) -> None:
+        self.deposit_cassette(Cassette.from_banknotes(banknotes))
+
+    def deposit_cassette(self, cassette: Cassette) -> None:
+        shard_counts = self.__load_counts(lambda denomination: denomination in cassette.counts)
+        previous_counts = dict(shard_counts)
+        changed_shards = set()
+        for denomination, count in cassette.counts.items():
+            changed_shards.update(self.__put_to_shards(shard_counts, denomination, count))
+
+        self.__save_counts(previous_counts, shard_counts, changed_shards)
+        self.__update_dispensable_amounts(shard_counts)
+
+    @property
+    def supports_batch(self) -> bool:
+        return True
+
+    @contextmanager
+    def batch(self):
+        storages = [shard.storage for shard in self.__shards]
+        buffered_storages = [BufferedStorage(storage) for storage in storages]
+        for shard, buffered_storage in zip(self.__shards, buffered_storages):
+            shard.storage = buffered_storage
+        try:
+            yield self
+        except BaseException:
+            # Changes of the batch are discarded, so the table built from them is dropped as well.
+            self.__dispensable_amounts = None
+            raise
+        finally:
+            for shard, storage in zip(self.__shards, storages):
+                shard.storage = storage
+        # Cassettes, which weren't changed, aren't written. The changed ones are read before the commit,
+        # so they can be restored, if a later one fails to be written.
+        committed = []
+        try:
+            for storage, buffered_storage in zip(storages, buffered_storages):
+                if buffered_storage.has_changes:
+                    previous_cassette = storage.load()
+                    buffered_storage.commit()
+                    committed.append((storage, previous_cassette))
+        except Exception:
+            self.__dispensable_amounts = None
+            for storage, previous_cassette in reversed(committed):
+                storage.save(previous_cassette)
+            raise
+
+    def __load_counts(self, is_needed=None) -> dict[int, int]:
+        """Loads counts of the cassettes, whose denominations are needed, by their indexes. All cassettes
+        of a denomination are loaded together."""
+        return {index: shard.load_count() for index, shard in enumerate(self.__shards) if is_needed is None or is_needed(shard.denomination)}
+
+    def __sum_counts(self, shard_counts: dict[int, int]) -> dict[Decimal, int]:
+        counts = {}
+        for index, count in shard_counts.items():
+            if count > 0:
+                denomination = self.__shards[index].denomination
+                counts[denomination] = counts.get(denomination, 0) + count
+
+        return counts
+
+    def __get_shard_indexes(self, denomination: Decimal) -> list[int]:
+        return [index for index, shard in enumerate(self.__shards) if shard.denomination == denomination]
+
+    def __take_from_shards(self, shard_counts: dict[int, int], denomination: Decimal, count: int) -> list[int]:
+        """Takes the banknotes from the fullest cassettes of the denomination and returns indexes of the changed ones."""
+        changed_shards = []
+        for index in sorted(self.__get_shard_indexes(denomination), key=lambda index: -shard_counts[index]):
+            if count == 0:
+                break
+
+            taken = min(count, shard_counts[index])
+            if taken > 0:
+                shard_counts[index] -= taken
+                count -= taken
+                changed_shards.append(index)
+
+        return changed_shards
+
+    def __put_to_shards(self, shard_counts: dict[int, int], denomination: Decimal, count: int) -> list[int]:
+        """Puts the banknotes to the emptiest cassettes of the denomination and returns indexes of the changed ones."""
+        indexes = self.__get_shard_indexes(denomination)
+        if not indexes:
+            raise NoCassetteForDenominationException("There is no cassette for banknotes of", denomination)
+
+        changed_shards = []
+        for index in sorted(indexes, key=lambda index: shard_counts[index]):
+            if count == 0:
+                break
+
+            free_space = self.__shards[index].get_free_space(shard_counts[index])
+            put = count if free_space is None else min(count, free_space)
+            if put > 0:
+                shard_counts[index] += put
+                count -= put
+                changed_shards.append(index)
+
+        if count > 0:
+            raise CassetteIsFullException("Cassettes of", denomination, "have no room for", count, "more banknotes.")
+
+        return changed_shards
+
+    def __save_counts(self, previous_counts: dict[int, int], shard_counts: dict[int, int], changed_shards: set[int]) -> None:
+        saved_shards = []
+        try:
+            for index in sorted(changed_shards):
+                self.__shards[index].save_count(shard_counts[index])
+                saved_shards.append(index)
+        except Exception:
+            for index in reversed(saved_shards):
+                self.__shards[index].save_count(previous_counts[index])
+            raise
+
+    def __get_dispensable_amounts(self) -> DispensableAmountsTable:
+        if self.__dispensable_amounts is None:
+            self.__dispensable_amounts = DispensableAmountsTable(self.__sum_counts(self.__load_counts()))
+
+        return self.__dispensable_amounts
+
+    def __update_dispensable_amounts(self, shard_counts: dict[int, int]) -> None:
+        """Updates the table with the counts of the loaded cassettes, keeping the counts of other denominations."""
+        if self.__dispensable_amounts is None:
+            return
+
+        counts = self.__dispensable_amounts.counts
+        for index in shard_counts:
+            counts.pop(self.__shards[index].denomination, None)
+        counts.update(self.__sum_counts(shard_counts))
+        self.__dispensable_amounts.update(counts)
+
+def create_json_shards(directory: str, cassette: Cassette, capacity: int = None) -> list[BanknoteShard]:
+    """Returns shards over JSON files of one denomination each, named after the denomination.
+    Files, which don't exist yet, are created with the banknotes of the cassette."""
+    shards = []
+    for denomination in sorted(cassette.counts):
+        path = get_shard_path(directory, denomination)
+        shard = BanknoteShard(denomination, JsonFileCassetteStorage(JsonFileStorage(path, atomic=True)), capacity)
+        if not os.path.exists(path):
+            shard.save_count(cassette.count_of(denomination))
+        shards.append(shard)
+
+    return shards
+
+def get_shard_path(directory: str, denomination: Decimal) -> str:
+    return os.path.join(directory, "cassette_" + denomination.__str__() + ".json")
+
+class InvalidShardException(Exception):
+    """Exception raised when cassette settings or its stored banknotes don't match the cassette denomination."""
+    pass
+
+class NoCassetteForDenominationException(Exception):
+    """Exception raised when deposited banknotes have no cassette of their denomination."""
+    pass
+
+class CassetteIsFullException(Exception):
+    """Exception raised when cassettes of the denomination have no room for deposited banknotes."""
+    pass
@@ -0,0 +1,233 @@
+"""Plans cash replenishment of a fleet of teller machines from their cassettes and withdrawal history.
+
+Run from the FourthLab folder:
+    python -m src.planning.replenishment_planner --cassettes fleet/ --history withdrawals.jsonl --service-level 0.95"""
+import argparse
+import json
+import os
+from decimal import Decimal
+from statistics import NormalDist
+import numpy as np
+from src.persistence.banknote import Banknote
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import JsonFileCassetteStorage
+from src.persistence.data_storage import JsonFileStorage
+
+class FleetState:
+    """Represents banknotes counts of the fleet as a matrix of machines by denominations."""
+    def __init__(self, machine_ids: list[str], denominations: list[Decimal], counts: np.ndarray) -> None:
+        if counts.shape != (len(machine_ids), len(denominations)):
+            raise InvalidFleetDataException("Counts shape", counts.shape, "doesn't match machines and denominations.")
+
+        self.__machine_ids = list(machine_ids)
+        self.__denominations = [Banknote(denomination).value for denomination in denominations]
+        self.__counts = counts.astype(np.int64, copy=False)
+
+    @property
+    def machine_ids(self) -> list[str]:
+        return list(self.__machine_ids)
+
+    @property
+    def denominations(self) -> list[Decimal]:
+        return list(self.__denominations)
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self.__counts
+
+    @staticmethod
+    def from_cassettes(cassettes: dict[str, Cassette], denominations: list[Decimal] = None, records: list[dict] = None):
+        """Builds the state from cassettes by machine id. Denominations default to all the cassettes and the withdrawal
+        records have, so a denomination, which ran out in the whole fleet, is still planned, if it was withdrawn."""
+        if denominations is None:
+            denominations = {denomination for cassette in cassettes.values() for denomination in cassette.denominations()}
+            denominations = sorted(denominations | WithdrawalHistory.get_denominations(records or []))
+        denominations = [Banknote(denomination).value for denomination in denominations]
+
+        denomination_indexes = {denomination: index for index, denomination in enumerate(denominations)}
+        counts = np.zeros((len(cassettes), len(denominations)), dtype=np.int64)
+        for machine_index, cassette in enumerate(cassettes.values()):
+            for denomination, count in cassette.counts.items():
+                if denomination not in denomination_indexes:
+                    raise InvalidFleetDataException("Denomination", denomination, "isn't planned.")
+                counts[machine_index, denomination_indexes[denomination]] = count
+
+        return FleetState(list(cassettes), denominations, counts)
+
+    @staticmethod
+    def load(paths: dict[str, str], denominations: list[Decimal] = None, records: list[dict] = None):
+        """Reads atm_data.json files by machine id in either the list or the counts format."""
+        cassettes = {machine_id: JsonFileCassetteStorage(JsonFileStorage(path)).load() for machine_id, path in paths.items()}
+        return FleetState.from_cassettes(cassettes, denominations, records)
+
+class WithdrawalHistory:
+    """Represents banknotes dispensed by every machine as an array of machines by periods by denominations."""
+    def __init__(self, dispensed: np.ndarray) -> None:
+        if dispensed.ndim != 3:
+            raise InvalidFleetDataException("Withdrawal history must have machines, periods and denominations axes.")
+
+        self.__dispensed = dispensed
+
+    @property
+    def dispensed(self) -> np.ndarray:
+        return self.__dispensed
+
+    @staticmethod
+    def get_denominations(records: list[dict]) -> set[Decimal]:
+        return {Banknote(Decimal(denomination)).value for record in records for denomination in record["banknotes"]}
+
+    @staticmethod
+    def from_records(records: list[dict], state: FleetState, periods: int):
+        """Builds the history from records like {"machine": "atm-1", "period": 0, "banknotes": {"50": 3}}.
+        Records of unknown machines and periods out of range are skipped, and a denomination,
+        which the state doesn't plan, raises an exception."""
+        machine_indexes = {machine_id: index for index, machine_id in enumerate(state.machine_ids)}
+        denomination_indexes = {denomination: index for index, denomination in enumerate(state.denominations)}
+        machine_axis, period_axis, denomination_axis, counts = [], [], [], []
+        for record in records:
+            machine_index = machine_indexes.get(record["machine"])
+            if machine_index is None or not 0 <= record["period"] < periods:
+                continue
+
+            for denomination, count in record["banknotes"].items():
+                denomination_index = denomination_indexes.get(Banknote(Decimal(denomination)).value)
+                if denomination_index is None:
+                    raise InvalidFleetDataException("Denomination", denomination, "of machine", record["machine"], "isn't planned.")
+
+                machine_axis.append(machine_index)
+                period_axis.append(record["period"])
+                denomination_axis.append(denomination_index)
+                counts.append(count)
+
+        dispensed = np.zeros((len(machine_indexes), periods, len(denomination_indexes)), dtype=np.int64)
+        np.add.at(dispensed, (np.array(machine_axis, dtype=np.intp), np.array(period_axis, dtype=np.intp),
+                              np.array(denomination_axis, dtype=np.intp)), np.array(counts, dtype=np.int64))
+        return WithdrawalHistory(dispensed)
+
+class ReplenishmentPolicy:
+    """Contains parameters of the replenishment.
+
+    Capacity is the most banknotes a cassette of one denomination holds, either one number or one per denomination.
+    Machine capacity limits banknotes of all denominations in one machine. Refills are made of bundles of refill unit banknotes."""
+    def __init__(self, service_level: float = 0.95, horizon_periods: int = 7, capacity=2000, machine_capacity: int = None, refill_unit: int = 1) -> None:
+        if not 0 < service_level < 1:
+            raise InvalidReplenishmentPolicyException("Service level must be between 0 and 1.")
+        if horizon_periods <= 0 or refill_unit <= 0:
+            raise InvalidReplenishmentPolicyException("Horizon and refill unit must be positive.")
+
+        self.service_level = service_level
+        self.horizon_periods = horizon_periods
+        self.capacity = capacity
+        self.machine_capacity = machine_capacity
+        self.refill_unit = refill_unit
+
+class ReplenishmentPlan:
+    """Represents banknotes to load into every machine and the demand, which can't be covered because of capacity."""
+    def __init__(self, state: FleetState, refill: np.ndarray, demand_target: np.ndarray) -> None:
+        self.__state = state
+        self.__refill = refill
+        self.__shortfall = np.maximum(demand_target - state.counts - refill, 0)
+
+    @property
+    def refill(self) -> np.ndarray:
+        return self.__refill
+
+    @property
+    def shortfall(self) -> np.ndarray:
+        """Banknotes, which the service level needs, but capacities don't let to load."""
+        return self.__shortfall
+
+    def for_machine(self, machine_id: str) -> dict[Decimal, int]:
+        row = self.__refill[self.__state.machine_ids.index(machine_id)]
+        return {denomination: int(count) for denomination, count in zip(self.__state.denominations, row) if count > 0}
+
+    def totals(self) -> dict[Decimal, int]:
+        return {denomination: int(count) for denomination, count in zip(self.__state.denominations, self.__refill.sum(axis=0))}
+
+    def to_json(self) -> list[dict]:
+        plan = []
+        denominations = [denomination.__str__() for denomination in self.__state.denominations]
+        for machine_id, row, shortfall in zip(self.__state.machine_ids, self.__refill.tolist(), self.__shortfall.sum(axis=1).tolist()):
+            refill = {denomination: count for denomination, count in zip(denominations, row) if count > 0}
+            if refill or shortfall:
+                plan.append({"machine": machine_id, "refill": refill, "shortfall": shortfall})
+
+        return plan
+
+class ReplenishmentPlanner:
+    """Computes refills for all machines at once with array operations.
+
+    Demand of every machine and denomination over the horizon is taken as normal with the mean and the variance
+    of the history periods scaled by the horizon. The target stock is the demand quantile of the service level,
+    cut by capacities. Refills are rounded up to bundles, if the cassette has room for them."""
+    def __init__(self, policy: ReplenishmentPolicy = None) -> None:
+        self.__policy = policy or ReplenishmentPolicy()
+
+    def plan(self, state: FleetState, history: WithdrawalHistory) -> ReplenishmentPlan:
+        dispensed = history.dispensed
+        if dispensed.shape[0] != len(state.machine_ids) or dispensed.shape[2] != len(state.denominations):
+            raise InvalidFleetDataException("Withdrawal history shape", dispensed.shape, "doesn't match the fleet state.")
+
+        policy = self.__policy
+        counts = state.counts
+        mean = dispensed.mean(axis=1) if dispensed.shape[1] > 0 else np.zeros(counts.shape)
+        deviation = dispensed.std(axis=1, ddof=1) if dispensed.shape[1] > 1 else np.zeros(counts.shape)
+        z_score = NormalDist().inv_cdf(policy.service_level)
+        demand = policy.horizon_periods * mean + z_score * np.sqrt(policy.horizon_periods) * deviation
+        demand_target = np.ceil(np.maximum(demand, 0)).astype(np.int64)
+
+        capacity = np.broadcast_to(np.asarray(policy.capacity, dtype=np.int64), counts.shape)
+        target = np.minimum(demand_target, capacity)
+        room = np.maximum(capacity - counts, 0)
+        unit = policy.refill_unit
+        needed = np.maximum(target - counts, 0)
+        refill = np.minimum(-(-needed // unit) * unit, room // unit * unit)
+
+        if policy.machine_capacity is not None:
+            refill = self.__fit_into_machines(refill, counts, policy.machine_capacity, unit)
+
+        return ReplenishmentPlan(state, refill, demand_target)
+
+    def __fit_into_machines(self, refill: np.ndarray, counts: np.ndarray, machine_capacity: int, unit: int) -> np.ndarray:
+        """Scales refills of the machines, which would overflow, down in proportion to what every denomination needs."""
+        machine_room = np.maximum(machine_capacity - counts.sum(axis=1), 0)
+        requested = refill.sum(axis=1)
+        scale = np.divide(machine_room, requested, out=np.ones(requested.shape), where=requested > machine_room)
+        return (np.floor(refill * scale[:, np.newaxis] / unit) * unit).astype(np.int64)
+
+def load_history_records(path: str) -> list[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassettes", required=True, help="Folder of cassette JSON files, one per machine named by its id.")
+    parser.add_argument("--history", required=True, help="JSON lines file of withdrawal records.")
+    parser.add_argument("--periods", type=int, default=28, help="Number of history periods.")
+    parser.add_argument("--denominations", type=Decimal, nargs="+", default=None,
+                        help="Planned denominations. Default to all the cassettes and the history have.")
+    parser.add_argument("--service-level", type=float, default=0.95)
+    parser.add_argument("--horizon", type=int, default=7, help="Periods until the next replenishment.")
+    parser.add_argument("--capacity", type=int, default=2000, help="Banknotes per denomination cassette.")
+    parser.add_argument("--machine-capacity", type=int, default=None)
+    parser.add_argument("--refill-unit", type=int, default=1)
+    arguments = parser.parse_args()
+
+    paths = {os.path.splitext(name)[0]: os.path.join(arguments.cassettes, name)
+             for name in sorted(os.listdir(arguments.cassettes)) if name.endswith(".json")}
+    records = load_history_records(arguments.history)
+    state = FleetState.load(paths, arguments.denominations, records)
+    history = WithdrawalHistory.from_records(records, state, arguments.periods)
+    policy = ReplenishmentPolicy(arguments.service_level, arguments.horizon, arguments.capacity, arguments.machine_capacity, arguments.refill_unit)
+    print(json.dumps(ReplenishmentPlanner(policy).plan(state, history).to_json(), indent=4))
+
+class InvalidFleetDataException(Exception):
+    """Exception raised when fleet cassettes or withdrawal history don't match each other."""
+    pass
+
+class InvalidReplenishmentPolicyException(Exception):
+    """Exception raised when trying to pass invalid replenishment policy."""
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Replays a transaction log recorded by TransactionRecorder against a teller machine and verifies the results.
+
+Run from the FourthLab folder:
+    python -m src.recording.replay atm_transactions.jsonl --backend cassette --speed 0"""
+import argparse
+import json
+import tempfile
+import time
+from decimal import Decimal
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.cassette import Cassette
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
+from src.recording.transaction_recorder import (LOG_VERSION, INSERT_CARD_OPERATION, GAIN_ACCESS_OPERATION, WITHDRAW_CARD_OPERATION,
+    GET_CARD_BALANCE_OPERATION, WITHDRAW_CASH_OPERATION, DEPOSIT_CASH_OPERATION, PAY_FOR_THE_PHONE_OPERATION,
+    VERSION_KEY, CASSETTE_KEY, TIME_KEY, OPERATION_KEY, CARD_KEY, ARGUMENTS_KEY, RESULT_KEY, ERROR_KEY, convert_result_to_json)
+from src.simulation.fleet_simulator import BACKENDS, JOURNAL_BACKEND, CASSETTE_BACKEND, create_banknote_storage
+from src.teller_machine import ITellerMachine, TellerMachine
+
+REPLAY_CVC = "000"
+REPLAY_PASSWORD = "0000"
+WRONG_REPLAY_PASSWORD = "9999"
+MAX_REPORTED_MISMATCHES = 20
+
+class ReplayReport:
+    """Contains the number of replayed operations, the mismatched ones and the throughput."""
+    def __init__(self) -> None:
+        self.operations = 0
+        self.operations_by_type = {}
+        self.mismatches_count = 0
+        self.mismatches = []
+        self.seconds = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.mismatches_count == 0
+
+    def add_operation(self, operation: str) -> None:
+        self.operations += 1
+        self.operations_by_type[operation] = self.operations_by_type.get(operation, 0) + 1
+
+    def add_mismatch(self, line_number: int, record: dict, result, error: str) -> None:
+        self.mismatches_count += 1
+        if len(self.mismatches) < MAX_REPORTED_MISMATCHES:
+            self.mismatches.append({"line": line_number, "operation": record[OPERATION_KEY],
+                                    "expected": {"result": record.get(RESULT_KEY), "error": record.get(ERROR_KEY)},
+                                    "actual": {"result": result, "error": error}})
+
+    def to_json(self) -> dict:
+        return {"operations": self.operations, "operations_by_type": self.operations_by_type,
+                "mismatches": self.mismatches_count, "first_mismatches": self.mismatches, "seconds": round(self.seconds, 6),
+                "operations_per_second": round(self.operations / self.seconds, 1) if self.seconds > 0 else 0.0}
+
+def read_log(path: str) -> tuple[dict, list[dict]]:
+    """Returns the first header and the records of the log. Headers of the next sessions stay among the records,
+    and blank lines are kept as None, so the records are numbered like the lines of the file."""
+    with open(path) as file:
+        header = validate_header(json.loads(file.readline()))
+        records = []
+        for line in file:
+            record = json.loads(line) if line.strip() else None
+            if record is not None and is_header(record):
+                validate_header(record)
+            records.append(record)
+
+        return header, records
+
+def is_header(record: dict) -> bool:
+    return VERSION_KEY in record
+
+def validate_header(header: dict) -> dict:
+    if header.get(VERSION_KEY) != LOG_VERSION:
+        raise UnsupportedTransactionLogException("Transaction log version", header.get(VERSION_KEY), "isn't supported.")
+
+    return header
+
+def get_header_cassette(header: dict) -> Cassette:
+    return Cassette.from_json(header[CASSETTE_KEY]) if header.get(CASSETTE_KEY) is not None else Cassette()
+
+def create_replay_card(card_json: dict) -> BankCard:
+    """Restores the recorded card with a replay CVC and PIN, as the real ones aren't logged."""
+    return BankCard.from_json(dict(card_json, cvc=REPLAY_CVC, password=REPLAY_PASSWORD))
+
+def replay(records: list[dict], teller_machine: ITellerMachine, speed: float = 0.0, create_teller_machine=None) -> ReplayReport:
+    """Re-executes the records. Zero speed replays as fast as possible, otherwise the recorded pauses are divided by speed.
+
+    A header among the records starts the next recorded session, whose times count from its own start. The session
+    is replayed against the machine created by create_teller_machine for the cassette of the header, if it's passed,
+    otherwise against the same machine."""
+    report = ReplayReport()
+    cards = {}
+    # Controllers share failed attempts between insertions of the card, so the replay does too.
+    lockout_tracker = PinLockoutTracker()
+    start = time.perf_counter()
+    session_start = start
+    for line_number, record in enumerate(records, start=2):
+        if record is None:
+            continue
+        if is_header(record):
+            session_start = time.perf_counter()
+            if create_teller_machine is not None:
+                teller_machine = create_teller_machine(get_header_cassette(record))
+            continue
+
+        if speed > 0:
+            delay = record[TIME_KEY] / speed - (time.perf_counter() - session_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        operation = record[OPERATION_KEY]
+        arguments = record[ARGUMENTS_KEY]
+        if operation == INSERT_CARD_OPERATION:
+            cards[record[CARD_KEY]] = create_replay_card(arguments[0])
+            continue
+
+        card = cards.get(record[CARD_KEY])
+        if card is None:
+            raise UnsupportedTransactionLogException("Card", record[CARD_KEY], "is used before it's inserted.")
+
+        result, error = None, None
+        try:
+            result = execute(operation, arguments, card, teller_machine, lockout_tracker)
+        except Exception as exception:
+            error = type(exception).__name__
+
+        report.add_operation(operation)
+        if result != record.get(RESULT_KEY) or error != record.get(ERROR_KEY):
+            report.add_mismatch(line_number, record, result, error)
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+def execute(operation: str, arguments: list, card: BankCard, teller_machine: ITellerMachine, lockout_tracker: PinLockoutTracker):
+    if operation == GAIN_ACCESS_OPERATION:
+        return card.gain_access(REPLAY_PASSWORD if arguments[0] else WRONG_REPLAY_PASSWORD, lockout_tracker).name
+    if operation == WITHDRAW_CARD_OPERATION:
+        return None
+    if operation == GET_CARD_BALANCE_OPERATION:
+        return convert_result_to_json(teller_machine.get_card_balance(card))
+    if operation == WITHDRAW_CASH_OPERATION:
+        return convert_result_to_json(teller_machine.withdraw_cash(Decimal(arguments[0]), card))
+    if operation == DEPOSIT_CASH_OPERATION:
+        banknotes = [Banknote(Decimal(value)) for value in arguments[0]]
+        return convert_result_to_json(teller_machine.deposit_cash(banknotes, card))
+    if operation == PAY_FOR_THE_PHONE_OPERATION:
+        return convert_result_to_json(teller_machine.pay_for_the_phone(arguments[0], Decimal(arguments[1]), card))
+
+    raise UnsupportedTransactionLogException("Unknown operation", operation)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Path of the transaction log.")
+    parser.add_argument("--backend", choices=BACKENDS, default=CASSETTE_BACKEND)
+    parser.add_argument("--speed", type=float, default=0.0, help="0 replays as fast as possible, 1 keeps the recorded pacing, 2 is twice as fast.")
+    arguments = parser.parse_args()
+
+    header, records = read_log(arguments.log)
+    with tempfile.TemporaryDirectory() as directory:
+        io_storages = []
+
+        def create_teller_machine(cassette: Cassette) -> ITellerMachine:
+            # Every session gets its own files, named by its number.
+            storage, io_storage = create_banknote_storage(arguments.backend, directory, len(io_storages), cassette)
+            io_storages.append(io_storage)
+            return TellerMachine(storage)
+
+        report = replay(records, create_teller_machine(get_header_cassette(header)), arguments.speed, create_teller_machine)
+        if arguments.backend == JOURNAL_BACKEND:
+            for io_storage in io_storages:
+                io_storage.close()
+
+    result = {"backend": arguments.backend, "speed": arguments.speed}
+    result.update(report.to_json())
+    print(json.dumps(result, indent=4))
+    if not report.succeeded:
+        raise SystemExit(1)
+
+class UnsupportedTransactionLogException(Exception):
+    """Exception raised when transaction log can't be replayed."""
+    pass
+
+if __name__ == "__main__":
+    main()
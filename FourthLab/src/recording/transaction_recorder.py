@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from src.batch_operations import IBatchOperation, BatchMode, BatchResult
+from src.persistence.bank_card import BankCard, CardState
+from src.persistence.banknote import Banknote
+from src.persistence.cassette import Cassette
+from src.persistence.data_storage import IStorage
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
+from src.teller_machine import ITellerMachine
+
+LOG_VERSION = 1
+RECORD_FILE_ENVIRONMENT_VARIABLE = "ATM_RECORD_FILE"
+
+INSERT_CARD_OPERATION = "insert_card"
+GAIN_ACCESS_OPERATION = "gain_access"
+WITHDRAW_CARD_OPERATION = "withdraw_card"
+GET_CARD_BALANCE_OPERATION = "get_card_balance"
+WITHDRAW_CASH_OPERATION = "withdraw_cash"
+DEPOSIT_CASH_OPERATION = "deposit_cash"
+PAY_FOR_THE_PHONE_OPERATION = "pay_for_the_phone"
+
+# Short keys keep the log compact.
+VERSION_KEY = "v"
+CASSETTE_KEY = "cassette"
+TIME_KEY = "t"
+OPERATION_KEY = "op"
+CARD_KEY = "c"
+ARGUMENTS_KEY = "a"
+RESULT_KEY = "r"
+ERROR_KEY = "e"
+
+class TransactionRecorder:
+    """Appends card and teller machine calls with their arguments and results to a JSON lines log.
+
+    Every recorder starts its session with a header line with the log version and the cassette the machine started
+    with, if it's known, so a log appended by several sessions has a header per session. Card PINs and CVCs are never
+    written: a card is recorded without them and access attempts are recorded as successful or not. Recorder without a path is disabled and only passes the calls through."""
+    def __init__(self, path: str = None, initial_cassette: Cassette = None) -> None:
+        self.__file = None
+        self.__lock = threading.Lock()
+        self.__start = time.monotonic()
+        if path is not None:
+            self.__file = open(path, 'a')
+            self.__write({VERSION_KEY: LOG_VERSION, CASSETTE_KEY: initial_cassette.to_json() if initial_cassette is not None else None})
+
+    @property
+    def enabled(self) -> bool:
+        return self.__file is not None
+
+    @staticmethod
+    def from_environment(cassette_storage: IStorage = None):
+        """Enables recording to the file set by ATM_RECORD_FILE. The initial cassette is loaded from the storage only then."""
+        path = os.environ.get(RECORD_FILE_ENVIRONMENT_VARIABLE)
+        if not path:
+            return TransactionRecorder()
+
+        return TransactionRecorder(path, cassette_storage.load() if cassette_storage is not None else None)
+
+    def record_teller_machine(self, teller_machine: ITellerMachine) -> ITellerMachine:
+        return RecordingTellerMachine(teller_machine, self) if self.enabled else teller_machine
+
+    def insert_card(self, card: BankCard) -> BankCard:
+        if self.enabled:
+            card_json = card.to_json()
+            del card_json["cvc"], card_json["password"]
+            self.record(INSERT_CARD_OPERATION, card, [card_json], None)
+
+        return card
+
+    def gain_access(self, card: BankCard, password: str, lockout_tracker: PinLockoutTracker = None) -> CardState:
+        state = card.gain_access(password, lockout_tracker)
+        if self.enabled:
+            self.record(GAIN_ACCESS_OPERATION, card, [password == card.password], state.name)
+
+        return state
+
+    def withdraw_card(self, card: BankCard) -> None:
+        if self.enabled:
+            self.record(WITHDRAW_CARD_OPERATION, card, [], None)
+
+    def record(self, operation: str, card: BankCard, arguments: list, result, error: Exception = None) -> None:
+        record = {TIME_KEY: round(time.monotonic() - self.__start, 6), OPERATION_KEY: operation, CARD_KEY: card.card_number,
+                  ARGUMENTS_KEY: arguments, RESULT_KEY: result}
+        if error is not None:
+            record[ERROR_KEY] = type(error).__name__
+
+        self.__write(record)
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __write(self, record: dict) -> None:
+        line = json.dumps(record, separators=(',', ':'), default=str) + "\n"
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.write(line)
+                self.__file.flush()
+
+class RecordingTellerMachine(ITellerMachine):
+    """Decorates teller machine with recording of every call."""
+    def __init__(self, teller_machine: ITellerMachine, recorder: TransactionRecorder) -> None:
+        self.__teller_machine = teller_machine
+        self.__recorder = recorder
+
+    def get_card_balance(self, card: BankCard) -> Decimal:
+        return self.__call(GET_CARD_BALANCE_OPERATION, card, [], self.__teller_machine.get_card_balance, card)
+
+    def withdraw_cash(self, amount: Decimal, card: BankCard) -> list[Banknote]:
+        return self.__call(WITHDRAW_CASH_OPERATION, card, [amount], self.__teller_machine.withdraw_cash, amount, card)
+
+    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Decimal:
+        return self.__call(DEPOSIT_CASH_OPERATION, card, [[banknote.value for banknote in cash]], self.__teller_machine.deposit_cash, cash, card)
+
+    def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
+        return self.__call(PAY_FOR_THE_PHONE_OPERATION, card, [phone_number, amount], self.__teller_machine.pay_for_the_phone, phone_number, amount, card)
+
+    def process_batch(self, operations: list[IBatchOperation], mode: BatchMode = BatchMode.BEST_EFFORT) -> BatchResult:
+        # Operations of a batch are applied to the decorated machine, so they aren't recorded one by one.
+        return self.__teller_machine.process_batch(operations, mode)
+
+    def __call(self, operation: str, card: BankCard, arguments: list, function, *function_arguments):
+        try:
+            result = function(*function_arguments)
+        except Exception as error:
+            self.__recorder.record(operation, card, arguments, None, error)
+            raise
+
+        self.__recorder.record(operation, card, arguments, convert_result_to_json(result))
+        return result
+
+def convert_result_to_json(result):
+    """Converts results of teller machine operations to the form they're logged and compared in."""
+    if isinstance(result, list):
+        return [banknote.value.__str__() for banknote in result]
+    if result is None:
+        return None
+
+    return result.__str__()
@@ -0,0 +1,339 @@
+"""Serves the teller machine over line-delimited JSON-RPC 2.0 on a local TCP or Unix socket.
+
+Run from the FourthLab folder:
+    python -m src.server.json_rpc_server --cards cards/ --banknotes src/controllers/atm_data.json --port 8765
+
+Every line is one request like {"jsonrpc": "2.0", "id": 1, "method": "withdraw", "params": {"amount": "50"}}.
+Methods are insert_card(card_number), enter_pin(pin), get_balance(), withdraw(amount), deposit(banknotes),
+pay_phone(phone_number, amount) and eject_card(). Amounts and banknotes are passed as strings or numbers."""
+import argparse
+import asyncio
+import json
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import suppress
+from decimal import Decimal
+from src.async_teller_machine import IAsyncTellerMachine, AsyncTellerMachine
+from src.persistence.async_banknote_storage import ThreadedAsyncBanknoteStorage
+from src.persistence.bank_card import BankCard, CardState
+from src.persistence.banknote import Banknote, InvalidBanknoteValueException
+from src.persistence.banknote_storage import NegativeMoneyAmountException, NotEnoughMoneyInStorageException
+from src.persistence.card_account import NotEnoughMoneyOnBalanceException
+from src.persistence.card_repository import ICardRepository, IndexedCardRepository, CardIsNotInRepositoryException
+from src.persistence.cassette_storage import CassetteBanknoteStorage, JsonFileCassetteStorage
+from src.persistence.data_storage import JsonFileStorage
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
+from src.persistence.money import Money, InvalidMoneyAmountException
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+OPERATION_FAILED = -32000
+NO_CARD_INSERTED = -32001
+ACCESS_DENIED = -32002
+SERVER_BUSY = -32003
+CARD_NOT_FOUND = -32004
+
+DEFAULT_MAX_CONNECTIONS = 10000
+DEFAULT_MAX_REQUEST_BYTES = 64 * 1024
+MAX_BACKLOG = 4096
+
+# Failures of the operations, which are reported to the client with the exception name.
+OPERATION_EXCEPTIONS = (NotEnoughMoneyOnBalanceException, NotEnoughMoneyInStorageException, NegativeMoneyAmountException)
+
+class ClientSession:
+    """Contains the card inserted over one connection and the lock of its card number."""
+    def __init__(self) -> None:
+        self.card = None
+        self.card_lock = None
+
+    def is_access_gained(self) -> bool:
+        return self.card is not None and self.card.is_access_gained()
+
+class TellerMachineServer:
+    """Serves JSON-RPC requests of many clients from one event loop.
+
+    Every connection is a session, which is handled by one task. Its requests are read one line at a time and
+    answered in order, so a client may pipeline them without waiting for responses. The server doesn't read
+    the next request until the previous response is written and drained, and the reader buffer is bounded
+    by the request size limit, so a client, which sends faster than it reads, is slowed down by TCP flow control.
+    Cards are read from the repository in the executor, which bounds the threads doing storage I/O, and the teller
+    machine is expected to read and write their balances and the banknotes in the same executor. Operations of all sessions with the same card number
+    are serialized by its lock, so the balance checked before dispensing can't be spent by another session meanwhile."""
+    def __init__(self, teller_machine: IAsyncTellerMachine, card_repository: ICardRepository, lockout_tracker: PinLockoutTracker = None,
+                 executor: Executor = None, max_connections: int = DEFAULT_MAX_CONNECTIONS, max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES) -> None:
+        self.__teller_machine = teller_machine
+        self.__card_repository = card_repository
+        self.__lockout_tracker = lockout_tracker or PinLockoutTracker()
+        self.__executor = executor
+        self.__max_connections = max_connections
+        self.__max_request_bytes = max_request_bytes
+        self.__connections = 0
+        self.__requests = 0
+        self.__server = None
+        # Lock of a card number lives while a session holds its card inserted.
+        self.__card_locks = weakref.WeakValueDictionary()
+        self.__methods = {
+            "insert_card": (self.__insert_card, ("card_number",)),
+            "enter_pin": (self.__enter_pin, ("pin",)),
+            "get_balance": (self.__get_balance, ()),
+            "withdraw": (self.__withdraw, ("amount",)),
+            "deposit": (self.__deposit, ("banknotes",)),
+            "pay_phone": (self.__pay_phone, ("phone_number", "amount")),
+            "eject_card": (self.__eject_card, ()),
+        }
+
+    @property
+    def connections(self) -> int:
+        return self.__connections
+
+    @property
+    def requests(self) -> int:
+        return self.__requests
+
+    @property
+    def __backlog(self) -> int:
+        # Thousands of clients may connect at once, so the default backlog of 100 would refuse some of them.
+        return min(self.__max_connections, MAX_BACKLOG)
+
+    @property
+    def sockets(self) -> list:
+        return self.__server.sockets if self.__server is not None else []
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.__server = await asyncio.start_server(self.handle_connection, host, port, limit=self.__max_request_bytes, backlog=self.__backlog)
+
+    async def start_unix(self, path: str) -> None:
+        self.__server = await asyncio.start_unix_server(self.handle_connection, path, limit=self.__max_request_bytes, backlog=self.__backlog)
+
+    async def serve_forever(self) -> None:
+        await self.__server.serve_forever()
+
+    async def close(self) -> None:
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.__connections >= self.__max_connections:
+            writer.write(self.__encode(self.__create_error(None, SERVER_BUSY, "Too many connections.")))
+            await self.__close_writer(writer)
+            return
+
+        self.__connections += 1
+        session = ClientSession()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The request is longer than the reader limit, so the rest of the stream can't be parsed.
+                    writer.write(self.__encode(self.__create_error(None, PARSE_ERROR, "Request is too long.")))
+                    break
+                if not line:
+                    break
+
+                response = await self.handle_line(session, line)
+                if response is not None:
+                    writer.write(self.__encode(response))
+                    await writer.drain()
+        except OSError:
+            # The client has gone, so there's nobody to answer.
+            pass
+        finally:
+            await self.__close_writer(writer)
+            self.__connections -= 1
+
+    async def handle_line(self, session: ClientSession, line: bytes) -> dict:
+        """Runs one request and returns its response or None for notifications and blank lines."""
+        if not line.strip():
+            return None
+
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return self.__create_error(None, PARSE_ERROR, "Request isn't valid JSON.")
+
+        self.__requests += 1
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self.__create_error(None, INVALID_REQUEST, "Request must be an object with a method.")
+
+        request_id = request.get("id")
+        try:
+            result = await self.__dispatch(session, request["method"], request.get("params", {}))
+        except JsonRpcException as error:
+            response = self.__create_error(request_id, error.code, error.message, error.data)
+        except OPERATION_EXCEPTIONS as error:
+            response = self.__create_error(request_id, OPERATION_FAILED, self.__format_message(error), {"type": type(error).__name__})
+        except Exception as error:
+            response = self.__create_error(request_id, INTERNAL_ERROR, "Internal error.", {"type": type(error).__name__})
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+        return response if "id" in request else None
+
+    async def __dispatch(self, session: ClientSession, method: str, params):
+        if method not in self.__methods:
+            raise JsonRpcException(METHOD_NOT_FOUND, "Method " + method + " isn't found.")
+
+        handler, names = self.__methods[method]
+        if isinstance(params, list):
+            params = dict(zip(names, params))
+        if not isinstance(params, dict) or any(name not in params for name in names):
+            raise JsonRpcException(INVALID_PARAMS, "Method " + method + " expects " + ", ".join(names) + ".")
+
+        return await handler(session, *(params[name] for name in names))
+
+    async def __insert_card(self, session: ClientSession, card_number: str):
+        try:
+            session.card = await asyncio.get_running_loop().run_in_executor(self.__executor, self.__card_repository.get, card_number.__str__())
+        except CardIsNotInRepositoryException:
+            session.card = None
+            session.card_lock = None
+            raise JsonRpcException(CARD_NOT_FOUND, "Card " + card_number.__str__() + " isn't found.")
+
+        session.card_lock = self.__get_card_lock(session.card.card_number)
+
+        return {"attempts_left": int(self.__lockout_tracker.attempts_left(session.card.card_number))}
+
+    async def __enter_pin(self, session: ClientSession, pin: str):
+        card = self.__get_inserted_card(session)
+        state = card.gain_access(pin.__str__(), self.__lockout_tracker)
+        return {"state": state.name, "attempts_left": int(card.attempts_left)}
+
+    async def __get_balance(self, session: ClientSession):
+        card = self.__get_opened_card(session)
+        async with session.card_lock:
+            return (await self.__teller_machine.get_card_balance(card)).__str__()
+
+    async def __withdraw(self, session: ClientSession, amount):
+        card = self.__get_opened_card(session)
+        amount = self.__parse_amount(amount)
+        async with session.card_lock:
+            # Banknotes are taken from the storage before the card is charged, so the balance is checked first
+            # under the lock, which keeps other sessions of the card from charging it until the withdrawal is done.
+            if await self.__teller_machine.get_card_balance(card) < amount:
+                raise NotEnoughMoneyOnBalanceException("Card balance doesn't have", amount, "money to withdraw.")
+
+            banknotes = await self.__teller_machine.withdraw_cash(amount, card)
+            balance = await self.__teller_machine.get_card_balance(card)
+            return {"banknotes": [banknote.__str__() for banknote in banknotes], "balance": balance.__str__()}
+
+    async def __deposit(self, session: ClientSession, banknotes):
+        card = self.__get_opened_card(session)
+        if not isinstance(banknotes, list) or not banknotes:
+            raise JsonRpcException(INVALID_PARAMS, "Banknotes must be a non-empty list.")
+
+        try:
+            cash = [Banknote(self.__parse_amount(value)) for value in banknotes]
+        except InvalidBanknoteValueException:
+            raise JsonRpcException(INVALID_PARAMS, "Banknote values must be positive.")
+
+        async with session.card_lock:
+            deposited = await self.__teller_machine.deposit_cash(cash, card)
+            balance = await self.__teller_machine.get_card_balance(card)
+            return {"deposited": deposited.__str__(), "balance": balance.__str__()}
+
+    async def __pay_phone(self, session: ClientSession, phone_number: str, amount):
+        card = self.__get_opened_card(session)
+        amount = self.__parse_amount(amount)
+        async with session.card_lock:
+            await self.__teller_machine.pay_for_the_phone(phone_number.__str__(), amount, card)
+            return {"balance": (await self.__teller_machine.get_card_balance(card)).__str__()}
+
+    async def __eject_card(self, session: ClientSession):
+        self.__get_inserted_card(session)
+        session.card = None
+        session.card_lock = None
+
+    def __get_card_lock(self, card_number: str) -> asyncio.Lock:
+        lock = self.__card_locks.get(card_number)
+        if lock is None:
+            lock = self.__card_locks[card_number] = asyncio.Lock()
+
+        return lock
+
+    def __get_inserted_card(self, session: ClientSession) -> BankCard:
+        if session.card is None:
+            raise JsonRpcException(NO_CARD_INSERTED, "No card is inserted.")
+
+        return session.card
+
+    def __get_opened_card(self, session: ClientSession) -> BankCard:
+        card = self.__get_inserted_card(session)
+        if not card.is_access_gained():
+            raise JsonRpcException(ACCESS_DENIED, "Card is blocked." if card.state == CardState.BLOCKED else "Enter the PIN first.")
+
+        return card
+
+    def __parse_amount(self, value) -> Decimal:
+        try:
+            return Money(value.__str__()).to_decimal()
+        except InvalidMoneyAmountException as error:
+            raise JsonRpcException(INVALID_PARAMS, self.__format_message(error))
+
+    def __create_error(self, request_id, code: int, message: str, data: dict = None) -> dict:
+        error = {"code": code, "message": message}
+        if data is not None:
+            error["data"] = data
+
+        return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+    def __format_message(self, error: Exception) -> str:
+        return " ".join(argument.__str__() for argument in error.args) or type(error).__name__
+
+    def __encode(self, response: dict) -> bytes:
+        return json.dumps(response, separators=(',', ':')).encode() + b"\n"
+
+    async def __close_writer(self, writer: asyncio.StreamWriter) -> None:
+        writer.close()
+        with suppress(OSError):
+            await writer.wait_closed()
+
+def create_server(cards_directory: str, banknotes_path: str, workers: int = 4, max_connections: int = DEFAULT_MAX_CONNECTIONS) -> TellerMachineServer:
+    """Creates the server over the card repository folder and the cassette file, both accessed by the bounded pool of threads."""
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="atm-storage")
+    banknote_storage = CassetteBanknoteStorage(JsonFileCassetteStorage(JsonFileStorage(banknotes_path, atomic=True)))
+    teller_machine = AsyncTellerMachine(ThreadedAsyncBanknoteStorage(banknote_storage, executor), executor)
+    return TellerMachineServer(teller_machine, IndexedCardRepository(cards_directory), executor=executor, max_connections=max_connections)
+
+async def serve(server: TellerMachineServer, host: str, port: int, unix_path: str) -> None:
+    if unix_path is not None:
+        await server.start_unix(unix_path)
+    else:
+        await server.start_tcp(host, port)
+
+    print("Serving on", ", ".join(socket.getsockname().__str__() for socket in server.sockets), flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", required=True, help="Folder of the indexed card repository.")
+    parser.add_argument("--banknotes", required=True, help="Cassette JSON file of the machine.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Path of the Unix socket to listen on instead of TCP.")
+    parser.add_argument("--workers", type=int, default=4, help="Threads for storage I/O.")
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    arguments = parser.parse_args()
+
+    server = create_server(arguments.cards, arguments.banknotes, arguments.workers, arguments.max_connections)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve(server, arguments.host, arguments.port, arguments.unix))
+
+class JsonRpcException(Exception):
+    """Exception raised when request can't be handled, with the JSON-RPC error code for the response."""
+    def __init__(self, code: int, message: str, data: dict = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+if __name__ == "__main__":
+    main()
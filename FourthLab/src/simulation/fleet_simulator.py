@@ -0,0 +1,232 @@
+"""Simulates a fleet of teller machines serving mixed traffic across a process pool.
+
+Run from the FourthLab folder: python -m src.simulation.fleet_simulator --machines 200 --processes 8"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from src.persistence.bank_card import BankCard
+from src.persistence.banknote import Banknote
+from src.persistence.banknote_storage import BanknoteStorage, JsonFileBanknoteStorage, NotEnoughMoneyInStorageException, NegativeMoneyAmountException
+from src.persistence.card_account import CardAccount, NotEnoughMoneyOnBalanceException
+from src.persistence.cassette import Cassette
+from src.persistence.cassette_storage import CassetteBanknoteStorage, JsonFileCassetteStorage
+from src.persistence.data_storage import InMemoryStorage, JsonFileStorage
+from src.persistence.journaled_storage import JournaledCassetteStorage
+from src.teller_machine import TellerMachine
+
+WITHDRAW_OPERATION = "withdraw"
+DEPOSIT_OPERATION = "deposit"
+PHONE_PAYMENT_OPERATION = "phone_payment"
+OPERATIONS = (WITHDRAW_OPERATION, DEPOSIT_OPERATION, PHONE_PAYMENT_OPERATION)
+
+MEMORY_BACKEND = "memory"
+JSON_BACKEND = "json"
+CASSETTE_BACKEND = "cassette"
+JOURNAL_BACKEND = "journal"
+BACKENDS = (MEMORY_BACKEND, JSON_BACKEND, CASSETTE_BACKEND, JOURNAL_BACKEND)
+
+DENOMINATIONS = (5, 10, 20, 50, 100)
+PERCENTILES = (50, 95, 99)
+
+class TrafficMix:
+    """Represents the share of every operation type in the simulated traffic."""
+    def __init__(self, weights: dict[str, float]) -> None:
+        for operation, weight in weights.items():
+            if operation not in OPERATIONS:
+                raise InvalidTrafficMixException("Unknown operation", operation)
+            if weight < 0:
+                raise InvalidTrafficMixException("Operation weight must not be negative.")
+        if sum(weights.values()) <= 0:
+            raise InvalidTrafficMixException("At least one operation must have positive weight.")
+
+        self.__weights = dict(weights)
+
+    @property
+    def weights(self) -> dict[str, float]:
+        return dict(self.__weights)
+
+    def choose_operations(self, randomizer: random.Random, count: int) -> list[str]:
+        operations = list(self.__weights)
+        return randomizer.choices(operations, [self.__weights[operation] for operation in operations], k=count)
+
+    @staticmethod
+    def parse(string: str):
+        """Parses mix in the 'withdraw=0.5,deposit=0.3,phone_payment=0.2' form."""
+        weights = {}
+        for pair in string.split(","):
+            operation, _, weight = pair.partition("=")
+            weights[operation.strip()] = float(weight)
+
+        return TrafficMix(weights)
+
+    def __str__(self) -> str:
+        return ",".join(operation + "=" + weight.__str__() for operation, weight in self.__weights.items())
+
+class IOCountingJsonFileStorage(JsonFileStorage):
+    """Decorates JsonFileStorage writes and loads with counting of bytes passed to and from the disk."""
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def write(self, serialized_data: str) -> None:
+        super().write(serialized_data)
+        self.bytes_written += len(serialized_data.encode())
+
+    def load(self):
+        self.bytes_read += os.path.getsize(self.path)
+        return super().load()
+
+class FleetConfiguration:
+    """Contains parameters of the fleet simulation."""
+    def __init__(self, machines: int, operations_per_machine: int, traffic_mix: TrafficMix, backend: str = JSON_BACKEND,
+                 initial_banknotes_per_denomination: int = 200, seed: int = 0) -> None:
+        if backend not in BACKENDS:
+            raise ValueError("Unknown storage backend " + backend)
+
+        self.machines = machines
+        self.operations_per_machine = operations_per_machine
+        self.traffic_mix = traffic_mix
+        self.backend = backend
+        self.initial_banknotes_per_denomination = initial_banknotes_per_denomination
+        self.seed = seed
+
+def create_banknote_storage(backend: str, directory: str, machine_id: int, initial_cassette: Cassette):
+    """Creates the banknote storage of one machine and returns it with the storage counting disk I/O, if any."""
+    path = os.path.join(directory, "atm_data_" + machine_id.__str__() + ".json")
+    if backend == MEMORY_BACKEND:
+        return BanknoteStorage(InMemoryStorage(initial_cassette.to_banknotes())), None
+    if backend == JOURNAL_BACKEND:
+        JsonFileStorage(path).save(initial_cassette.to_json())
+        journaled_storage = JournaledCassetteStorage(path)
+        return CassetteBanknoteStorage(journaled_storage), journaled_storage
+
+    file_storage = IOCountingJsonFileStorage(path)
+    if backend == JSON_BACKEND:
+        file_storage.save(initial_cassette.to_banknotes())
+        return BanknoteStorage(JsonFileBanknoteStorage(file_storage)), file_storage
+
+    file_storage.save(initial_cassette.to_json())
+    return CassetteBanknoteStorage(JsonFileCassetteStorage(file_storage)), file_storage
+
+def create_card(machine_id: int) -> BankCard:
+    account = CardAccount()
+    account.deposit_cash(Decimal(10 ** 9))
+    card_number = (machine_id % 10 ** 16).__str__().zfill(16)
+    return BankCard(card_number, datetime(2030, 1, 1).date(), "Fleet Client", "111", "1111", account)
+
+def simulate_machine(machine_id: int, configuration: FleetConfiguration, directory: str) -> dict:
+    """Runs the traffic against one teller machine and returns latencies per operation type and I/O counters."""
+    randomizer = random.Random(configuration.seed * 1000003 + machine_id)
+    initial_cassette = Cassette({denomination: configuration.initial_banknotes_per_denomination for denomination in DENOMINATIONS})
+    storage, io_storage = create_banknote_storage(configuration.backend, directory, machine_id, initial_cassette)
+    teller_machine = TellerMachine(storage)
+    card = create_card(machine_id)
+
+    latencies = {operation: [] for operation in OPERATIONS}
+    errors = {operation: 0 for operation in OPERATIONS}
+    for operation in configuration.traffic_mix.choose_operations(randomizer, configuration.operations_per_machine):
+        start = time.perf_counter()
+        try:
+            if operation == WITHDRAW_OPERATION:
+                teller_machine.withdraw_cash(Decimal(randomizer.randrange(10, 400, 10)), card)
+            elif operation == DEPOSIT_OPERATION:
+                banknotes = [Banknote(randomizer.choice(DENOMINATIONS)) for _ in range(randomizer.randint(1, 10))]
+                teller_machine.deposit_cash(banknotes, card)
+            else:
+                teller_machine.pay_for_the_phone("+375291234567", Decimal(randomizer.randint(1, 50)), card)
+        except (NotEnoughMoneyInStorageException, NotEnoughMoneyOnBalanceException, NegativeMoneyAmountException):
+            errors[operation] += 1
+        latencies[operation].append(time.perf_counter() - start)
+
+    if configuration.backend == JOURNAL_BACKEND:
+        io_storage.close()
+    bytes_read, bytes_written = 0, 0
+    if io_storage is not None:
+        bytes_read, bytes_written = io_storage.bytes_read, io_storage.bytes_written
+
+    return {"latencies": latencies, "errors": errors, "bytes_read": bytes_read, "bytes_written": bytes_written}
+
+def calculate_percentile(sorted_values: list[float], percentile: int) -> float:
+    """Calculates percentile with the nearest-rank method."""
+    if not sorted_values:
+        return 0.0
+
+    rank = max(1, -(-percentile * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+def build_report(configuration: FleetConfiguration, processes: int, machine_results: list[dict], elapsed: float) -> dict:
+    operations = {}
+    total_operations = 0
+    for operation in OPERATIONS:
+        latencies = sorted(latency for result in machine_results for latency in result["latencies"][operation])
+        if not latencies:
+            continue
+
+        total_operations += len(latencies)
+        operations[operation] = {
+            "count": len(latencies),
+            "errors": sum(result["errors"][operation] for result in machine_results),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4),
+        }
+        for percentile in PERCENTILES:
+            operations[operation]["p" + percentile.__str__() + "_ms"] = round(calculate_percentile(latencies, percentile) * 1000, 4)
+
+    return {
+        "machines": configuration.machines,
+        "processes": processes,
+        "backend": configuration.backend,
+        "traffic_mix": configuration.traffic_mix.__str__(),
+        "operations": total_operations,
+        "seconds": round(elapsed, 4),
+        "throughput_per_second": round(total_operations / elapsed, 1) if elapsed > 0 else 0.0,
+        "storage_bytes_read": sum(result["bytes_read"] for result in machine_results),
+        "storage_bytes_written": sum(result["bytes_written"] for result in machine_results),
+        "per_operation": operations,
+    }
+
+def run_fleet(configuration: FleetConfiguration, processes: int = None) -> dict:
+    """Spreads the machines over a process pool and returns the aggregated report."""
+    processes = processes or os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(simulate_machine, machine_id, configuration, directory) for machine_id in range(configuration.machines)]
+            machine_results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    return build_report(configuration, processes, machine_results, elapsed)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--machines", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None, help="Defaults to the number of CPUs.")
+    parser.add_argument("--operations", type=int, default=200, help="Operations per machine.")
+    parser.add_argument("--mix", type=TrafficMix.parse, default=TrafficMix({WITHDRAW_OPERATION: 0.5, DEPOSIT_OPERATION: 0.3, PHONE_PAYMENT_OPERATION: 0.2}))
+    parser.add_argument("--backend", choices=BACKENDS, default=JSON_BACKEND)
+    parser.add_argument("--banknotes", type=int, default=200, help="Initial banknotes per denomination in every machine.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Path of the JSON report. The report is printed if it's not set.")
+    arguments = parser.parse_args()
+
+    configuration = FleetConfiguration(arguments.machines, arguments.operations, arguments.mix, arguments.backend, arguments.banknotes, arguments.seed)
+    report = run_fleet(configuration, arguments.processes)
+    serialized_report = json.dumps(report, indent=4)
+    if arguments.output is None:
+        print(serialized_report)
+    else:
+        with open(arguments.output, 'w') as file:
+            file.write(serialized_report)
+
+class InvalidTrafficMixException(Exception):
+    """Exception raised when trying to pass invalid traffic mix."""
+    pass
+
+if __name__ == "__main__":
+    main()
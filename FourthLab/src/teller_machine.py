@@ -1,13 +1,15 @@
 from abc import ABC, abstractmethod
 from decimal import Decimal
-from src.persistence.banknote_storage import IBanknoteStorage
+from src.persistence.banknote_storage import IBanknoteStorage, NotEnoughMoneyInStorageException
 from src.persistence.banknote import Banknote
+from src.persistence.money import Money
 from src.persistence.bank_card import BankCard
+from src.batch_operations import IBatchOperation, BatchMode, BatchResult, OperationResult, BatchIsRolledBackException, AtomicBatchIsNotSupportedException
 
 class ITellerMachine(ABC):
     """Contains methods for teller machine."""
     @abstractmethod
-    def get_card_balance(self, card: BankCard) -> Decimal:
+    def get_card_balance(self, card: BankCard) -> Money:
         pass
     
     @abstractmethod
@@ -15,27 +17,39 @@ class ITellerMachine(ABC):
         pass
 
     @abstractmethod
-    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Decimal:
+    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Money:
         pass
 
     @abstractmethod
     def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
         pass
 
+    @abstractmethod
+    def process_batch(self, operations: list[IBatchOperation], mode: BatchMode = BatchMode.BEST_EFFORT) -> BatchResult:
+        pass
+
 class TellerMachine(ITellerMachine):
     """Implements methods for operationing with teller machine."""
     def __init__(self, banknote_storage: IBanknoteStorage) -> None:
         self.__storage = banknote_storage
 
-    def get_card_balance(self, card: BankCard) -> Decimal:
+    def get_card_balance(self, card: BankCard) -> Money:
         return card.card_account.view_balance()
 
     def withdraw_cash(self, amount: Decimal, card: BankCard) -> list[Banknote]:
-        banknotes = self.__storage.withdraw_banknotes(amount)
-        card.withdraw_cash(amount)
+        """Dispenses exactly the amount and charges it to the card. Storages, which support batches,
+        discard the withdrawal, if the amount can't be dispensed exactly or the card can't be charged."""
+        with self.__storage.batch():
+            banknotes = self.__storage.withdraw_banknotes(amount)
+            if self.__calculate_cash_amount(banknotes) != amount:
+                # Storage gives the closest amount below, if it can't make the exact one, so the banknotes are put back.
+                self.__storage.deposit_banknotes(banknotes)
+                raise NotEnoughMoneyInStorageException("Storage can't dispense exactly", amount)
+            card.withdraw_cash(amount)
+
         return banknotes
 
-    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Decimal:
+    def deposit_cash(self, cash: list[Banknote], card: BankCard) -> Money:
         self.__storage.deposit_banknotes(cash)
         amount = self.__calculate_cash_amount(cash)
         card.deposit_cash(amount)
@@ -44,9 +58,40 @@ class TellerMachine(ITellerMachine):
     def pay_for_the_phone(self, phone_number: str, amount: Decimal, card: BankCard) -> None:
         card.withdraw_cash(amount)
 
-    def __calculate_cash_amount(self, banknotes: list[Banknote]) -> Decimal:
-        cash = Decimal()
-        for banknote in banknotes:
-            cash += banknote.value
+    def process_batch(self, operations: list[IBatchOperation], mode: BatchMode = BatchMode.BEST_EFFORT) -> BatchResult:
+        """Applies operations against the banknotes loaded once and saves them once at the end.
+
+        Best-effort batch reports failed operations and goes on. All-or-nothing batch stops at the first failure,
+        reverts card changes of the applied operations and discards the storage changes, so it's accepted only
+        for storages, which support batches. If the storage fails to save the batch, card changes of the applied
+        operations are reverted as well and the error is raised."""
+        if mode == BatchMode.ALL_OR_NOTHING and not self.__storage.supports_batch:
+            raise AtomicBatchIsNotSupportedException("Banknote storage can't discard changes of all-or-nothing batch.")
+
+        results = []
+        try:
+            with self.__storage.batch():
+                for operation in operations:
+                    try:
+                        results.append(OperationResult(operation, operation.apply(self)))
+                    except Exception as error:
+                        results.append(OperationResult(operation, error=error))
+                        if mode == BatchMode.ALL_OR_NOTHING:
+                            raise BatchIsRolledBackException("Batch operation failed", error)
+        except BatchIsRolledBackException:
+            self.__revert_operations(results)
+            return BatchResult(results, False)
+        except Exception:
+            # Operation errors are caught above, so the storage failed to save the banknotes, which are lost with the batch.
+            self.__revert_operations(results)
+            raise
+
+        return BatchResult(results, True)
+
+    def __revert_operations(self, results: list[OperationResult]) -> None:
+        for result in reversed(results):
+            if result.succeeded:
+                result.operation.revert(result.result)
 
-        return cash
\ No newline at end of file
+    def __calculate_cash_amount(self, banknotes: list[Banknote]) -> Money:
+        return Banknote.calculate_total(banknotes)
\ No newline at end of file
@@ -1,13 +1,45 @@
 from datetime import datetime
 from decimal import Decimal
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
 import unittest
 import sys
+import pytest
 sys.path.append("..") # Used to be able to call tests from the tests folder
 from src.persistence.banknote import Banknote, InvalidBanknoteValueException
-from src.persistence.bank_card import BankCard, InvalidCvcException, InvalidCardNumberException, InvalidPasswordException
+from src.persistence.bank_card import BankCard, CardState, InvalidCvcException, InvalidCardNumberException, InvalidPasswordException
 from src.persistence.banknote_storage import BanknoteStorage, NotEnoughMoneyInStorageException
 from src.persistence.card_account import CardAccount, NotEnoughMoneyOnBalanceException, NegativeMoneyAmountException
-from src.persistence.data_storage import InMemoryStorage
+from src.persistence.pin_lockout_tracker import PinLockoutTracker
+from src.persistence.ledger_card_account import LedgerCardAccount, CorruptedLedgerException
+from src.persistence.data_storage import IStorage, InMemoryStorage, JsonFileStorage, CachingStorage, GroupCommitJsonFileStorage, StorageIsClosedException
+from src.persistence.change_making import GreedyChangeMakingStrategy, DynamicProgrammingChangeMakingStrategy
+from src.persistence.cassette import Cassette, NotEnoughBanknotesInCassetteException
+from src.persistence.money import Money, InvalidMoneyAmountException
+from src.persistence.binary_cassette_storage import BinaryCassetteStorage, InvalidCassetteFileException, convert_json_to_binary, convert_binary_to_json
+from src.persistence.dispensable_amounts import DispensableAmountsTable
+from src.persistence.cassette_storage import CassetteBanknoteStorage, CassetteBanknotesListStorage, JsonFileCassetteStorage
+from src.persistence.journaled_storage import JournaledCassetteStorage, CorruptedJournalException
+from src.persistence.concurrent_banknote_storage import ConcurrentCassetteBanknoteStorage
+from src.persistence.sharded_banknote_storage import ShardedBanknoteStorage, BanknoteShard, CassetteIsFullException, NoCassetteForDenominationException, create_json_shards
+from src.persistence.async_data_storage import AsyncInMemoryStorage, ThreadedAsyncStorage
+from src.persistence.async_banknote_storage import AsyncBanknoteStorage, ThreadedAsyncBanknoteStorage
+from src.async_teller_machine import AsyncTellerMachine
+from src.persistence.card_repository import IndexedCardRepository, CardIsAlreadyInRepositoryException, CardIsNotInRepositoryException
+from src.teller_machine import TellerMachine
+from src.deposit_ingestor import DepositIngestor, DenominationIsNotAllowedException
+from src.instrumentation.instrumented import Instrumentation, InstrumentedBanknoteStorage, InstrumentedStorage, InstrumentedTellerMachine
+from src.instrumentation.metrics import MetricsRegistry, PrometheusFileExporter
+from src.recording.transaction_recorder import TransactionRecorder
+from src.server.json_rpc_server import TellerMachineServer, create_server, ACCESS_DENIED, METHOD_NOT_FOUND, OPERATION_FAILED, PARSE_ERROR
+from src.controllers.controller_registry import ControllerRegistry, InvalidControllerPathException, UnknownControllerException
+from src.recording.replay import read_log, replay
+from src.batch_operations import BatchMode, DepositOperation, WithdrawOperation, PhonePaymentOperation, AtomicBatchIsNotSupportedException
+from src.simulation.fleet_simulator import FleetConfiguration, TrafficMix, InvalidTrafficMixException, run_fleet
 
 class TellerMachineTests(unittest.TestCase):
     def test_banknote_negative_value_set_raises_an_exception(self):
@@ -16,6 +48,12 @@ class TellerMachineTests(unittest.TestCase):
     def test_banknote_zero_value_set_raises_an_exception(self):
         self.assertRaises(InvalidBanknoteValueException, Banknote, 0)
 
+    def test_banknote_same_value_returns_same_interned_banknote(self):
+        self.assertIs(Banknote(20), Banknote(Decimal(20)))
+
+    def test_banknote_comparison_of_integer_and_fractional_values_orders_by_value(self):
+        self.assertEqual([Banknote(Decimal("0.5")), Banknote(1), Banknote(5)], sorted([Banknote(5), Banknote(1), Banknote(Decimal("0.5"))]))
+
     def test_banknotestorage_get_cash_available_empty_storage_returns_zero(self):
         # Arrange
         expected = Decimal()
@@ -50,7 +88,7 @@ class TellerMachineTests(unittest.TestCase):
         
     def test_banknotestorage_withdraw_banknotes_amount_equals_zero_returns_empty_list(self):
         # Arrange
-        expected = list[Banknote]
+        expected = []
         in_memory_storage = InMemoryStorage(expected)
         storage = BanknoteStorage(in_memory_storage)
 
@@ -168,6 +206,76 @@ class TellerMachineTests(unittest.TestCase):
         # Assert
         self.assertEqual(amount_Expected * 2, storage.get_cash_available())
 
+    def test_banknotestorage_withdraw_banknotes_greedy_choice_fails_returns_exact_combination(self):
+        # Arrange
+        banknotes = [Banknote(50), Banknote(20), Banknote(20), Banknote(20)]
+        in_memory_storage = InMemoryStorage(banknotes)
+        storage = BanknoteStorage(in_memory_storage)
+        expected = [Banknote(20), Banknote(20), Banknote(20)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual(Decimal(50), storage.get_cash_available())
+
+    def test_banknotestorage_withdraw_banknotes_greedy_strategy_returns_closest(self):
+        # Arrange
+        banknotes = [Banknote(50), Banknote(20), Banknote(20), Banknote(20)]
+        in_memory_storage = InMemoryStorage(banknotes)
+        storage = BanknoteStorage(in_memory_storage, GreedyChangeMakingStrategy())
+        expected = [Banknote(50)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual(expected, actual)
+
+    def test_tellermachine_withdraw_cash_amount_which_cant_be_dispensed_exactly_changes_nothing(self):
+        # Arrange
+        card = BankCard("1".zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, CardAccount())
+        card.deposit_cash(Decimal(100))
+        for storage_type in (CassetteBanknoteStorage, ConcurrentCassetteBanknoteStorage):
+            in_memory_storage = InMemoryStorage(Cassette({50: 1}))
+            teller_machine = TellerMachine(storage_type(in_memory_storage))
+
+            # Act, Assert
+            self.assertRaises(NotEnoughMoneyInStorageException, teller_machine.withdraw_cash, Decimal(30), card)
+            self.assertEqual(Decimal(100), card.get_card_balance())
+            self.assertEqual(Cassette({50: 1}), in_memory_storage.load())
+
+    def test_tellermachine_withdraw_cash_not_enough_money_on_balance_discards_withdrawal(self):
+        # Arrange
+        card = BankCard("1".zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, CardAccount())
+        in_memory_storage = InMemoryStorage(Cassette({50: 1}))
+
+        # Act, Assert
+        self.assertRaises(NotEnoughMoneyOnBalanceException, TellerMachine(CassetteBanknoteStorage(in_memory_storage)).withdraw_cash, Decimal(50), card)
+        self.assertEqual(Cassette({50: 1}), in_memory_storage.load())
+
+    def test_dynamicprogrammingchangemakingstrategy_make_change_finds_exact_combination_if_exists(self):
+        # Arrange
+        strategy = DynamicProgrammingChangeMakingStrategy()
+        counts = {Decimal(1): 2, Decimal(5): 1, Decimal(20): 3, Decimal(50): 2}
+        reachable_amounts = set()
+        for ones in range(3):
+            for fives in range(2):
+                for twenties in range(4):
+                    for fifties in range(3):
+                        reachable_amounts.add(ones + 5 * fives + 20 * twenties + 50 * fifties)
+
+        for amount in range(0, 180):
+            # Act
+            change = strategy.make_change(counts, Decimal(amount))
+
+            # Assert
+            expected = max(reachable for reachable in reachable_amounts if reachable <= amount)
+            self.assertEqual(expected, sum(denomination * count for denomination, count in change.items()))
+            for denomination, count in change.items():
+                self.assertLessEqual(count, counts[denomination])
+
     def test_bankcard_card_number_length_does_not_equal_sixteen_raise_an_exception(self):
         self.assertRaises(InvalidCardNumberException, BankCard, "1111", datetime(2000, 12, 12), "Test User", "1" * 3, "1" * 4, CardAccount())
         
@@ -219,5 +327,1483 @@ class TellerMachineTests(unittest.TestCase):
         # Assert
         self.assertEqual(expected, actual)
 
+class MoneyTests(unittest.TestCase):
+    def test_money_sum_of_fractions_is_exact(self):
+        # Arrange
+        amounts = [Money("0.1")] * 10
+
+        # Act
+        actual = sum(amounts)
+
+        # Assert
+        self.assertEqual(Money(1), actual)
+        self.assertEqual(100, actual.minor_units)
+
+    def test_money_equals_and_hashes_like_int_and_decimal(self):
+        # Arrange
+        counts = {10: 1, Decimal("0.5"): 2}
+
+        # Act, Assert
+        self.assertEqual(Decimal("10.00"), Money(10))
+        self.assertEqual(10, Money("10"))
+        self.assertEqual(1, counts[Money(10)])
+        self.assertEqual(2, counts[Money("0.50")])
+        self.assertNotEqual(Decimal("0.501"), Money("0.5"))
+        self.assertTrue(Decimal("0.49") < Money("0.5") < 1)
+
+    def test_money_str_prints_like_decimal_without_trailing_zeros(self):
+        # Act
+        actual = [Money(25).__str__(), Money("69.50").__str__(), Money("1000.25").__str__(), Money("-0.05").__str__()]
+
+        # Assert
+        self.assertEqual(["25", "69.5", "1000.25", "-0.05"], actual)
+
+    def test_money_amount_smaller_than_minor_unit_raises_an_exception(self):
+        # Act, Assert
+        self.assertRaises(InvalidMoneyAmountException, Money, Decimal("0.001"))
+        self.assertRaises(InvalidMoneyAmountException, Money, "NaN")
+        self.assertRaises(InvalidMoneyAmountException, Money, "ten")
+        self.assertRaises(InvalidMoneyAmountException, Money, 0.1)
+
+    def test_banknote_calculate_total_returns_money(self):
+        # Arrange
+        banknotes = [Banknote(Decimal("0.5")), Banknote(20), Banknote(20)]
+
+        # Act
+        actual = Banknote.calculate_total(banknotes)
+
+        # Assert
+        self.assertEqual(Money("40.5"), actual)
+        self.assertIsInstance(actual, Money)
+
+    def test_cardaccount_balance_is_money_after_decimal_operations(self):
+        # Arrange
+        account = CardAccount()
+
+        # Act
+        account.deposit_cash(Decimal("100.10"))
+        account.withdraw_cash(Decimal("0.2"))
+
+        # Assert
+        self.assertEqual(Decimal("99.9"), account.balance)
+        self.assertEqual("99.9", account.balance.__str__())
+        self.assertIsInstance(account.balance, Money)
+
+class CassetteBanknoteStorageTests(unittest.TestCase):
+    def test_cassette_remove_more_banknotes_than_available_raises_an_exception(self):
+        # Arrange
+        cassette = Cassette({10: 1})
+
+        # Act, Assert
+        self.assertRaises(NotEnoughBanknotesInCassetteException, cassette.remove, 10, 2)
+
+    def test_cassettebanknotestorage_get_cash_available_returns_calculated_cash(self):
+        # Arrange
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette({5: 21, 20: 1})))
+        expected = Decimal(125)
+
+        # Act
+        actual = storage.get_cash_available()
+
+        # Assert
+        self.assertEqual(expected, actual)
+
+    def test_cassettebanknotestorage_withdraw_banknotes_returns_withdrawed_banknotes(self):
+        # Arrange
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette({1: 1, 2: 1, 3: 1, 4: 1, 5: 1})))
+        expected = [Banknote(5), Banknote(3)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(8))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual(Decimal(7), storage.get_cash_available())
+
+    def test_cassettebanknotestorage_withdraw_banknotes_doesnt_have_enough_cash_raises_an_exception(self):
+        # Arrange
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette({10: 1})))
+
+        # Act, Assert
+        self.assertRaises(NotEnoughMoneyInStorageException, storage.withdraw_banknotes, Decimal(25))
+
+    def test_cassettebanknotestorage_deposit_banknotes_adds_banknotes_to_storage(self):
+        # Arrange
+        in_memory_storage = InMemoryStorage(Cassette({5: 2}))
+        storage = CassetteBanknoteStorage(in_memory_storage)
+
+        # Act
+        storage.deposit_banknotes([Banknote(5), Banknote(20)])
+
+        # Assert
+        self.assertEqual(Cassette({5: 3, 20: 1}), in_memory_storage.load())
+
+    def test_jsonfilecassettestorage_load_legacy_banknotes_list_migrates_to_cassette(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "atm_data.json")
+            with open(path, "w") as file:
+                json.dump(["5", "5", "20"], file)
+            storage = JsonFileCassetteStorage(JsonFileStorage(path))
+
+            # Act
+            cassette = storage.load()
+            storage.save(cassette)
+
+            # Assert
+            self.assertEqual(Cassette({5: 2, 20: 1}), cassette)
+            with open(path) as file:
+                self.assertEqual({"20": 1, "5": 2}, json.load(file))
+
+class JournaledCassetteStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "atm_data.json")
+        with open(self.path, "w") as file:
+            json.dump(["5", "5", "20"], file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_journaledcassettestorage_save_appends_delta_and_keeps_snapshot(self):
+        # Arrange
+        storage = JournaledCassetteStorage(self.path)
+        banknote_storage = CassetteBanknoteStorage(storage)
+
+        # Act
+        banknote_storage.deposit_banknotes([Banknote(50)])
+        banknote_storage.withdraw_banknotes(Decimal(20))
+        storage.close()
+
+        # Assert
+        with open(self.path) as file:
+            self.assertEqual(["5", "5", "20"], json.load(file))
+        with open(self.path + ".journal") as file:
+            self.assertEqual(2, len(file.readlines()))
+        self.assertEqual(Cassette({5: 2, 50: 1}), JournaledCassetteStorage(self.path).load())
+
+    def test_journaledcassettestorage_compact_folds_journal_into_snapshot(self):
+        # Arrange
+        storage = JournaledCassetteStorage(self.path)
+        CassetteBanknoteStorage(storage).deposit_banknotes([Banknote(10)])
+
+        # Act
+        storage.compact()
+        storage.close()
+
+        # Assert
+        self.assertEqual(0, os.path.getsize(self.path + ".journal"))
+        self.assertEqual(Cassette({5: 2, 10: 1, 20: 1}), JournaledCassetteStorage(self.path).load())
+
+    def test_journaledcassettestorage_load_torn_last_record_ignores_it(self):
+        # Arrange
+        storage = JournaledCassetteStorage(self.path)
+        CassetteBanknoteStorage(storage).deposit_banknotes([Banknote(10)])
+        storage.close()
+        with open(self.path + ".journal", "a") as file:
+            file.write('{"s":2,"d":{"5"')
+
+        # Act
+        storage = JournaledCassetteStorage(self.path)
+        CassetteBanknoteStorage(storage).deposit_banknotes([Banknote(100)])
+        storage.close()
+
+        # Assert
+        self.assertEqual(Cassette({5: 2, 10: 1, 20: 1, 100: 1}), JournaledCassetteStorage(self.path).load())
+
+    def test_journaledcassettestorage_load_invalid_record_in_the_middle_raises_an_exception(self):
+        # Arrange
+        storage = JournaledCassetteStorage(self.path)
+        CassetteBanknoteStorage(storage).deposit_banknotes([Banknote(10)])
+        storage.close()
+        with open(self.path + ".journal", "a") as file:
+            file.write('{"s":2,"d":\n{"s":3,"d":{"50":1}}\n')
+        journal_size = os.path.getsize(self.path + ".journal")
+
+        # Act, Assert
+        self.assertRaises(CorruptedJournalException, JournaledCassetteStorage(self.path).load)
+        self.assertEqual(journal_size, os.path.getsize(self.path + ".journal"))
+
+class DispensableAmountsTableTests(unittest.TestCase):
+    def test_dispensableamountstable_can_dispense_returns_whether_amount_is_reachable(self):
+        # Arrange
+        table = DispensableAmountsTable({20: 3, 50: 1})
+
+        # Act
+        actual = [amount for amount in range(0, 150, 10) if table.can_dispense(amount)]
+
+        # Assert
+        self.assertEqual([0, 20, 40, 50, 60, 70, 90, 110], actual)
+
+    def test_dispensableamountstable_get_nearest_dispensable_amounts_returns_amounts_around(self):
+        # Arrange
+        table = DispensableAmountsTable({20: 3, 50: 1})
+
+        # Act
+        actual = table.get_nearest_dispensable_amounts(Decimal(80))
+
+        # Assert
+        self.assertEqual((Decimal(70), Decimal(90)), actual)
+
+    def test_dispensableamountstable_update_applies_removed_and_added_banknotes(self):
+        # Arrange
+        table = DispensableAmountsTable({20: 3, 50: 1})
+
+        # Act
+        table.update({20: 1, 50: 1, 5: 1})
+
+        # Assert
+        self.assertEqual({5: 1, 20: 1, 50: 1}, table.counts)
+        self.assertTrue(table.can_dispense(75))
+        self.assertFalse(table.can_dispense(40))
+
+    def test_cassettebanknotestorage_can_dispense_follows_withdrawals_and_deposits(self):
+        # Arrange
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette({20: 3, 50: 1})))
+        can_dispense_before = storage.can_dispense(Decimal(60))
+
+        # Act
+        storage.withdraw_banknotes(Decimal(40))
+        can_dispense_after_withdrawal = storage.can_dispense(Decimal(60))
+        storage.deposit_banknotes([Banknote(10)])
+        can_dispense_after_deposit = storage.can_dispense(Decimal(60))
+
+        # Assert
+        self.assertEqual((True, False, True), (can_dispense_before, can_dispense_after_withdrawal, can_dispense_after_deposit))
+
+    def test_banknotestorage_can_dispense_follows_withdrawals(self):
+        # Arrange
+        storage = BanknoteStorage(InMemoryStorage([Banknote(20), Banknote(20), Banknote(50)]))
+        storage.can_dispense(Decimal(40))
+
+        # Act
+        storage.withdraw_banknotes(Decimal(20))
+
+        # Assert
+        self.assertFalse(storage.can_dispense(Decimal(40)))
+        self.assertEqual((Decimal(20), Decimal(50)), storage.get_nearest_dispensable_amounts(Decimal(40)))
+
+class BinaryCassetteStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "atm_data.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_binarycassettestorage_load_returns_saved_cassette(self):
+        # Arrange
+        storage = BinaryCassetteStorage(self.path)
+        cassette = Cassette({5: 3, 20: 10 ** 7, 100: 1})
+
+        # Act
+        storage.save(cassette)
+        loaded = storage.load()
+
+        # Assert
+        self.assertEqual(cassette, loaded)
+        self.assertEqual(48, os.path.getsize(self.path))
+
+    def test_binarycassettestorage_behind_list_storage_withdraws_banknotes(self):
+        # Arrange
+        BinaryCassetteStorage(self.path).save(Cassette({10: 2, 50: 1}))
+        banknote_storage = BanknoteStorage(CassetteBanknotesListStorage(BinaryCassetteStorage(self.path)))
+
+        # Act
+        banknotes = banknote_storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual([Banknote(50), Banknote(10)], banknotes)
+        self.assertEqual(Cassette({10: 1}), BinaryCassetteStorage(self.path).load())
+
+    def test_binarycassettestorage_converters_keep_banknotes_of_legacy_json(self):
+        # Arrange
+        json_path = os.path.join(self.directory.name, "atm_data.json")
+        JsonFileStorage(json_path).save(["5", "20", "20"])
+
+        # Act
+        convert_json_to_binary(json_path, self.path)
+        convert_binary_to_json(self.path, json_path)
+
+        # Assert
+        self.assertEqual(Cassette({5: 1, 20: 2}), BinaryCassetteStorage(self.path).load())
+        self.assertEqual({"5": 1, "20": 2}, JsonFileStorage(json_path).load())
+
+    def test_binarycassettestorage_load_file_of_unknown_format_raises_exception(self):
+        # Arrange
+        JsonFileStorage(self.path).save(["5", "20"])
+
+        # Act, Assert
+        with self.assertRaises(InvalidCassetteFileException):
+            BinaryCassetteStorage(self.path).load()
+
+class JsonFileStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "bank_card.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_jsonfilestorage_atomic_save_replaces_file_without_temporary_files_left(self):
+        # Arrange
+        storage = JsonFileStorage(self.path, atomic=True)
+        storage.save(["5"])
+
+        # Act
+        storage.save(["5", "20"])
+
+        # Assert
+        self.assertEqual(["5", "20"], storage.load())
+        self.assertEqual(["bank_card.json"], os.listdir(self.directory.name))
+
+    def test_cachingstorage_load_unchanged_file_reads_it_once(self):
+        # Arrange
+        JsonFileStorage(self.path).save({"5": 1})
+        storage = CachingStorage(JsonFileCassetteStorage(JsonFileStorage(self.path)), self.path)
+
+        # Act
+        first_cassette = storage.load()
+        first_cassette.add(10, 1)
+        second_cassette = storage.load()
+
+        # Assert
+        self.assertEqual(Cassette({5: 1}), second_cassette)
+        self.assertEqual((1, 1), (storage.hits, storage.misses))
+
+    def test_cachingstorage_load_after_external_change_reads_file_again(self):
+        # Arrange
+        storage = CachingStorage(JsonFileStorage(self.path), self.path)
+        storage.save(["5"])
+        storage.load()
+
+        # Act
+        JsonFileStorage(self.path, atomic=True).save(["5", "20"])
+        loaded = storage.load()
+
+        # Assert
+        self.assertEqual(["5", "20"], loaded)
+        self.assertEqual((1, 1), (storage.hits, storage.misses))
+
+    def test_groupcommitjsonfilestorage_save_without_waiting_is_visible_and_durable_after_flush(self):
+        # Arrange
+        storage = GroupCommitJsonFileStorage(JsonFileStorage(self.path, atomic=True), wait_for_durability=False)
+
+        # Act
+        for value in range(100):
+            storage.save([value])
+        loaded = storage.load()
+        storage.flush()
+
+        # Assert
+        self.assertEqual([99], loaded)
+        self.assertEqual([99], JsonFileStorage(self.path).load())
+        self.assertLessEqual(storage.commits_count, 100)
+        storage.close()
+
+    def test_groupcommitjsonfilestorage_save_to_closed_storage_raises_an_exception(self):
+        # Arrange
+        storage = GroupCommitJsonFileStorage(JsonFileStorage(self.path, atomic=True))
+        storage.close()
+
+        # Act, Assert
+        self.assertRaises(StorageIsClosedException, storage.save, ["5"])
+
+    def test_groupcommitjsonfilestorage_save_after_failed_write_raises_an_exception(self):
+        # Arrange
+        storage = GroupCommitJsonFileStorage(JsonFileStorage(os.path.join(self.path, "missing", "atm_data.json"), atomic=True))
+        self.assertRaises(FileNotFoundError, storage.save, ["5"])
+
+        # Act, Assert
+        self.assertRaises(FileNotFoundError, storage.save, ["10"], wait_for_durability=False)
+        self.assertRaises(FileNotFoundError, storage.close)
+
+class FleetSimulatorTests(unittest.TestCase):
+    def test_trafficmix_parse_unknown_operation_raises_an_exception(self):
+        self.assertRaises(InvalidTrafficMixException, TrafficMix.parse, "withdraw=1,transfer=1")
+
+    def test_run_fleet_reports_every_operation_of_every_machine(self):
+        # Arrange
+        configuration = FleetConfiguration(3, 20, TrafficMix.parse("withdraw=2,deposit=1,phone_payment=1"), "cassette")
+
+        # Act
+        report = run_fleet(configuration, processes=2)
+
+        # Assert
+        self.assertEqual(60, report["operations"])
+        self.assertEqual(60, sum(statistics["count"] for statistics in report["per_operation"].values()))
+        self.assertGreater(report["storage_bytes_written"], 0)
+        for statistics in report["per_operation"].values():
+            self.assertLessEqual(statistics["p50_ms"], statistics["p99_ms"])
+
+class ConcurrentCassetteBanknoteStorageTests(unittest.TestCase):
+    def test_concurrentcassettebanknotestorage_withdraw_banknotes_returns_exact_combination(self):
+        # Arrange
+        storage = ConcurrentCassetteBanknoteStorage(InMemoryStorage(Cassette({50: 1, 20: 3})))
+        expected = [Banknote(20), Banknote(20), Banknote(20)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual(Decimal(50), storage.get_cash_available())
+
+    def test_concurrentcassettebanknotestorage_parallel_sessions_conserve_cash(self):
+        # Arrange
+        in_memory_storage = InMemoryStorage(Cassette({5: 200, 10: 200, 20: 200, 50: 100}))
+        storage = ConcurrentCassetteBanknoteStorage(in_memory_storage)
+        initial_cash = storage.get_cash_available()
+        withdrawed = [Decimal()] * 8
+        deposited = [Decimal()] * 8
+        errors = []
+
+        def session(index: int) -> None:
+            randomizer = random.Random(index)
+            try:
+                for _ in range(300):
+                    if randomizer.random() < 0.6:
+                        banknotes = storage.withdraw_banknotes(Decimal(randomizer.randrange(5, 300, 5)))
+                        withdrawed[index] += sum(banknote.value for banknote in banknotes)
+                    else:
+                        banknotes = [Banknote(randomizer.choice((5, 10, 20, 50))) for _ in range(randomizer.randint(1, 5))]
+                        storage.deposit_banknotes(banknotes)
+                        deposited[index] += sum(banknote.value for banknote in banknotes)
+            except NotEnoughMoneyInStorageException:
+                pass
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=session, args=(index,)) for index in range(8)]
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # Forces threads to interleave as often as possible
+
+        # Act
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Assert
+        expected = initial_cash + sum(deposited) - sum(withdrawed)
+        self.assertEqual([], errors)
+        self.assertEqual(expected, storage.get_cash_available())
+        self.assertEqual(expected, in_memory_storage.load().total)
+        self.assertTrue(all(count >= 0 for count in in_memory_storage.load().counts.values()))
+
+class ShardedBanknoteStorageTests(unittest.TestCase):
+    def create_shards(self, counts: list[tuple[int, int]], capacity: int = None) -> list[BanknoteShard]:
+        return [BanknoteShard(denomination, CountingStorage(InMemoryStorage(Cassette({denomination: count}))), capacity) for denomination, count in counts]
+
+    def test_shardedbanknotestorage_withdraw_banknotes_saves_only_dispensing_shards(self):
+        # Arrange
+        shards = self.create_shards([(10, 5), (20, 5), (50, 5)])
+        storage = ShardedBanknoteStorage(shards)
+        expected = [Banknote(50), Banknote(20)]
+
+        # Act
+        actual = storage.withdraw_banknotes(Decimal(70))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual([0, 1, 1], [shard.storage.saves_count for shard in shards])
+        self.assertEqual(Decimal(330), storage.get_cash_available())
+
+    def test_shardedbanknotestorage_withdraw_banknotes_takes_from_fullest_shard_first(self):
+        # Arrange
+        shards = self.create_shards([(20, 1), (20, 3)])
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        storage.withdraw_banknotes(Decimal(60))
+
+        # Assert
+        self.assertEqual([1, 0], [shard.load_count() for shard in shards])
+
+    def test_shardedbanknotestorage_withdraw_banknotes_doesnt_have_enough_cash_raises_an_exception(self):
+        # Arrange
+        storage = ShardedBanknoteStorage(self.create_shards([(10, 1), (20, 1)]))
+
+        # Act, Assert
+        self.assertRaises(NotEnoughMoneyInStorageException, storage.withdraw_banknotes, Decimal(40))
+
+    def test_shardedbanknotestorage_deposit_banknotes_routes_banknotes_by_denomination(self):
+        # Arrange
+        shards = self.create_shards([(10, 0), (20, 0), (50, 0)])
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        storage.deposit_banknotes([Banknote(50), Banknote(10), Banknote(50)])
+
+        # Assert
+        self.assertEqual([1, 0, 2], [shard.load_count() for shard in shards])
+        self.assertEqual([1, 0, 1], [shard.storage.saves_count for shard in shards])
+
+    def test_shardedbanknotestorage_deposit_banknotes_overflows_to_next_shard(self):
+        # Arrange
+        shards = self.create_shards([(10, 2), (10, 1)], capacity=3)
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        storage.deposit_banknotes([Banknote(10)] * 3)
+
+        # Assert
+        self.assertEqual([3, 3], [shard.load_count() for shard in shards])
+
+    def test_shardedbanknotestorage_deposit_banknotes_rejected_deposit_changes_nothing(self):
+        # Arrange
+        shards = self.create_shards([(10, 2), (20, 0)], capacity=3)
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act, Assert
+        self.assertRaises(NoCassetteForDenominationException, storage.deposit_banknotes, [Banknote(10), Banknote(5)])
+        self.assertRaises(CassetteIsFullException, storage.deposit_banknotes, [Banknote(20), Banknote(10), Banknote(10)])
+        self.assertEqual([0, 0], [shard.storage.saves_count for shard in shards])
+
+    def test_shardedbanknotestorage_batch_saves_each_changed_shard_once(self):
+        # Arrange
+        shards = self.create_shards([(10, 5), (20, 5), (50, 5)])
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        with storage.batch():
+            storage.withdraw_banknotes(Decimal(40))
+            storage.deposit_banknotes([Banknote(20)])
+            storage.withdraw_banknotes(Decimal(20))
+
+        # Assert
+        self.assertEqual([0, 1, 0], [shard.storage.saves_count for shard in shards])
+        self.assertEqual(Decimal(360), storage.get_cash_available())
+
+    def test_shardedbanknotestorage_loads_only_shards_the_operation_needs(self):
+        # Arrange
+        shards = self.create_shards([(10, 5), (20, 5), (50, 5), (100, 5)])
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        storage.withdraw_banknotes(Decimal(30))
+        storage.deposit_banknotes([Banknote(100)])
+
+        # Assert
+        self.assertEqual([1, 1, 0, 1], [shard.storage.loads_count for shard in shards])
+        self.assertEqual(Cassette({10: 4, 20: 4, 50: 5, 100: 6}), storage.get_cassette())
+
+    def test_shardedbanknotestorage_failed_save_restores_saved_shards(self):
+        # Arrange
+        shards = [BanknoteShard(10, CountingStorage(InMemoryStorage(Cassette({10: 5})))),
+                  BanknoteShard(20, FailingSaveStorage(InMemoryStorage(Cassette({20: 5}))))]
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act, Assert
+        self.assertRaises(OSError, storage.withdraw_banknotes, Decimal(30))
+        self.assertEqual([5, 5], [shard.load_count() for shard in shards])
+        self.assertEqual(2, shards[0].storage.saves_count)
+        self.assertTrue(storage.can_dispense(Decimal(150)))
+
+    def test_shardedbanknotestorage_batch_failed_commit_restores_committed_shards(self):
+        # Arrange
+        shards = [BanknoteShard(10, CountingStorage(InMemoryStorage(Cassette({10: 5})))),
+                  BanknoteShard(20, FailingSaveStorage(InMemoryStorage(Cassette({20: 5}))))]
+        storage = ShardedBanknoteStorage(shards)
+
+        # Act
+        with self.assertRaises(OSError):
+            with storage.batch():
+                storage.withdraw_banknotes(Decimal(10))
+                storage.withdraw_banknotes(Decimal(20))
+
+        # Assert
+        self.assertEqual([5, 5], [shard.load_count() for shard in shards])
+        self.assertEqual(Decimal(150), storage.get_cash_available())
+
+    def test_create_json_shards_splits_cassette_into_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            shards = create_json_shards(directory, Cassette({10: 3, 50: 1}))
+            ShardedBanknoteStorage(shards).withdraw_banknotes(Decimal(50))
+
+            # Act
+            actual = ShardedBanknoteStorage(create_json_shards(directory, Cassette({10: 3, 50: 1})))
+
+            # Assert
+            self.assertEqual(["cassette_10.json", "cassette_50.json"], sorted(os.listdir(directory)))
+            self.assertEqual(Cassette({10: 3}), actual.get_cassette())
+            self.assertTrue(actual.can_dispense(Decimal(30)))
+            self.assertFalse(actual.can_dispense(Decimal(50)))
+
+class AsyncTellerMachineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_asyncbanknotestorage_withdraw_banknotes_returns_same_banknotes_as_banknotestorage(self):
+        # Arrange
+        storage = AsyncBanknoteStorage(AsyncInMemoryStorage([Banknote(1), Banknote(2), Banknote(5), Banknote(10)]))
+        expected = [Banknote(5), Banknote(2), Banknote(1)]
+
+        # Act
+        actual = await storage.withdraw_banknotes(Decimal(9))
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertEqual(Decimal(10), await storage.get_cash_available())
+
+    async def test_asynctellermachine_concurrent_sessions_dont_dispense_same_banknotes(self):
+        # Arrange
+        banknotes = [Banknote(10) for _ in range(10)]
+        storage = AsyncBanknoteStorage(ThreadedAsyncStorage(InMemoryStorage(banknotes)))
+        teller_machine = AsyncTellerMachine(storage)
+        cards = [BankCard("1" * 16, datetime(2030, 1, 1), "Test User", "1" * 3, "1" * 4, CardAccount()) for _ in range(10)]
+        for card in cards:
+            card.deposit_cash(Decimal(100))
+
+        # Act
+        withdrawed = await asyncio.gather(*(teller_machine.withdraw_cash(Decimal(10), card) for card in cards))
+
+        # Assert
+        self.assertEqual([[Banknote(10)]] * 10, withdrawed)
+        self.assertEqual(Decimal(0), await storage.get_cash_available())
+        self.assertTrue(all(card.get_card_balance() == Decimal(90) for card in cards))
+
+class IndexedCardRepositoryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.repository = IndexedCardRepository(self.directory.name)
+
+    def tearDown(self):
+        self.repository.close()
+        self.directory.cleanup()
+
+    def create_card(self, number: int, balance: Decimal = Decimal(100)) -> BankCard:
+        account = CardAccount()
+        account.deposit_cash(balance)
+        return BankCard(number.__str__().zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, account)
+
+    def test_indexedcardrepository_get_after_index_growth_returns_every_card(self):
+        # Arrange
+        for number in range(3000):
+            self.repository.add(self.create_card(number, Decimal(number)))
+
+        # Act
+        cards = [self.repository.get(number.__str__().zfill(16)) for number in range(0, 3000, 7)]
+
+        # Assert
+        self.assertEqual(3000, len(self.repository))
+        for card in cards:
+            self.assertEqual(Decimal(int(card.card_number)), card.get_card_balance())
+
+    def test_indexedcardrepository_cards_of_the_same_number_dont_lose_changes(self):
+        # Arrange
+        self.repository.add(self.create_card(1))
+        first_card = self.repository.get("1".zfill(16))
+        second_card = self.repository.get("1".zfill(16))
+        first_card.get_card_balance()
+        second_card.get_card_balance()
+
+        # Act
+        first_card.withdraw_cash(Decimal(70))
+        second_card.deposit_cash(Decimal(5))
+
+        # Assert
+        self.assertRaises(NotEnoughMoneyOnBalanceException, second_card.withdraw_cash, Decimal(70))
+        self.assertEqual(Decimal(35), first_card.get_card_balance())
+        self.assertEqual(Decimal(35), self.repository.get_balance("1".zfill(16)))
+
+    def test_indexedcardrepository_add_existing_card_raises_an_exception(self):
+        # Arrange
+        self.repository.add(self.create_card(1))
+
+        # Act, Assert
+        self.assertRaises(CardIsAlreadyInRepositoryException, self.repository.add, self.create_card(1))
+
+    def test_indexedcardrepository_get_missing_card_raises_an_exception(self):
+        self.assertRaises(CardIsNotInRepositoryException, self.repository.get, "1" * 16)
+
+    def test_indexedcardrepository_card_account_withdraw_cash_updates_balance_in_place(self):
+        # Arrange
+        self.repository.add(self.create_card(1))
+        self.repository.add(self.create_card(2))
+        card = self.repository.get("1".zfill(16))
+
+        # Act
+        card.withdraw_cash(Decimal("30.5"))
+        self.repository.close()
+        self.repository = IndexedCardRepository(self.directory.name)
+
+        # Assert
+        self.assertEqual(Decimal("69.5"), self.repository.get_balance("1".zfill(16)))
+        self.assertEqual(Decimal(100), self.repository.get_balance("2".zfill(16)))
+
+    def test_indexedcardrepository_update_balance_to_shorter_value_overwrites_whole_field(self):
+        # Arrange
+        self.repository.add(self.create_card(1, Decimal("1000.25")))
+
+        # Act
+        self.repository.update_balance("1".zfill(16), Decimal(40))
+
+        # Assert
+        self.assertEqual(Decimal(40), self.repository.get_balance("1".zfill(16)))
+
+    def test_indexedcardrepository_import_json_reads_bank_card_file_format(self):
+        # Arrange
+        path = os.path.join(self.directory.name, "bank_card.json")
+        self.create_card(5, Decimal(95)).save_to_file(path)
+        export_path = os.path.join(self.directory.name, "cards.json")
+
+        # Act
+        imported = self.repository.import_json(path)
+        self.repository.export_json(export_path)
+
+        # Assert
+        self.assertEqual(1, imported)
+        with open(path) as file, open(export_path) as export_file:
+            self.assertEqual([json.load(file)], json.load(export_file))
+
+class CountingStorage(IStorage):
+    def __init__(self, storage: IStorage) -> None:
+        self.storage = storage
+        self.loads_count = 0
+        self.saves_count = 0
+
+    def save(self, data) -> None:
+        self.saves_count += 1
+        self.storage.save(data)
+
+    def load(self):
+        self.loads_count += 1
+        return self.storage.load()
+
+class FailingSaveStorage(CountingStorage):
+    def save(self, data) -> None:
+        raise OSError("No space left on device.")
+
+class FailingCardAccount(CardAccount):
+    def deposit_cash(self, amount: Decimal) -> None:
+        raise OSError("Card account isn't available.")
+
+class DepositIngestorTests(unittest.TestCase):
+    def setUp(self):
+        self.ingestor = DepositIngestor([10, 20, 50])
+        self.card = BankCard("1".zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, CardAccount())
+
+    def test_depositingestor_count_aggregates_values_per_denomination(self):
+        # Arrange
+        values = ["10", "50", 20, Decimal("10.0"), "10"] * 1000
+
+        # Act
+        actual = self.ingestor.count(values)
+
+        # Assert
+        self.assertEqual(Cassette({10: 3000, 20: 1000, 50: 1000}), actual)
+
+    def test_depositingestor_count_not_allowed_denomination_raises_an_exception(self):
+        # Act, Assert
+        for value in ("5", "ten", "sNaN", 100):
+            self.assertRaises(DenominationIsNotAllowedException, self.ingestor.count, ["10", value])
+
+    def test_depositingestor_deposit_values_updates_storage_and_card_once(self):
+        # Arrange
+        in_memory_storage = CountingStorage(InMemoryStorage(Cassette({10: 1})))
+        storage = CassetteBanknoteStorage(in_memory_storage)
+
+        # Act
+        actual = self.ingestor.deposit_values(("20" for _ in range(5000)), storage, self.card)
+
+        # Assert
+        self.assertEqual(Money(100000), actual)
+        self.assertEqual(Decimal(100000), self.card.get_card_balance())
+        self.assertEqual(Cassette({10: 1, 20: 5000}), in_memory_storage.load())
+        self.assertEqual(1, in_memory_storage.saves_count)
+
+    def test_depositingestor_deposit_file_rejected_line_changes_nothing(self):
+        # Arrange
+        storage = BanknoteStorage(InMemoryStorage([]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "deposit.txt")
+            with open(path, 'w') as file:
+                file.write("10 20 20\n50\n50 7\n")
+
+            # Act
+            with self.assertRaises(DenominationIsNotAllowedException) as context:
+                self.ingestor.deposit_file(path, storage, self.card)
+
+        # Assert
+        self.assertEqual(("Line", 3), context.exception.args[-2:])
+        self.assertEqual(Decimal(), storage.get_cash_available())
+        self.assertEqual(Decimal(), self.card.get_card_balance())
+
+    def test_depositingestor_deposit_failed_card_credit_changes_no_storage(self):
+        # Arrange
+        in_memory_storage = InMemoryStorage(Cassette({10: 1}))
+        card = BankCard("1".zfill(16), datetime(2030, 1, 12).date(), "Test User", "1" * 3, "1" * 4, FailingCardAccount())
+
+        # Act, Assert
+        self.assertRaises(OSError, self.ingestor.deposit_values, ["10", "20"], CassetteBanknoteStorage(in_memory_storage), card)
+        self.assertEqual(Cassette({10: 1}), in_memory_storage.load())
+
+    def test_depositingestor_deposit_rejected_by_storage_takes_card_credit_back(self):
+        # Arrange
+        storage = ShardedBanknoteStorage([BanknoteShard(10, InMemoryStorage(Cassette({10: 1})))])
+
+        # Act, Assert
+        self.assertRaises(NoCassetteForDenominationException, self.ingestor.deposit_values, ["10", "20"], storage, self.card)
+        self.assertEqual(Decimal(), self.card.get_card_balance())
+        self.assertEqual(Decimal(10), storage.get_cash_available())
+
+class TellerMachineBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.storage = CountingStorage(InMemoryStorage(Cassette({10: 5, 50: 2})))
+        self.teller_machine = TellerMachine(CassetteBanknoteStorage(self.storage))
+        self.card = BankCard("1" * 16, datetime(2030, 1, 1), "Test User", "1" * 3, "1" * 4, CardAccount())
+        self.card.deposit_cash(Decimal(100))
+
+    def test_tellermachine_process_batch_best_effort_loads_and_saves_storage_once(self):
+        # Arrange
+        operations = [DepositOperation(self.card, [Banknote(20), Banknote(20)]),
+                      WithdrawOperation(self.card, Decimal(1000)),
+                      WithdrawOperation(self.card, Decimal(60)),
+                      PhonePaymentOperation(self.card, "+375291234567", Decimal(10))]
+
+        # Act
+        batch_result = self.teller_machine.process_batch(operations)
+
+        # Assert
+        self.assertTrue(batch_result.committed)
+        self.assertEqual([operations[1]], [result.operation for result in batch_result.failures])
+        self.assertIsInstance(batch_result.failures[0].error, NotEnoughMoneyOnBalanceException)
+        self.assertEqual(Decimal(40), batch_result.results[0].result)
+        self.assertEqual(Decimal(70), self.card.get_card_balance())
+        self.assertEqual(Decimal(130), self.storage.load().total)
+        self.assertEqual((2, 1), (self.storage.loads_count, self.storage.saves_count))
+
+    def test_tellermachine_process_batch_all_or_nothing_failure_discards_changes(self):
+        # Arrange
+        operations = [WithdrawOperation(self.card, Decimal(60)),
+                      DepositOperation(self.card, [Banknote(20)]),
+                      WithdrawOperation(self.card, Decimal(1000))]
+
+        # Act
+        batch_result = self.teller_machine.process_batch(operations, BatchMode.ALL_OR_NOTHING)
+
+        # Assert
+        self.assertFalse(batch_result.committed)
+        self.assertEqual(3, len(batch_result.results))
+        self.assertEqual(Decimal(100), self.card.get_card_balance())
+        self.assertEqual(Cassette({10: 5, 50: 2}), self.storage.load())
+        self.assertEqual(0, self.storage.saves_count)
+
+    def test_tellermachine_process_batch_failed_save_reverts_card_changes(self):
+        # Arrange
+        storage = FailingSaveStorage(InMemoryStorage(Cassette({10: 5, 50: 2})))
+        teller_machine = TellerMachine(CassetteBanknoteStorage(storage))
+        operations = [WithdrawOperation(self.card, Decimal(60)),
+                      DepositOperation(self.card, [Banknote(20)]),
+                      PhonePaymentOperation(self.card, "+375291234567", Decimal(10))]
+
+        # Act, Assert
+        for mode in (BatchMode.ALL_OR_NOTHING, BatchMode.BEST_EFFORT):
+            self.assertRaises(OSError, teller_machine.process_batch, operations, mode)
+            self.assertEqual(Decimal(100), self.card.get_card_balance())
+            self.assertEqual(Cassette({10: 5, 50: 2}), storage.load())
+
+    def test_tellermachine_process_batch_all_or_nothing_without_batch_support_raises_an_exception(self):
+        # Arrange
+        in_memory_storage = InMemoryStorage(Cassette({10: 5, 50: 2}))
+        teller_machine = TellerMachine(ConcurrentCassetteBanknoteStorage(in_memory_storage))
+        operations = [WithdrawOperation(self.card, Decimal(60))]
+
+        # Act, Assert
+        self.assertRaises(AtomicBatchIsNotSupportedException, teller_machine.process_batch, operations, BatchMode.ALL_OR_NOTHING)
+        self.assertEqual(Decimal(100), self.card.get_card_balance())
+        self.assertEqual(Cassette({10: 5, 50: 2}), in_memory_storage.load())
+
+class InstrumentationTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.card = BankCard("1" * 16, datetime(2030, 1, 1), "Test User", "1" * 3, "1" * 4, CardAccount())
+
+    def test_instrumentedtellermachine_records_calls_and_errors_per_operation(self):
+        # Arrange
+        storage = InstrumentedBanknoteStorage(CassetteBanknoteStorage(InMemoryStorage(Cassette({10: 5}))), self.registry)
+        teller_machine = InstrumentedTellerMachine(TellerMachine(storage), self.registry)
+        teller_machine.deposit_cash([Banknote(10)], self.card)
+
+        # Act
+        teller_machine.withdraw_cash(Decimal(10), self.card)
+        self.assertRaises(NotEnoughMoneyOnBalanceException, teller_machine.withdraw_cash, Decimal(10), self.card)
+        snapshot = self.registry.snapshot()
+
+        # Assert
+        calls = {(metric["labels"]["component"], metric["labels"]["operation"]): metric["value"] for metric in snapshot["atm_operation_calls_total"]}
+        self.assertEqual(2, calls[("teller_machine", "withdraw_cash")])
+        self.assertEqual(2, calls[("banknote_storage", "withdraw_banknotes")])
+        self.assertEqual([{"labels": {"component": "teller_machine", "operation": "withdraw_cash", "error": "NotEnoughMoneyOnBalanceException"}, "value": 1}],
+                         snapshot["atm_operation_errors_total"])
+        durations = [metric for metric in snapshot["atm_operation_duration_seconds"] if metric["labels"]["operation"] == "withdraw_cash"]
+        self.assertEqual(2, durations[0]["count"])
+
+    def test_instrumentedstorage_counts_bytes_of_file_storage(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "atm_data.json")
+            storage = InstrumentedStorage(JsonFileStorage(path), self.registry, "banknote_file")
+
+            # Act
+            storage.save({"10": 5})
+            storage.load()
+            file_size = os.path.getsize(path)
+
+        # Assert
+        snapshot = self.registry.snapshot()
+        self.assertEqual(file_size, snapshot["atm_storage_bytes_written_total"][0]["value"])
+        self.assertEqual(file_size, snapshot["atm_storage_bytes_read_total"][0]["value"])
+
+    def test_prometheusfileexporter_dump_writes_metrics_in_text_format(self):
+        # Arrange
+        self.registry.increment("atm_operation_calls_total", (("operation", "withdraw_cash"),))
+        self.registry.observe("atm_operation_duration_seconds", (("operation", "withdraw_cash"),), 0.003)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "atm.prom")
+
+            # Act
+            PrometheusFileExporter(self.registry, path).dump()
+            with open(path) as file:
+                lines = file.read().splitlines()
+
+        # Assert
+        self.assertIn("# TYPE atm_operation_calls_total counter", lines)
+        self.assertIn('atm_operation_calls_total{operation="withdraw_cash"} 1', lines)
+        self.assertIn('atm_operation_duration_seconds_bucket{operation="withdraw_cash",le="0.0025"} 0', lines)
+        self.assertIn('atm_operation_duration_seconds_bucket{operation="withdraw_cash",le="0.005"} 1', lines)
+        self.assertIn('atm_operation_duration_seconds_count{operation="withdraw_cash"} 1', lines)
+
+    def test_disabled_instrumentation_returns_components_as_they_are(self):
+        # Arrange
+        instrumentation = Instrumentation()
+        teller_machine = TellerMachine(CassetteBanknoteStorage(InMemoryStorage(Cassette())))
+
+        # Act
+        actual = instrumentation.instrument_teller_machine(teller_machine)
+
+        # Assert
+        self.assertIs(teller_machine, actual)
+        self.assertEqual({}, instrumentation.snapshot())
+
+class ReplenishmentPlannerTests(unittest.TestCase):
+    def setUp(self):
+        # The planner is the only part, which depends on NumPy.
+        pytest.importorskip("numpy")
+        from src.planning import replenishment_planner
+        self.planning = replenishment_planner
+        self.state = self.planning.FleetState.from_cassettes({"atm-1": Cassette({50: 10, 100: 5}), "atm-2": Cassette({50: 100})})
+        self.records = [{"machine": "atm-1", "period": period, "banknotes": {"50": 6, "100": 2}} for period in range(7)]
+        self.records += [{"machine": "atm-2", "period": period, "banknotes": {"50": 1}} for period in range(7)]
+        self.history = self.planning.WithdrawalHistory.from_records(self.records, self.state, 7)
+
+    def test_replenishmentplanner_plan_refills_machines_up_to_expected_demand(self):
+        # Arrange
+        planner = self.planning.ReplenishmentPlanner(self.planning.ReplenishmentPolicy(service_level=0.95, horizon_periods=7, capacity=2000))
+
+        # Act
+        plan = planner.plan(self.state, self.history)
+
+        # Assert
+        self.assertEqual({50: 32, 100: 9}, plan.for_machine("atm-1"))
+        self.assertEqual({}, plan.for_machine("atm-2"))
+
+    def test_replenishmentplanner_plan_keeps_refills_within_capacities(self):
+        # Arrange
+        planner = self.planning.ReplenishmentPlanner(self.planning.ReplenishmentPolicy(service_level=0.95, horizon_periods=7, capacity=[30, 40], refill_unit=10))
+
+        # Act
+        plan = planner.plan(self.state, self.history)
+
+        # Assert
+        self.assertEqual({50: 20, 100: 10}, plan.for_machine("atm-1"))
+        self.assertEqual([12, 0], plan.shortfall[0].tolist())
+
+    def test_replenishmentplanner_plan_refills_denomination_which_ran_out_in_the_whole_fleet(self):
+        # Arrange
+        cassettes = {"atm-1": Cassette({50: 10}), "atm-2": Cassette({50: 100})}
+        state = self.planning.FleetState.from_cassettes(cassettes, records=self.records)
+        history = self.planning.WithdrawalHistory.from_records(self.records, state, 7)
+        planner = self.planning.ReplenishmentPlanner(self.planning.ReplenishmentPolicy(service_level=0.95, horizon_periods=7, capacity=2000))
+
+        # Act
+        plan = planner.plan(state, history)
+
+        # Assert
+        self.assertEqual([50, 100], state.denominations)
+        self.assertEqual({50: 32, 100: 14}, plan.for_machine("atm-1"))
+
+    def test_withdrawalhistory_from_records_with_denomination_which_isnt_planned_raises_an_exception(self):
+        # Arrange
+        state = self.planning.FleetState.from_cassettes({"atm-1": Cassette({50: 10})}, [50])
+
+        # Act, Assert
+        self.assertRaises(self.planning.InvalidFleetDataException, self.planning.WithdrawalHistory.from_records, self.records, state, 7)
+
+class TransactionRecorderTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "transactions.jsonl")
+        self.cassette = Cassette({10: 5, 50: 2})
+        account = CardAccount()
+        account.deposit_cash(Decimal(200))
+        self.card = BankCard("1" * 16, datetime(2030, 1, 1), "Test User", "123", "4321", account)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record_session(self):
+        recorder = TransactionRecorder(self.path, self.cassette)
+        teller_machine = recorder.record_teller_machine(TellerMachine(CassetteBanknoteStorage(InMemoryStorage(Cassette(self.cassette.counts)))))
+        recorder.insert_card(self.card)
+        recorder.gain_access(self.card, "0000")
+        recorder.gain_access(self.card, "4321")
+        teller_machine.withdraw_cash(Decimal(60), self.card)
+        teller_machine.deposit_cash([Banknote(20), Banknote(20)], self.card)
+        self.assertRaises(NotEnoughMoneyInStorageException, teller_machine.withdraw_cash, Decimal(500), self.card)
+        teller_machine.pay_for_the_phone("+375291234567", Decimal(15), self.card)
+        teller_machine.get_card_balance(self.card)
+        recorder.withdraw_card(self.card)
+        recorder.close()
+
+    def test_recorder_does_not_write_card_secrets(self):
+        # Act
+        self.record_session()
+        header, records = read_log(self.path)
+
+        # Assert
+        self.assertEqual({"10": 5, "50": 2}, header["cassette"])
+        self.assertEqual(9, len(records))
+        self.assertNotIn("cvc", records[0]["a"][0])
+        self.assertNotIn("password", records[0]["a"][0])
+        self.assertEqual([[False], [True]], [records[1]["a"], records[2]["a"]])
+
+    def test_replay_of_recorded_session_matches_results(self):
+        # Arrange
+        self.record_session()
+        header, records = read_log(self.path)
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette.from_json(header["cassette"])))
+
+        # Act
+        report = replay(records, TellerMachine(storage))
+
+        # Assert
+        self.assertTrue(report.succeeded)
+        self.assertEqual(8, report.operations)
+        self.assertEqual(2, report.operations_by_type["withdraw_cash"])
+        self.assertEqual(Decimal(130), storage.get_cash_available())
+
+    def test_replay_log_of_two_sessions_replays_every_session_against_its_cassette(self):
+        # Arrange
+        self.record_session()
+        self.cassette = Cassette({10: 10})
+        self.record_session()
+        header, records = read_log(self.path)
+        create_teller_machine = lambda cassette: TellerMachine(CassetteBanknoteStorage(InMemoryStorage(cassette)))
+
+        # Act
+        report = replay(records, create_teller_machine(Cassette.from_json(header["cassette"])), 1000, create_teller_machine)
+
+        # Assert
+        self.assertEqual(1, sum("v" in record for record in records))
+        self.assertTrue(report.succeeded)
+        self.assertEqual(16, report.operations)
+
+    def test_replay_reports_mismatches_with_line_numbers_of_the_file(self):
+        # Arrange
+        self.record_session()
+        with open(self.path) as file:
+            lines = file.readlines()
+        lines.insert(1, "\n")
+        with open(self.path, 'w') as file:
+            file.writelines(lines)
+        _, records = read_log(self.path)
+
+        # Act
+        report = replay(records, TellerMachine(CassetteBanknoteStorage(InMemoryStorage(Cassette({10: 10})))))
+
+        # Assert
+        mismatch = report.to_json()["first_mismatches"][0]
+        self.assertEqual("withdraw_cash", json.loads(lines[mismatch["line"] - 1])["op"])
+
+    def test_replay_reports_mismatches_against_different_storage(self):
+        # Arrange
+        self.record_session()
+        _, records = read_log(self.path)
+        storage = CassetteBanknoteStorage(InMemoryStorage(Cassette({10: 10})))
+
+        # Act
+        report = replay(records, TellerMachine(storage))
+
+        # Assert
+        self.assertFalse(report.succeeded)
+        self.assertEqual("withdraw_cash", report.to_json()["first_mismatches"][0]["operation"])
+
+class LedgerCardAccountTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "bank_card.ledger")
+        self.time = 1000.0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def clock(self):
+        self.time += 10
+        return self.time
+
+    def test_ledgercardaccount_balance_at_returns_balance_after_changes_at_the_time(self):
+        # Arrange
+        account = LedgerCardAccount(snapshot_interval=4, clock=self.clock)
+        for amount in range(1, 11):
+            account.deposit_cash(Decimal(amount))
+        account.withdraw_cash(Decimal(5))
+
+        # Act, Assert
+        self.assertEqual(Decimal(50), account.balance)
+        self.assertEqual(Decimal(0), account.balance_at(1000))
+        self.assertEqual(Decimal(1), account.balance_at(1010))
+        self.assertEqual(Decimal(15), account.balance_at(1055))
+        self.assertEqual(Decimal(55), account.balance_at(1100))
+        self.assertEqual(Decimal(50), account.balance_at(2000))
+        self.assertEqual([(1100.0, Decimal(10)), (1110.0, Decimal(-5))], account.history(1100))
+
+    def test_ledgercardaccount_restores_balance_and_history_from_file(self):
+        # Arrange
+        account = LedgerCardAccount(self.path, Decimal(100), snapshot_interval=2, clock=self.clock)
+        account.withdraw_cash(Decimal(30))
+        account.deposit_cash(Decimal(5))
+        account.close()
+
+        # Act
+        restored_account = LedgerCardAccount(self.path, Decimal(100), snapshot_interval=2, clock=self.clock)
+
+        # Assert
+        self.assertEqual(Decimal(75), restored_account.balance)
+        self.assertEqual(Decimal(70), restored_account.balance_at(1020))
+        self.assertEqual(3, len(restored_account.history()))
+        self.assertRaises(NotEnoughMoneyOnBalanceException, restored_account.withdraw_cash, Decimal(100))
+        restored_account.close()
+
+    def test_ledgercardaccount_cuts_off_torn_last_record(self):
+        # Arrange
+        account = LedgerCardAccount(self.path, Decimal(100), clock=self.clock)
+        account.withdraw_cash(Decimal(30))
+        account.close()
+        with open(self.path, 'a') as file:
+            file.write('{"t":1030,"a":"-2')
+
+        # Act
+        restored_account = LedgerCardAccount(self.path, clock=self.clock)
+        restored_account.deposit_cash(Decimal(1))
+        restored_account.close()
+
+        # Assert
+        self.assertEqual(Decimal(71), LedgerCardAccount(self.path).balance)
+
+    def test_ledgercardaccount_raises_an_exception_for_snapshot_not_matching_changes(self):
+        # Arrange
+        with open(self.path, 'w') as file:
+            file.write('{"t":1,"a":"10"}\n{"t":1,"b":"20"}\n')
+
+        # Act, Assert
+        self.assertRaises(CorruptedLedgerException, LedgerCardAccount, self.path)
+
+    def test_ledgercardaccount_raises_an_exception_for_invalid_record_in_the_middle(self):
+        # Arrange
+        with open(self.path, 'w') as file:
+            file.write('{"t":1,"a":"10"}\n{"t":2,"a":"-2\n{"t":3,"a":"5"}\n')
+
+        # Act, Assert
+        self.assertRaises(CorruptedLedgerException, LedgerCardAccount, self.path)
+
+    def test_ledgercardaccount_raises_an_exception_for_record_without_amount_and_balance(self):
+        # Arrange
+        with open(self.path, 'w') as file:
+            file.write('{"t":1,"a":"10"}\n{"t":2}\n')
+
+        # Act, Assert
+        self.assertRaises(CorruptedLedgerException, LedgerCardAccount, self.path)
+
+    def test_bankcard_load_from_file_uses_passed_card_account(self):
+        # Arrange
+        card_path = os.path.join(self.directory.name, "bank_card.json")
+        BankCard("1" * 16, datetime(2030, 1, 1), "Test User", "123", "1234", CardAccount()).save_to_file(card_path)
+        account = LedgerCardAccount(self.path, Decimal(40))
+
+        # Act
+        card = BankCard.load_from_file(card_path, account)
+        card.withdraw_cash(Decimal(15))
+
+        # Assert
+        self.assertIs(account, card.card_account)
+        self.assertEqual("25", card.to_json()["balance"])
+        account.close()
+
+class PinLockoutTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.time = 1000.0
+        self.tracker = PinLockoutTracker(max_attempts=3, lockout_seconds=60, capacity=100, clock=lambda: self.time)
+        self.card_number = "1" * 16
+
+    def create_card(self):
+        return BankCard(self.card_number, datetime(2030, 1, 1), "Test User", "123", "1234", CardAccount())
+
+    def test_pinlockouttracker_locks_card_out_after_max_failures_until_lockout_expires(self):
+        # Act
+        results = [self.tracker.record_failure(self.card_number) for _ in range(3)]
+        self.time += 59
+        is_locked_before_expiry = self.tracker.is_locked(self.card_number)
+        self.time += 1
+
+        # Assert
+        self.assertEqual([False, False, True], results)
+        self.assertTrue(is_locked_before_expiry)
+        self.assertFalse(self.tracker.is_locked(self.card_number))
+        self.assertEqual(3, self.tracker.attempts_left(self.card_number))
+        self.assertEqual(0, len(self.tracker))
+
+    def test_pinlockouttracker_record_success_forgets_failures(self):
+        # Arrange
+        self.tracker.record_failure(self.card_number)
+        self.tracker.record_failure(self.card_number)
+
+        # Act
+        self.tracker.record_success(self.card_number)
+
+        # Assert
+        self.assertEqual(3, self.tracker.attempts_left(self.card_number))
+
+    def test_pinlockouttracker_evicts_least_recently_used_cards_over_capacity(self):
+        # Act
+        for card_number in range(150):
+            self.tracker.record_failure(card_number.__str__())
+
+        # Assert
+        self.assertEqual(100, len(self.tracker))
+        self.assertEqual(3, self.tracker.attempts_left("0"))
+        self.assertEqual(2, self.tracker.attempts_left("149"))
+
+    def test_pinlockouttracker_keeps_lockout_over_capacity_until_it_expires(self):
+        # Arrange
+        for _ in range(3):
+            self.tracker.record_failure(self.card_number)
+
+        # Act
+        for card_number in range(150):
+            self.tracker.record_failure(card_number.__str__())
+        is_locked_before_expiry = self.tracker.is_locked(self.card_number)
+        attempts_left_before_expiry = self.tracker.attempts_left(self.card_number)
+        self.time += 60
+
+        # Assert
+        self.assertTrue(is_locked_before_expiry)
+        self.assertEqual(0, attempts_left_before_expiry)
+        self.assertFalse(self.tracker.is_locked(self.card_number))
+
+    def test_pinlockouttracker_drops_lockouts_ending_the_soonest_over_capacity(self):
+        # Act
+        for card_number in range(150):
+            for _ in range(3):
+                self.tracker.record_failure(card_number.__str__())
+            self.time += 0.1
+
+        # Assert
+        self.assertEqual(100, len(self.tracker))
+        self.assertFalse(self.tracker.is_locked("49"))
+        self.assertTrue(self.tracker.is_locked("50"))
+        self.assertTrue(self.tracker.is_locked("149"))
+
+    def test_pinlockouttracker_restores_lockouts_from_storage(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            storage = JsonFileStorage(os.path.join(directory, "pin_lockouts.json"))
+            tracker = PinLockoutTracker(lockout_seconds=60, storage=storage, clock=lambda: self.time)
+            for _ in range(3):
+                tracker.record_failure(self.card_number)
+
+            # Act
+            locked_until = PinLockoutTracker(lockout_seconds=60, storage=storage, clock=lambda: self.time).locked_until(self.card_number)
+            self.time += 60
+            is_locked_after_expiry = PinLockoutTracker(lockout_seconds=60, storage=storage, clock=lambda: self.time).is_locked(self.card_number)
+
+        # Assert
+        self.assertEqual(1060, locked_until)
+        self.assertFalse(is_locked_after_expiry)
+
+    def test_bankcard_gain_access_shares_failures_between_card_objects_through_tracker(self):
+        # Arrange
+        self.create_card().gain_access("0000", self.tracker)
+        self.create_card().gain_access("0000", self.tracker)
+        card = self.create_card()
+
+        # Act
+        blocked_state = card.gain_access("0000", self.tracker)
+        state_with_right_pin = card.gain_access("1234", self.tracker)
+        self.time += 60
+        state_after_lockout = card.gain_access("1234", self.tracker)
+
+        # Assert
+        self.assertEqual(CardState.BLOCKED, blocked_state)
+        self.assertEqual(CardState.BLOCKED, state_with_right_pin)
+        self.assertEqual(CardState.OPENED, state_after_lockout)
+        self.assertEqual("3", card.attempts_left)
+
+class ControllerRegistryTests(unittest.TestCase):
+    def test_controllerregistry_imports_controller_only_when_it_is_requested(self):
+        # Arrange
+        registry = ControllerRegistry({"missing": "src.controllers.missing_controller:MissingController",
+                                       "batch": "src.batch_operations:BatchResult"})
+
+        # Act
+        controller_class = registry.get_controller_class("batch")
+
+        # Assert
+        self.assertEqual("BatchResult", controller_class.__name__)
+        self.assertIs(controller_class, registry.get_controller_class("batch"))
+        self.assertRaises(ModuleNotFoundError, registry.get_controller_class, "missing")
+
+    def test_controllerregistry_raises_an_exception_for_unknown_name_and_invalid_path(self):
+        # Arrange
+        registry = ControllerRegistry()
+
+        # Act, Assert
+        self.assertRaises(UnknownControllerException, registry.create, "console")
+        self.assertRaises(InvalidControllerPathException, registry.register, "console", "src.controllers.console_teller_machine_controller")
+
+class YieldingAsyncStorage(AsyncInMemoryStorage):
+    async def load(self):
+        # Passes control to other tasks like a real storage waiting for I/O.
+        await asyncio.sleep(0)
+        return await super().load()
+
+class TellerMachineServerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.repository = IndexedCardRepository(self.directory.name)
+        account = CardAccount()
+        account.deposit_cash(Decimal(100))
+        self.repository.add(BankCard("1111222233334444", datetime(2030, 1, 1).date(), "Test User", "111", "1111", account))
+        self.banknotes_storage = AsyncBanknoteStorage(YieldingAsyncStorage([Banknote(50), Banknote(20), Banknote(20)]))
+        self.server = TellerMachineServer(AsyncTellerMachine(self.banknotes_storage), self.repository)
+        await self.server.start_tcp()
+        self.reader, self.writer = await asyncio.open_connection(*self.server.sockets[0].getsockname()[:2])
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        while self.server.connections:
+            await asyncio.sleep(0.001)
+        await self.server.close()
+        self.repository.close()
+        self.directory.cleanup()
+
+    async def call(self, *requests) -> list[dict]:
+        for request_id, (method, params) in enumerate(requests):
+            self.writer.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).encode() + b"\n")
+        return [json.loads(await self.reader.readline()) for _ in requests]
+
+    async def test_server_answers_pipelined_requests_in_order(self):
+        # Act
+        responses = await self.call(("insert_card", ["1111222233334444"]), ("enter_pin", {"pin": "1111"}), ("withdraw", {"amount": "70"}),
+                                    ("deposit", {"banknotes": [10, "5"]}), ("pay_phone", ["+375291234567", 5]), ("get_balance", {}))
+
+        # Assert
+        self.assertEqual(list(range(6)), [response["id"] for response in responses])
+        self.assertEqual("OPENED", responses[1]["result"]["state"])
+        self.assertEqual({"banknotes": ["50", "20"], "balance": "30"}, responses[2]["result"])
+        self.assertEqual("15", responses[3]["result"]["deposited"])
+        self.assertEqual("40", responses[5]["result"])
+        self.assertEqual(Decimal(40), self.repository.get_balance("1111222233334444"))
+
+    async def test_server_returns_errors_without_closing_session(self):
+        # Act
+        responses = await self.call(("insert_card", ["1111222233334444"]), ("get_balance", {}), ("enter_pin", ["1111"]),
+                                    ("withdraw", {"amount": "1000"}), ("transfer", {}))
+        self.writer.write(b"{not json\n")
+        parse_error = json.loads(await self.reader.readline())
+        balance = (await self.call(("get_balance", {})))[0]
+
+        # Assert
+        self.assertEqual(ACCESS_DENIED, responses[1]["error"]["code"])
+        self.assertEqual(OPERATION_FAILED, responses[3]["error"]["code"])
+        self.assertEqual("NotEnoughMoneyOnBalanceException", responses[3]["error"]["data"]["type"])
+        self.assertEqual(METHOD_NOT_FOUND, responses[4]["error"]["code"])
+        self.assertEqual(PARSE_ERROR, parse_error["error"]["code"])
+        self.assertEqual("100", balance["result"])
+
+    async def test_server_serializes_withdrawals_of_two_sessions_with_the_same_card(self):
+        # Arrange
+        await self.call(("insert_card", ["1111222233334444"]), ("enter_pin", ["1111"]), ("deposit", {"banknotes": [20, 20, 20, 20]}),
+                        ("pay_phone", ["+375291234567", 100]))
+        reader, writer = await asyncio.open_connection(*self.server.sockets[0].getsockname()[:2])
+        for method, params in (("insert_card", ["1111222233334444"]), ("enter_pin", ["1111"])):
+            writer.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": method, "params": params}).encode() + b"\n")
+            await reader.readline()
+
+        # Act
+        request = json.dumps({"jsonrpc": "2.0", "id": 0, "method": "withdraw", "params": {"amount": "60"}}).encode() + b"\n"
+        self.writer.write(request)
+        writer.write(request)
+        responses = [json.loads(await self.reader.readline()), json.loads(await reader.readline())]
+        writer.close()
+        await writer.wait_closed()
+
+        # Assert
+        self.assertEqual(1, sum("result" in response for response in responses))
+        self.assertEqual(["NotEnoughMoneyOnBalanceException"], [response["error"]["data"]["type"] for response in responses if "error" in response])
+        self.assertEqual(Decimal(20), self.repository.get_balance("1111222233334444"))
+        self.assertEqual(Decimal(110), await self.banknotes_storage.get_cash_available())
+
+    async def test_server_withdraw_amount_which_cant_be_dispensed_exactly_changes_nothing(self):
+        # Act
+        responses = await self.call(("insert_card", ["1111222233334444"]), ("enter_pin", ["1111"]), ("withdraw", {"amount": "30"}))
+
+        # Assert
+        self.assertEqual(OPERATION_FAILED, responses[2]["error"]["code"])
+        self.assertEqual("NotEnoughMoneyInStorageException", responses[2]["error"]["data"]["type"])
+        self.assertEqual(Decimal(100), self.repository.get_balance("1111222233334444"))
+        self.assertEqual(Decimal(90), await self.banknotes_storage.get_cash_available())
+
+    async def test_server_withdraw_zero_returns_no_banknotes(self):
+        # Act
+        responses = await self.call(("insert_card", ["1111222233334444"]), ("enter_pin", ["1111"]), ("withdraw", {"amount": "0"}))
+
+        # Assert
+        self.assertEqual({"banknotes": [], "balance": "100"}, responses[2]["result"])
+        self.assertEqual(Decimal(90), await self.banknotes_storage.get_cash_available())
+
+    async def test_server_created_over_cassette_file_dispenses_from_it(self):
+        # Arrange
+        cards_directory = os.path.join(self.directory.name, "cards")
+        repository = IndexedCardRepository(cards_directory)
+        account = CardAccount()
+        account.deposit_cash(Decimal(100))
+        repository.add(BankCard("1111222233334444", datetime(2030, 1, 1).date(), "Test User", "111", "1111", account))
+        repository.close()
+        banknotes_path = os.path.join(self.directory.name, "atm_data.json")
+        JsonFileStorage(banknotes_path).save(Cassette({50: 1, 20: 2}).to_json())
+        server = create_server(cards_directory, banknotes_path, workers=1)
+        await server.start_tcp()
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+
+        # Act
+        responses = []
+        for method, params in (("insert_card", ["1111222233334444"]), ("enter_pin", ["1111"]), ("withdraw", {"amount": "70"})):
+            writer.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": method, "params": params}).encode() + b"\n")
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        while server.connections:
+            await asyncio.sleep(0.001)
+        await server.close()
+
+        # Assert
+        self.assertEqual({"banknotes": ["50", "20"], "balance": "30"}, responses[2]["result"])
+        self.assertEqual(Cassette({50: 0, 20: 1}).to_json(), JsonFileStorage(banknotes_path).load())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file